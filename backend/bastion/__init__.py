@@ -1,2 +1,6 @@
 # Bastion Platform
 __version__ = '0.1.0'
+
+from .celery import app as celery_app
+
+__all__ = ['celery_app']
@@ -17,7 +17,22 @@ from .core import (
     AccountSerializer,
     AccountListSerializer,
     RiskSnapshotSerializer,
+    RiskSnapshotSummarySerializer,
     DashboardStatsSerializer,
+    AumHistoryQuerySerializer,
+    AumPointSerializer,
+    RiskAnalyticsQuerySerializer,
+    RiskHistoryQuerySerializer,
+    RiskHistoryPointSerializer,
+    RiskAsOfQuerySerializer,
+    TypeaheadQuerySerializer,
+    TypeaheadResultSerializer,
+    HouseholdOverviewSerializer,
+    BookImportSerializer,
+    BookImportResultSerializer,
+    RiskScanQuerySerializer,
+    RiskMetricsSerializer,
+    RiskScanRowSerializer,
 )
 
 from .documents import (
@@ -31,12 +46,17 @@ from .documents import (
 from .briefings import (
     BriefingTemplateSerializer,
     BriefingTemplateListSerializer,
+    BriefingTemplatePreviewSerializer,
+    BriefingBatchSerializer,
+    BriefingBatchCreateSerializer,
     BriefingSerializer,
     BriefingListSerializer,
     BriefingCreateSerializer,
     NotificationSerializer,
     NotificationListSerializer,
     NotificationMarkReadSerializer,
+    OutreachTriggerSerializer,
+    OutreachAlertSerializer,
 )
 
 __all__ = [
@@ -57,7 +77,22 @@ __all__ = [
     'AccountSerializer',
     'AccountListSerializer',
     'RiskSnapshotSerializer',
+    'RiskSnapshotSummarySerializer',
     'DashboardStatsSerializer',
+    'AumHistoryQuerySerializer',
+    'AumPointSerializer',
+    'RiskAnalyticsQuerySerializer',
+    'RiskHistoryQuerySerializer',
+    'RiskHistoryPointSerializer',
+    'RiskAsOfQuerySerializer',
+    'TypeaheadQuerySerializer',
+    'TypeaheadResultSerializer',
+    'HouseholdOverviewSerializer',
+    'BookImportSerializer',
+    'BookImportResultSerializer',
+    'RiskScanQuerySerializer',
+    'RiskMetricsSerializer',
+    'RiskScanRowSerializer',
     # Documents
     'DocumentCategorySerializer',
     'DocumentSerializer',
@@ -67,10 +102,15 @@ __all__ = [
     # Briefings
     'BriefingTemplateSerializer',
     'BriefingTemplateListSerializer',
+    'BriefingTemplatePreviewSerializer',
+    'BriefingBatchSerializer',
+    'BriefingBatchCreateSerializer',
     'BriefingSerializer',
     'BriefingListSerializer',
     'BriefingCreateSerializer',
     'NotificationSerializer',
     'NotificationListSerializer',
     'NotificationMarkReadSerializer',
+    'OutreachTriggerSerializer',
+    'OutreachAlertSerializer',
 ]
@@ -2,8 +2,15 @@
 Briefing and Notification serializers
 """
 
+from django.utils import timezone
 from rest_framework import serializers
-from bastion.briefings.models import BriefingTemplate, Briefing, Notification
+from bastion.briefings.models import (
+    BriefingTemplate, BriefingBatch, Briefing, Notification, OutreachTrigger, OutreachAlert
+)
+from bastion.briefings.generation import TARGET_FILTER_FIELDS
+from bastion.briefings.cron import CronError, parse_cron
+from bastion.briefings.templating import TemplateError, validate_template
+from bastion.documents.models import Document
 
 
 class BriefingTemplateSerializer(serializers.ModelSerializer):
@@ -19,13 +26,37 @@ class BriefingTemplateSerializer(serializers.ModelSerializer):
             'id', 'name', 'template_type', 'template_type_display',
             'description', 'subject_template', 'body_template',
             'available_variables', 'is_active', 'requires_approval',
-            'schedule_cron', 'usage_count',
+            'schedule_cron', 'next_run_at', 'last_run_at', 'usage_count',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'next_run_at', 'last_run_at', 'created_at', 'updated_at']
 
     def get_usage_count(self, obj):
-        return obj.briefings.count()
+        # Annotated by BriefingTemplateViewSet; counted here only for unannotated instances
+        count = getattr(obj, 'briefing_count', None)
+        return obj.briefings.count() if count is None else count
+
+    def validate_schedule_cron(self, value):
+        value = value.strip()
+        if value:
+            try:
+                # Syntax alone is not enough: "0 0 30 2 *" parses but never fires
+                parse_cron(value).next_after(timezone.now())
+            except CronError as exc:
+                raise serializers.ValidationError(str(exc))
+        return value
+
+    def validate(self, attrs):
+        # Compile on save so broken or undeclared placeholders never reach clients
+        instance = self.instance
+        subject = attrs.get('subject_template', getattr(instance, 'subject_template', ''))
+        body = attrs.get('body_template', getattr(instance, 'body_template', ''))
+        variables = attrs.get('available_variables', getattr(instance, 'available_variables', []))
+        try:
+            validate_template(subject, body, variables)
+        except TemplateError as exc:
+            raise serializers.ValidationError(str(exc))
+        return attrs
 
 
 class BriefingTemplateListSerializer(serializers.ModelSerializer):
@@ -64,7 +95,7 @@ class BriefingSerializer(serializers.ModelSerializer):
             'body_markdown', 'body_html',
             'status', 'status_display',
             'delivery_method', 'delivery_method_display',
-            'scheduled_for', 'sent_at', 'opened_at',
+            'scheduled_for', 'sent_at', 'opened_at', 'open_count',
             'created_by', 'created_by_name',
             'approved_by', 'approved_by_name', 'approved_at',
             'period_start', 'period_end',
@@ -72,7 +103,7 @@ class BriefingSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'body_html', 'sent_at', 'opened_at',
+            'id', 'body_html', 'sent_at', 'opened_at', 'open_count',
             'created_by', 'approved_at', 'created_at', 'updated_at'
         ]
 
@@ -126,6 +157,108 @@ class BriefingCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class BriefingTemplatePreviewSerializer(serializers.Serializer):
+    """Serializer for rendering a template against a sample context"""
+    context = serializers.DictField(child=serializers.CharField(allow_blank=True), default=dict)
+    strict = serializers.BooleanField(default=False)
+
+
+class BriefingBatchSerializer(serializers.ModelSerializer):
+    """Serializer for bulk generation jobs and their progress"""
+    template_name = serializers.CharField(source='template.name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = BriefingBatch
+        fields = [
+            'id', 'template', 'template_name',
+            'target_type', 'household_ids', 'target_filter',
+            'period_label', 'period_start', 'period_end',
+            'extra_context', 'attachment_ids',
+            'delivery_method', 'scheduled_for',
+            'status', 'status_display', 'progress',
+            'total_count', 'processed_count', 'created_count', 'failed_count',
+            'errors', 'started_at', 'completed_at',
+            'created_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'total_count', 'processed_count', 'created_count',
+            'failed_count', 'errors', 'started_at', 'completed_at', 'created_at'
+        ]
+
+
+class BriefingBatchCreateSerializer(serializers.ModelSerializer):
+    """Serializer for starting a bulk generation job"""
+    household_ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+    attachment_ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+    delivery_method = serializers.ChoiceField(
+        choices=Briefing.DeliveryMethod.choices,
+        default=Briefing.DeliveryMethod.PORTAL
+    )
+
+    class Meta:
+        model = BriefingBatch
+        fields = [
+            'template', 'target_type', 'household_ids', 'target_filter',
+            'period_label', 'period_start', 'period_end',
+            'extra_context', 'attachment_ids',
+            'delivery_method', 'scheduled_for'
+        ]
+
+    def validate_template(self, value):
+        if not value.is_active:
+            raise serializers.ValidationError('Template is not active.')
+        return value
+
+    def validate_attachment_ids(self, value):
+        """Active, firm-wide documents only: each is attached to every briefing in the batch"""
+        ids = set(value)
+        documents = {
+            pk: (household_id, client_id)
+            for pk, household_id, client_id in Document.objects.filter(
+                pk__in=ids, status=Document.Status.ACTIVE,
+            ).values_list('pk', 'household_id', 'client_id')
+        }
+        missing = ids - documents.keys()
+        if missing:
+            raise serializers.ValidationError(
+                f"Unknown or inactive documents: {', '.join(sorted(map(str, missing)))}"
+            )
+        private = [pk for pk, owners in documents.items() if any(owners)]
+        if private:
+            raise serializers.ValidationError(
+                'Only firm-wide documents can be attached to a batch; '
+                f"these belong to a household or client: {', '.join(sorted(map(str, private)))}"
+            )
+        return list(dict.fromkeys(value))
+
+    def validate_target_filter(self, value):
+        unknown = set(value) - TARGET_FILTER_FIELDS
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unsupported filter fields: {', '.join(sorted(unknown))}"
+            )
+        return value
+
+    def validate(self, attrs):
+        target_type = attrs.get('target_type', BriefingBatch.TargetType.ALL)
+        if target_type == BriefingBatch.TargetType.HOUSEHOLDS and not attrs.get('household_ids'):
+            raise serializers.ValidationError(
+                'household_ids is required when targeting selected households.'
+            )
+        if target_type == BriefingBatch.TargetType.FILTER and not attrs.get('target_filter'):
+            raise serializers.ValidationError(
+                'target_filter is required when targeting filtered households.'
+            )
+
+        # JSON fields store ids as strings
+        for field in ('household_ids', 'attachment_ids'):
+            if field in attrs:
+                attrs[field] = [str(value) for value in attrs[field]]
+        return attrs
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     """Serializer for Notification model"""
     notification_type_display = serializers.CharField(
@@ -162,3 +295,47 @@ class NotificationMarkReadSerializer(serializers.Serializer):
         required=False
     )
     mark_all = serializers.BooleanField(default=False)
+
+
+class OutreachTriggerSerializer(serializers.ModelSerializer):
+    """Serializer for OutreachTrigger model"""
+    metric_display = serializers.CharField(source='get_metric_display', read_only=True)
+    action_display = serializers.CharField(source='get_action_display', read_only=True)
+
+    class Meta:
+        model = OutreachTrigger
+        fields = [
+            'id', 'name', 'metric', 'metric_display', 'comparison', 'threshold',
+            'client', 'household', 'risk_tolerance',
+            'action', 'action_display', 'template', 'cooldown_days', 'is_active',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        instance = self.instance
+        scope = [
+            attrs.get(name, getattr(instance, name, None))
+            for name in ('client', 'household', 'risk_tolerance')
+        ]
+        if sum(bool(value) for value in scope) > 1:
+            raise serializers.ValidationError(
+                'Scope a trigger to one client, one household or one risk tolerance, not several'
+            )
+        template = attrs.get('template', getattr(instance, 'template', None))
+        if template is not None and template.template_type != BriefingTemplate.TemplateType.MARKET_ALERT:
+            raise serializers.ValidationError({'template': 'Must be a market alert template'})
+        return attrs
+
+
+class OutreachAlertSerializer(serializers.ModelSerializer):
+    """Serializer for OutreachAlert model"""
+    trigger_name = serializers.CharField(source='trigger.name', read_only=True)
+
+    class Meta:
+        model = OutreachAlert
+        fields = [
+            'id', 'trigger', 'trigger_name', 'client', 'household',
+            'as_of_date', 'value', 'briefing', 'created_at'
+        ]
+        read_only_fields = fields
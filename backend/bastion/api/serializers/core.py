@@ -2,8 +2,17 @@
 Core serializers for Client, Household, Account models
 """
 
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from bastion.core.models import User, Client, Household, Account, RiskSnapshot
+from bastion.core.models import User, Client, Household, Account, RiskSnapshot, AumRollup
+from bastion.core.analytics import METRICS, TARGETS
+from bastion.core.ingestion import FORMATS
+from bastion.core.rollups import INTERVALS, default_interval
+from bastion.core.search import TYPES
+from .briefings import BriefingListSerializer
+from .documents import DocumentListSerializer
 
 
 class UserMinimalSerializer(serializers.ModelSerializer):
@@ -15,38 +24,60 @@ class UserMinimalSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'first_name', 'last_name', 'full_name']
 
 
+class RiskSnapshotSummarySerializer(serializers.ModelSerializer):
+    """Current value and exposures, nested in client and household payloads"""
+
+    class Meta:
+        model = RiskSnapshot
+        fields = [
+            'as_of_date', 'total_value',
+            'equity_exposure', 'fixed_income_exposure',
+            'cash_exposure', 'alternative_exposure',
+            'risk_score'
+        ]
+
+
 class HouseholdSerializer(serializers.ModelSerializer):
     """Serializer for Household model"""
     client_count = serializers.SerializerMethodField()
-    total_value = serializers.SerializerMethodField()
+    total_value = serializers.DecimalField(
+        source='latest_snapshot.snapshot.total_value',
+        max_digits=15, decimal_places=2, read_only=True
+    )
+    latest_snapshot = RiskSnapshotSummarySerializer(source='latest_snapshot.snapshot', read_only=True)
 
     class Meta:
         model = Household
         fields = [
             'id', 'name', 'notes',
-            'client_count', 'total_value',
+            'client_count', 'total_value', 'latest_snapshot',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_client_count(self, obj):
-        return obj.clients.filter(is_active=True).count()
-
-    def get_total_value(self, obj):
-        # Would calculate from accounts/snapshots
-        return None
+        # Annotated by HouseholdViewSet; counted here only for unannotated instances
+        count = getattr(obj, 'active_client_count', None)
+        return obj.clients.filter(is_active=True).count() if count is None else count
 
 
 class HouseholdListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing households"""
     client_count = serializers.SerializerMethodField()
+    total_value = serializers.DecimalField(
+        source='latest_snapshot.snapshot.total_value',
+        max_digits=15, decimal_places=2, read_only=True
+    )
+    latest_snapshot = RiskSnapshotSummarySerializer(source='latest_snapshot.snapshot', read_only=True)
 
     class Meta:
         model = Household
-        fields = ['id', 'name', 'client_count', 'created_at']
+        fields = ['id', 'name', 'client_count', 'total_value', 'latest_snapshot', 'created_at']
 
     def get_client_count(self, obj):
-        return obj.clients.filter(is_active=True).count()
+        # Annotated by HouseholdViewSet; counted here only for unannotated instances
+        count = getattr(obj, 'active_client_count', None)
+        return obj.clients.filter(is_active=True).count() if count is None else count
 
 
 class ClientSerializer(serializers.ModelSerializer):
@@ -54,7 +85,11 @@ class ClientSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
     household_name = serializers.CharField(source='household.name', read_only=True)
     account_count = serializers.SerializerMethodField()
-    total_value = serializers.SerializerMethodField()
+    total_value = serializers.DecimalField(
+        source='latest_snapshot.snapshot.total_value',
+        max_digits=15, decimal_places=2, read_only=True
+    )
+    latest_snapshot = RiskSnapshotSummarySerializer(source='latest_snapshot.snapshot', read_only=True)
 
     class Meta:
         model = Client
@@ -63,29 +98,34 @@ class ClientSerializer(serializers.ModelSerializer):
             'client_type', 'household', 'household_name',
             'portal_enabled', 'risk_tolerance', 'time_horizon',
             'is_active', 'onboarded_at',
-            'account_count', 'total_value',
+            'account_count', 'total_value', 'latest_snapshot',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'full_name', 'created_at', 'updated_at']
 
     def get_account_count(self, obj):
-        return obj.accounts.filter(is_active=True).count()
-
-    def get_total_value(self, obj):
-        # Would calculate from latest risk snapshot
-        return None
+        # Annotated by ClientViewSet; counted here only for unannotated instances
+        count = getattr(obj, 'active_account_count', None)
+        return obj.accounts.filter(is_active=True).count() if count is None else count
 
 
 class ClientListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing clients"""
     full_name = serializers.CharField(read_only=True)
     household_name = serializers.CharField(source='household.name', read_only=True)
+    account_count = serializers.IntegerField(source='active_account_count', read_only=True, default=None)
+    total_value = serializers.DecimalField(
+        source='latest_snapshot.snapshot.total_value',
+        max_digits=15, decimal_places=2, read_only=True
+    )
+    latest_snapshot = RiskSnapshotSummarySerializer(source='latest_snapshot.snapshot', read_only=True)
 
     class Meta:
         model = Client
         fields = [
             'id', 'first_name', 'last_name', 'full_name', 'email',
-            'client_type', 'household_name', 'is_active', 'created_at'
+            'client_type', 'household_name', 'is_active', 'account_count',
+            'total_value', 'latest_snapshot', 'created_at'
         ]
 
 
@@ -145,6 +185,7 @@ class RiskSnapshotSerializer(serializers.ModelSerializer):
             'total_value', 'equity_exposure', 'fixed_income_exposure',
             'cash_exposure', 'alternative_exposure',
             'risk_score', 'max_drawdown_ytd',
+            'drawdown', 'period_return', 'volatility', 'exposure_drift',
             'data_source', 'source_timestamp',
             'created_at'
         ]
@@ -159,3 +200,181 @@ class DashboardStatsSerializer(serializers.Serializer):
     total_accounts = serializers.IntegerField()
     pending_tasks = serializers.IntegerField()
     pending_briefings = serializers.IntegerField()
+
+
+class AumHistoryQuerySerializer(serializers.Serializer):
+    """Query parameters for the AUM time series"""
+    household = serializers.PrimaryKeyRelatedField(
+        queryset=Household.objects.all(), required=False, allow_null=True, default=None
+    )
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=INTERVALS, required=False)
+
+    def validate(self, attrs):
+        end = attrs.get('end') or timezone.localdate()
+        start = attrs.get('start') or end - timedelta(days=365)
+        if start > end:
+            raise serializers.ValidationError('start must not be after end.')
+        attrs.update(start=start, end=end)
+        attrs.setdefault('interval', default_interval(start, end))
+        return attrs
+
+
+class AumPointSerializer(serializers.ModelSerializer):
+    """Serializer for one point of an AUM time series"""
+    equity_exposure = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    fixed_income_exposure = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    cash_exposure = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    alternative_exposure = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = AumRollup
+        fields = [
+            'as_of_date', 'total_value',
+            'equity_exposure', 'fixed_income_exposure',
+            'cash_exposure', 'alternative_exposure',
+            'snapshot_count'
+        ]
+
+
+class RiskAnalyticsQuerySerializer(serializers.Serializer):
+    """Query parameters for a client's or household's risk metrics"""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        end = attrs.get('end') or timezone.localdate()
+        start = attrs.get('start') or end - timedelta(days=365)
+        if start > end:
+            raise serializers.ValidationError('start must not be after end.')
+        attrs.update(start=start, end=end)
+        return attrs
+
+
+class RiskHistoryQuerySerializer(serializers.Serializer):
+    """Query parameters for a client's or household's value history chart"""
+    start = serializers.DateField(required=False, default=None)
+    end = serializers.DateField(required=False, default=None)
+    max_points = serializers.IntegerField(min_value=3, max_value=5000, default=500)
+
+    def validate(self, attrs):
+        if attrs['start'] and attrs['end'] and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('start must not be after end.')
+        return attrs
+
+
+class RiskHistoryPointSerializer(serializers.Serializer):
+    """Value and exposures at one point of a history chart"""
+    as_of_date = serializers.DateField()
+    total_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    equity_exposure = serializers.DecimalField(max_digits=5, decimal_places=2)
+    fixed_income_exposure = serializers.DecimalField(max_digits=5, decimal_places=2)
+    cash_exposure = serializers.DecimalField(max_digits=5, decimal_places=2)
+    alternative_exposure = serializers.DecimalField(max_digits=5, decimal_places=2)
+
+
+class RiskAsOfQuerySerializer(serializers.Serializer):
+    """Query parameters for the book-wide point-in-time snapshot export"""
+    as_of = serializers.DateField()
+    target = serializers.ChoiceField(choices=TARGETS, default='client')
+    id = serializers.ListField(child=serializers.UUIDField(), required=False)
+    household = serializers.UUIDField(required=False)
+    risk_tolerance = serializers.CharField(required=False)
+    include_inactive = serializers.BooleanField(default=False)
+    output = serializers.ChoiceField(choices=['json', 'csv'], default='json')
+
+    def validate(self, attrs):
+        client_filters = {'household', 'risk_tolerance'} & set(attrs)
+        if attrs['target'] == 'household' and client_filters:
+            raise serializers.ValidationError(
+                f"{', '.join(sorted(client_filters))} only apply to target=client."
+            )
+        return attrs
+
+
+class TypeaheadQuerySerializer(serializers.Serializer):
+    """Query parameters for the hub search box"""
+    q = serializers.CharField(max_length=100, trim_whitespace=True)
+    type = serializers.ChoiceField(choices=TYPES, required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=getattr(settings, 'TYPEAHEAD_MAX_RESULTS', 10), default=8
+    )
+
+
+class TypeaheadResultSerializer(serializers.Serializer):
+    """One typeahead match"""
+    type = serializers.ChoiceField(choices=TYPES)
+    id = serializers.UUIDField()
+    label = serializers.CharField()
+    detail = serializers.CharField()
+
+
+class BookImportSerializer(serializers.Serializer):
+    """Upload for the bulk client import"""
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+
+    def validate(self, attrs):
+        if 'format' not in attrs:
+            suffix = attrs['file'].name.rsplit('.', 1)[-1].lower()
+            attrs['format'] = {'ndjson': 'jsonl'}.get(suffix, suffix)
+            if attrs['format'] not in FORMATS:
+                raise serializers.ValidationError({'format': 'Cannot infer the format from the file name.'})
+        return attrs
+
+
+class BookImportErrorSerializer(serializers.Serializer):
+    line = serializers.IntegerField()
+    error = serializers.CharField()
+
+
+class BookImportResultSerializer(serializers.Serializer):
+    """What a bulk client import created, and the rows it rejected"""
+    rows = serializers.IntegerField()
+    households = serializers.IntegerField()
+    clients = serializers.IntegerField()
+    accounts = serializers.IntegerField()
+    batches = serializers.IntegerField()
+    error_count = serializers.IntegerField()
+    errors = BookImportErrorSerializer(many=True)
+
+
+class HouseholdOverviewSerializer(serializers.Serializer):
+    """Everything the household page shows, from core.overview"""
+    household = HouseholdSerializer()
+    latest_snapshot = RiskSnapshotSummarySerializer(allow_null=True)
+    clients = ClientListSerializer(many=True)
+    accounts = AccountListSerializer(many=True)
+    documents = DocumentListSerializer(many=True)
+    briefings = BriefingListSerializer(many=True)
+    activity = serializers.ListField(child=serializers.DictField())
+
+
+class RiskScanQuerySerializer(serializers.Serializer):
+    """Query parameters for the book-wide risk scan"""
+    target = serializers.ChoiceField(choices=TARGETS, default='client')
+    as_of = serializers.DateField(required=False)
+    lookback_days = serializers.IntegerField(min_value=1, max_value=3660, default=365)
+    order = serializers.ChoiceField(choices=METRICS, default='max_drawdown_ytd')
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+    def validate(self, attrs):
+        attrs.setdefault('as_of', timezone.localdate())
+        return attrs
+
+
+class RiskMetricsSerializer(serializers.Serializer):
+    """Risk metrics at one snapshot; percentages"""
+    as_of_date = serializers.DateField()
+    total_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    drawdown = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    max_drawdown_ytd = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    period_return = serializers.DecimalField(max_digits=9, decimal_places=4, allow_null=True)
+    volatility = serializers.DecimalField(max_digits=9, decimal_places=4, allow_null=True)
+    exposure_drift = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+
+
+class RiskScanRowSerializer(RiskMetricsSerializer):
+    """One client or household in a risk scan, at its latest snapshot"""
+    id = serializers.UUIDField()
@@ -16,7 +16,9 @@ class DocumentCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def get_document_count(self, obj):
-        return obj.documents.filter(status='active').count()
+        # Annotated by DocumentCategoryViewSet; counted here only for unannotated instances
+        count = getattr(obj, 'active_document_count', None)
+        return obj.documents.filter(status='active').count() if count is None else count
 
 
 class DocumentSerializer(serializers.ModelSerializer):
@@ -24,19 +24,26 @@ from .views import (
     ClientViewSet,
     AccountViewSet,
     RiskSnapshotViewSet,
+    TypeaheadView,
     # Documents
     DocumentCategoryViewSet,
     DocumentViewSet,
     # Briefings
     BriefingTemplateViewSet,
+    BriefingBatchViewSet,
     BriefingViewSet,
+    BriefingOpenPixelView,
     NotificationViewSet,
+    OutreachTriggerViewSet,
     # Dashboard & Admin
     DashboardView,
+    AumHistoryView,
     RecentActivityView,
     UserManagementViewSet,
     AuditLogViewSet,
     SettingsView,
+    # Events
+    EventStreamView,
 )
 
 # Router for viewsets
@@ -49,7 +56,9 @@ router.register('documents', DocumentViewSet, basename='document')
 router.register('document-categories', DocumentCategoryViewSet, basename='document-category')
 router.register('briefings', BriefingViewSet, basename='briefing')
 router.register('briefing-templates', BriefingTemplateViewSet, basename='briefing-template')
+router.register('briefing-batches', BriefingBatchViewSet, basename='briefing-batch')
 router.register('notifications', NotificationViewSet, basename='notification')
+router.register('outreach-triggers', OutreachTriggerViewSet, basename='outreach-trigger')
 router.register('users', UserManagementViewSet, basename='user')
 router.register('audit-logs', AuditLogViewSet, basename='audit-log')
 
@@ -74,8 +83,18 @@ urlpatterns = [
 
     # Dashboard
     path('dashboard/stats/', DashboardView.as_view(), name='dashboard-stats'),
+    path('dashboard/aum-history/', AumHistoryView.as_view(), name='dashboard-aum-history'),
     path('dashboard/activity/', RecentActivityView.as_view(), name='dashboard-activity'),
 
+    # Hub search box
+    path('search/typeahead/', TypeaheadView.as_view(), name='search-typeahead'),
+
+    # Live updates (server-sent events, ASGI only)
+    path('events/stream/', EventStreamView.as_view(), name='event-stream'),
+
+    # Email open tracking (unauthenticated)
+    path('track/briefings/<str:token>/open.gif', BriefingOpenPixelView.as_view(), name='briefing-open-pixel'),
+
     # Settings
     path('settings/', SettingsView.as_view(), name='settings'),
 
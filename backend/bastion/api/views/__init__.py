@@ -14,6 +14,7 @@ from .core import (
     ClientViewSet,
     AccountViewSet,
     RiskSnapshotViewSet,
+    TypeaheadView,
 )
 
 from .documents import (
@@ -23,17 +24,22 @@ from .documents import (
 
 from .briefings import (
     BriefingTemplateViewSet,
+    BriefingBatchViewSet,
     BriefingViewSet,
+    BriefingOpenPixelView,
     NotificationViewSet,
+    OutreachTriggerViewSet,
 )
 
 from .dashboard import (
     DashboardView,
+    AumHistoryView,
     RecentActivityView,
     UserManagementViewSet,
     AuditLogViewSet,
     SettingsView,
 )
+from .events import EventStreamView
 
 __all__ = [
     # Auth
@@ -50,17 +56,24 @@ __all__ = [
     'ClientViewSet',
     'AccountViewSet',
     'RiskSnapshotViewSet',
+    'TypeaheadView',
     # Documents
     'DocumentCategoryViewSet',
     'DocumentViewSet',
     # Briefings
     'BriefingTemplateViewSet',
+    'BriefingBatchViewSet',
     'BriefingViewSet',
+    'BriefingOpenPixelView',
     'NotificationViewSet',
+    'OutreachTriggerViewSet',
     # Dashboard
     'DashboardView',
+    'AumHistoryView',
     'RecentActivityView',
     'UserManagementViewSet',
     'AuditLogViewSet',
     'SettingsView',
+    # Events
+    'EventStreamView',
 ]
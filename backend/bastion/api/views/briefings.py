@@ -2,24 +2,38 @@
 Briefing and Notification ViewSets
 """
 
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, mixins, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.db.models import Count
+from django.http import HttpResponse
 from django.utils import timezone
-import markdown
 
-from bastion.briefings.models import BriefingTemplate, Briefing, Notification
+from bastion.briefings.models import BriefingTemplate, BriefingBatch, Briefing, Notification, OutreachTrigger
+from bastion.briefings.dispatch import claim_briefing
+from bastion.briefings.notifications import adjust_unread_count, unread_count
+from bastion.briefings.rendering import render_markdown
+from bastion.briefings.tasks import evaluate_outreach_triggers, generate_briefing_batch, send_briefings
+from bastion.briefings.templating import TemplateError, render_briefing_template
+from bastion.briefings.tracking import PIXEL, briefing_for_token, record_open
 from bastion.api.serializers import (
     BriefingTemplateSerializer,
     BriefingTemplateListSerializer,
+    BriefingTemplatePreviewSerializer,
+    BriefingBatchSerializer,
+    BriefingBatchCreateSerializer,
     BriefingSerializer,
     BriefingListSerializer,
     BriefingCreateSerializer,
     NotificationSerializer,
     NotificationListSerializer,
     NotificationMarkReadSerializer,
+    OutreachTriggerSerializer,
+    OutreachAlertSerializer,
 )
 from bastion.audit.services import audit_log
 
@@ -34,12 +48,16 @@ class BriefingTemplateViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering = ['template_type', 'name']
 
+    query_budgets = {'list': 3, 'retrieve': 2}
+
     def get_queryset(self):
-        return BriefingTemplate.objects.all()
+        return BriefingTemplate.objects.annotate(briefing_count=Count('briefings'))
 
     def get_serializer_class(self):
         if self.action == 'list':
             return BriefingTemplateListSerializer
+        if self.action == 'preview':
+            return BriefingTemplatePreviewSerializer
         return BriefingTemplateSerializer
 
     def perform_create(self, serializer):
@@ -52,6 +70,74 @@ class BriefingTemplateViewSet(viewsets.ModelViewSet):
             details={'model': 'BriefingTemplate'}
         )
 
+    @action(detail=True, methods=['post'])
+    def preview(self, request, pk=None):
+        """Render the template against a sample context"""
+        template = self.get_object()
+        serializer = BriefingTemplatePreviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            subject, body_markdown = render_briefing_template(
+                template,
+                serializer.validated_data['context'],
+                strict=serializer.validated_data['strict'],
+            )
+        except TemplateError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'subject': subject,
+            'body_markdown': body_markdown,
+        })
+
+
+class BriefingBatchViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for bulk briefing generation jobs
+    Creating a batch queues the job; poll the batch for progress
+    """
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['template', 'status', 'target_type']
+    ordering = ['-created_at']
+
+    def get_queryset(self):
+        return BriefingBatch.objects.select_related('template')
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return BriefingBatchCreateSerializer
+        return BriefingBatchSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        batch = serializer.instance
+        return Response(
+            BriefingBatchSerializer(batch, context=self.get_serializer_context()).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def perform_create(self, serializer):
+        batch = serializer.save(created_by=self.request.user)
+        audit_log(
+            event_type='data.create',
+            user=self.request.user,
+            request=self.request,
+            target=batch,
+            details={
+                'model': 'BriefingBatch',
+                'template': str(batch.template_id),
+                'target_type': batch.target_type,
+            }
+        )
+        transaction.on_commit(lambda: generate_briefing_batch.delay(str(batch.pk)))
+
 
 class BriefingViewSet(viewsets.ModelViewSet):
     """
@@ -79,9 +165,7 @@ class BriefingViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         # Convert markdown to HTML
         body_markdown = serializer.validated_data.get('body_markdown', '')
-        body_html = markdown.markdown(body_markdown, extensions=['tables', 'fenced_code'])
-
-        briefing = serializer.save(body_html=body_html)
+        briefing = serializer.save(body_html=render_markdown(body_markdown))
         audit_log(
             event_type='comm.briefing_sent',
             user=self.request.user,
@@ -90,6 +174,21 @@ class BriefingViewSet(viewsets.ModelViewSet):
             details={'status': 'created'}
         )
 
+    def perform_update(self, serializer):
+        # Keep body_html in step with the markdown it was rendered from
+        extra = {}
+        if 'body_markdown' in serializer.validated_data:
+            extra['body_html'] = render_markdown(serializer.validated_data['body_markdown'])
+
+        briefing = serializer.save(**extra)
+        audit_log(
+            event_type='data.update',
+            user=self.request.user,
+            request=self.request,
+            target=briefing,
+            details={'model': 'Briefing', 'fields': list(serializer.validated_data.keys())}
+        )
+
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
         """Approve a briefing for sending"""
@@ -119,30 +218,20 @@ class BriefingViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def send(self, request, pk=None):
-        """Send an approved briefing"""
+        """Queue an approved briefing for delivery"""
         briefing = self.get_object()
 
-        if briefing.status != 'approved':
+        if briefing.status != 'approved' or not claim_briefing(briefing):
             return Response(
                 {'error': 'Briefing must be approved before sending'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # TODO: Implement actual email/portal delivery
-        briefing.status = 'sent'
-        briefing.sent_at = timezone.now()
-        briefing.save(update_fields=['status', 'sent_at', 'updated_at'])
-
-        audit_log(
-            event_type='comm.briefing_sent',
-            user=request.user,
-            request=request,
-            target=briefing,
-            details={'status': 'sent', 'delivery_method': briefing.delivery_method}
-        )
+        briefing_id, user_id = str(briefing.pk), str(request.user.pk)
+        transaction.on_commit(lambda: send_briefings.delay([briefing_id], user_id))
 
         serializer = self.get_serializer(briefing)
-        return Response(serializer.data)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=False, methods=['get'])
     def pending(self, request):
@@ -183,15 +272,24 @@ class NotificationViewSet(viewsets.ModelViewSet):
             return NotificationMarkReadSerializer
         return NotificationSerializer
 
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        notification = serializer.save()
+        if notification.is_read != was_read:
+            adjust_unread_count(notification.user_id, -1 if notification.is_read else 1)
+
     @action(detail=False, methods=['get'])
     def unread(self, request):
-        """Get unread notifications"""
-        notifications = self.get_queryset().filter(is_read=False)
-        serializer = NotificationListSerializer(notifications, many=True)
-        return Response({
-            'count': notifications.count(),
-            'notifications': serializer.data
-        })
+        """Get unread notifications, newest first (paginated)"""
+        notifications = self.get_queryset().filter(is_read=False).order_by('-created_at')
+        page = self.paginate_queryset(notifications)
+        serializer = NotificationListSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Unread count for the header badge - served from cache"""
+        return Response({'count': unread_count(request.user.pk)})
 
     @action(detail=False, methods=['post'])
     def mark_read(self, request):
@@ -214,6 +312,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 read_at=timezone.now()
             )
 
+        adjust_unread_count(request.user.pk, -updated)
         return Response({'marked_read': updated})
 
     @action(detail=True, methods=['post'])
@@ -224,6 +323,98 @@ class NotificationViewSet(viewsets.ModelViewSet):
             notification.is_read = True
             notification.read_at = timezone.now()
             notification.save(update_fields=['is_read', 'read_at'])
+            adjust_unread_count(notification.user_id, -1)
 
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
+
+
+class OutreachTriggerViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for outreach triggers
+    Thresholds are checked whenever risk snapshots land; evaluate re-runs
+    them over the whole book
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = OutreachTriggerSerializer
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['metric', 'action', 'is_active', 'client', 'household', 'risk_tolerance']
+    search_fields = ['name']
+    ordering = ['metric', 'name']
+
+    def get_queryset(self):
+        return OutreachTrigger.objects.all()
+
+    def perform_create(self, serializer):
+        trigger = serializer.save(created_by=self.request.user)
+        audit_log(
+            event_type='data.create',
+            user=self.request.user,
+            request=self.request,
+            target=trigger,
+            details={'model': 'OutreachTrigger'}
+        )
+
+    def perform_update(self, serializer):
+        trigger = serializer.save()
+        audit_log(
+            event_type='data.update',
+            user=self.request.user,
+            request=self.request,
+            target=trigger,
+            details={'model': 'OutreachTrigger', 'fields': list(serializer.validated_data.keys())}
+        )
+
+    def perform_destroy(self, instance):
+        audit_log(
+            event_type='data.delete',
+            user=self.request.user,
+            request=self.request,
+            target=instance,
+            details={'model': 'OutreachTrigger'}
+        )
+        instance.delete()
+
+    @action(detail=True, methods=['get'])
+    def alerts(self, request, pk=None):
+        """Alerts raised by the trigger, newest first (paginated)"""
+        alerts = self.get_object().alerts.select_related('trigger').order_by('-as_of_date')
+        page = self.paginate_queryset(alerts)
+        serializer = OutreachAlertSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def evaluate(self, request):
+        """Queue an evaluation of every active trigger over the whole book"""
+        evaluate_outreach_triggers.delay()
+        return Response({'status': 'queued'}, status=status.HTTP_202_ACCEPTED)
+
+
+class BriefingOpenPixelView(APIView):
+    """
+    Email open-tracking pixel
+    GET /api/track/briefings/<token>/open.gif
+
+    Hits are accumulated in the cache and flushed to the database in
+    batches (see bastion.briefings.tracking), so a send going out never
+    turns into one UPDATE per image fetch. Always returns the pixel,
+    even for unknown tokens.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    # Mail image proxies fetch from a few shared IPs; a 429 would drop the
+    # open. record_open() dedupes in the cache, which bounds the load.
+    throttle_classes = []
+
+    def get(self, request, token):
+        briefing_id = briefing_for_token(token)
+        if briefing_id:
+            fingerprint = '|'.join([
+                request.META.get('REMOTE_ADDR', ''),
+                request.META.get('HTTP_USER_AGENT', ''),
+            ])
+            record_open(briefing_id, fingerprint)
+
+        response = HttpResponse(PIXEL, content_type='image/gif')
+        response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        return response
@@ -2,14 +2,24 @@
 Core ViewSets for Client, Household, Account management
 """
 
-from rest_framework import viewsets, status, filters
+import csv
+import io
+import json
+import uuid
+from itertools import islice
+
+from rest_framework import viewsets, status, filters, parsers
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Sum
+from django.db.models import Count, Q, Sum
+from django.http import StreamingHttpResponse
 
 from bastion.core.models import Client, Household, Account, RiskSnapshot
+from bastion.core.query_budget import query_budget
 from bastion.api.serializers import (
     ClientSerializer,
     ClientListSerializer,
@@ -20,8 +30,90 @@ from bastion.api.serializers import (
     AccountListSerializer,
     RiskSnapshotSerializer,
     DashboardStatsSerializer,
+    RiskAnalyticsQuerySerializer,
+    RiskHistoryQuerySerializer,
+    RiskHistoryPointSerializer,
+    RiskAsOfQuerySerializer,
+    TypeaheadQuerySerializer,
+    TypeaheadResultSerializer,
+    HouseholdOverviewSerializer,
+    BookImportSerializer,
+    BookImportResultSerializer,
+    RiskScanQuerySerializer,
+    RiskMetricsSerializer,
+    RiskScanRowSerializer,
 )
 from bastion.audit.services import audit_log
+from bastion.core import analytics as risk_analytics
+from bastion.core.book_import import BookImport
+from bastion.core.ingestion import read_rows
+from bastion.core.overview import household_overview
+from bastion.core.series import read_series
+from bastion.core.search import TYPES, typeahead
+from bastion.core.snapshots import snapshots_as_of
+
+
+def _risk_history_response(request, target, target_id):
+    """
+    A target's history between ?start and ?end, at most ?max_points long
+
+    Read from the packed snapshot series; longer ranges are downsampled
+    with LTTB so the payload stays the same size whatever the range.
+    """
+    query = RiskHistoryQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+    history = read_series(target, target_id, start=params['start'], end=params['end'])
+    points = history.downsample(params['max_points'])
+    return Response({
+        **params,
+        'point_count': len(history),
+        'downsampled': len(points) < len(history),
+        'results': RiskHistoryPointSerializer(points.points(), many=True).data,
+    })
+
+
+AS_OF_FIELDS = (
+    'as_of_date', 'total_value',
+    'equity_exposure', 'fixed_income_exposure', 'cash_exposure', 'alternative_exposure',
+    'risk_score', 'max_drawdown_ytd', 'drawdown', 'period_return', 'volatility', 'exposure_drift',
+    'data_source',
+)
+
+
+def _stream_as_of(snapshots, target, output):
+    """
+    Snapshot rows as JSON array or CSV chunks, 1000 rows at a time
+
+    Rows come off a server-side cursor, so memory stays flat however
+    large the book.
+    """
+    names = ('client__first_name', 'client__last_name') if target == 'client' else ('household__name',)
+    rows = snapshots.values_list(f'{target}_id', *names, *AS_OF_FIELDS).iterator(chunk_size=2000)
+    header = ('id', 'name', *AS_OF_FIELDS)
+    records = (
+        (row[0], ' '.join(row[1:1 + len(names)]), *row[1 + len(names):])
+        for row in rows
+    )
+
+    if output == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        while True:
+            chunk = list(islice(records, 1000))
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if not chunk:
+                return
+
+    separator = '['
+    while chunk := list(islice(records, 1000)):
+        yield separator + ','.join(json.dumps(dict(zip(header, record)), default=str) for record in chunk)
+        separator = ','
+    yield ']' if separator == ',' else '[]'
 
 
 class HouseholdViewSet(viewsets.ModelViewSet):
@@ -34,8 +126,12 @@ class HouseholdViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
 
+    query_budgets = {'list': 4, 'retrieve': 3}
+
     def get_queryset(self):
-        return Household.objects.prefetch_related('clients', 'accounts')
+        return Household.objects.select_related('latest_snapshot__snapshot').annotate(
+            active_client_count=Count('clients', filter=Q(clients__is_active=True), distinct=True)
+        )
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -63,21 +159,62 @@ class HouseholdViewSet(viewsets.ModelViewSet):
         )
 
     @action(detail=True, methods=['get'])
+    @query_budget(7)
+    def overview(self, request, pk=None):
+        """
+        Everything the household page shows in one response
+
+        Household, active clients and accounts, latest snapshot, recent
+        documents, pending briefings and recent activity: a fixed six
+        queries on a cache miss, none on a hit (see core.overview).
+        """
+        try:
+            household_id = uuid.UUID(str(pk))
+        except ValueError:
+            raise NotFound()
+        data = household_overview(household_id, render=lambda overview: HouseholdOverviewSerializer(overview).data)
+        if data is None:
+            raise NotFound()
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    @query_budget(4)
     def clients(self, request, pk=None):
         """Get all clients in this household"""
         household = self.get_object()
-        clients = household.clients.filter(is_active=True)
+        clients = household.clients.filter(is_active=True).select_related(
+            'household', 'latest_snapshot__snapshot'
+        ).annotate(
+            active_account_count=Count('accounts', filter=Q(accounts__is_active=True), distinct=True)
+        )
         serializer = ClientListSerializer(clients, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
+    @query_budget(4)
     def accounts(self, request, pk=None):
         """Get all accounts in this household"""
         household = self.get_object()
-        accounts = household.accounts.filter(is_active=True)
+        accounts = household.accounts.filter(is_active=True).select_related('client')
         serializer = AccountListSerializer(accounts, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    @query_budget(4)
+    def risk_history(self, request, pk=None):
+        """Value and exposure history for charts (?start, ?end, ?max_points)"""
+        return _risk_history_response(request, 'household', self.get_object().pk)
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Drawdown, return, volatility and drift per snapshot (?start, ?end)"""
+        household = self.get_object()
+        query = RiskAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        points = risk_analytics.series('household', household.pk, start=params['start'], end=params['end'])
+        return Response(RiskMetricsSerializer(points, many=True).data)
+
 
 class ClientViewSet(viewsets.ModelViewSet):
     """
@@ -90,8 +227,14 @@ class ClientViewSet(viewsets.ModelViewSet):
     ordering_fields = ['last_name', 'first_name', 'created_at']
     ordering = ['last_name', 'first_name']
 
+    query_budgets = {'list': 4, 'retrieve': 3}
+
     def get_queryset(self):
-        return Client.objects.select_related('household', 'user').prefetch_related('accounts')
+        return Client.objects.select_related(
+            'household', 'user', 'latest_snapshot__snapshot'
+        ).annotate(
+            active_account_count=Count('accounts', filter=Q(accounts__is_active=True), distinct=True)
+        )
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -120,7 +263,51 @@ class ClientViewSet(viewsets.ModelViewSet):
             details={'model': 'Client', 'fields': list(serializer.validated_data.keys())}
         )
 
+    @action(
+        detail=False, methods=['post'], url_path='import',
+        parser_classes=[parsers.MultiPartParser, parsers.FormParser],
+    )
+    @query_budget(None)
+    def import_book(self, request):
+        """
+        Create households, clients and accounts from an uploaded file
+
+        CSV, JSON Lines or JSON, one account (or account-less client) per
+        row; see core.book_import for the columns. Rows are read as they
+        stream in and imported in batches; the response reports what was
+        created and every rejected row by line.
+        """
+        params = BookImportSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        upload = params.validated_data['file']
+        importer = BookImport(user=request.user, source_name=upload.name)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            importer.run(read_rows(stream, params.validated_data['format']))
+        except (UnicodeDecodeError, ValueError, csv.Error) as exc:
+            # Batches before the unreadable part are kept; report them too
+            return Response(
+                {
+                    'error': {
+                        'code': status.HTTP_400_BAD_REQUEST,
+                        'message': f'Could not read the file: {exc}',
+                        'details': BookImportResultSerializer(importer.result).data,
+                    }
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        finally:
+            stream.detach()
+
+        result = importer.result
+        created = result.households or result.clients or result.accounts
+        return Response(
+            BookImportResultSerializer(result).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
     @action(detail=True, methods=['get'])
+    @query_budget(4)
     def accounts(self, request, pk=None):
         """Get all accounts for this client"""
         client = self.get_object()
@@ -129,12 +316,20 @@ class ClientViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
+    @query_budget(4)
     def risk_history(self, request, pk=None):
-        """Get risk snapshot history for this client"""
+        """Value and exposure history for charts (?start, ?end, ?max_points)"""
+        return _risk_history_response(request, 'client', self.get_object().pk)
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Drawdown, return, volatility and drift per snapshot (?start, ?end)"""
         client = self.get_object()
-        snapshots = client.risk_snapshots.all()[:12]  # Last 12 snapshots
-        serializer = RiskSnapshotSerializer(snapshots, many=True)
-        return Response(serializer.data)
+        query = RiskAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        points = risk_analytics.series('client', client.pk, start=params['start'], end=params['end'])
+        return Response(RiskMetricsSerializer(points, many=True).data)
 
 
 class AccountViewSet(viewsets.ModelViewSet):
@@ -180,7 +375,7 @@ class AccountViewSet(viewsets.ModelViewSet):
 class RiskSnapshotViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing risk snapshots (read-only)
-    Snapshots are created by background sync jobs, not via API
+    Snapshots are loaded by sync jobs (ingest_risk_snapshots), not via API
     """
     permission_classes = [IsAuthenticated]
     serializer_class = RiskSnapshotSerializer
@@ -191,3 +386,88 @@ class RiskSnapshotViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         return RiskSnapshot.objects.select_related('client', 'household')
+
+    @action(detail=False, methods=['get'])
+    def scan(self, request):
+        """
+        Worst clients or households by a risk metric, book-wide
+
+        ?target=client|household, ?as_of, ?lookback_days, ?order (any
+        metric; returns and drawdowns rank lowest first, the rest
+        highest first) and ?limit.
+        """
+        query = RiskScanQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        rows = risk_analytics.scan(**params)
+        return Response({
+            **params,
+            'results': RiskScanRowSerializer(rows, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'])
+    def as_of(self, request):
+        """
+        Every client's or household's newest snapshot on or before ?as_of
+
+        ?target, ?id (repeatable), and for clients ?household,
+        ?risk_tolerance and ?include_inactive narrow the book. Streamed
+        as a JSON array, or as CSV with ?output=csv.
+        """
+        query = RiskAsOfQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        target = params['target']
+
+        targets = Client.objects.all() if target == 'client' else Household.objects.all()
+        if params.get('id'):
+            targets = targets.filter(pk__in=params['id'])
+        if 'household' in params:
+            targets = targets.filter(household_id=params['household'])
+        if 'risk_tolerance' in params:
+            targets = targets.filter(risk_tolerance=params['risk_tolerance'])
+        if target == 'client' and not params['include_inactive']:
+            targets = targets.filter(is_active=True)
+        snapshots = snapshots_as_of(params['as_of'], target, targets)
+
+        audit_log(
+            event_type='data.export',
+            user=request.user,
+            request=request,
+            details={
+                'model': 'RiskSnapshot',
+                'as_of': params['as_of'].isoformat(),
+                'target': target,
+                'output': params['output'],
+            }
+        )
+
+        output = params['output']
+        response = StreamingHttpResponse(
+            _stream_as_of(snapshots, target, output),
+            content_type='text/csv' if output == 'csv' else 'application/json',
+        )
+        if output == 'csv':
+            response['Content-Disposition'] = (
+                f'attachment; filename="{target}-snapshots-{params["as_of"].isoformat()}.csv"'
+            )
+        return response
+
+
+class TypeaheadView(APIView):
+    """
+    Client and household typeahead for the hub search box
+    GET /api/search/typeahead/?q=<partial>[&type=client|household][&limit=8]
+
+    Ranked matches only (id, label, detail), from trigram indexes on
+    PostgreSQL or an in-process prefix index elsewhere.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = TypeaheadQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        types = (params['type'],) if 'type' in params else TYPES
+        results = typeahead(params['q'], limit=params['limit'], types=types)
+        return Response({'results': TypeaheadResultSerializer(results, many=True).data})
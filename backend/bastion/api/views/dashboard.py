@@ -8,56 +8,70 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Sum
+from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
 
-from bastion.core.models import User, Client, Household, Account, RiskSnapshot
+from bastion.core.models import User
 from bastion.documents.models import Document
-from bastion.briefings.models import Briefing, Notification
+from bastion.briefings.models import Notification
 from bastion.audit.models import AuditEvent
-from bastion.api.serializers import UserSerializer, DashboardStatsSerializer
+from bastion.audit.activity import activity_item
+from bastion.api.serializers import (
+    UserSerializer, DashboardStatsSerializer, AumHistoryQuerySerializer, AumPointSerializer
+)
 from bastion.audit.services import audit_log
+from bastion.core.dashboard import dashboard_stats, pending_task_count
+from bastion.core.rollups import aum_series
 
 
 class DashboardView(APIView):
     """
     Dashboard statistics endpoint
+
+    Firm-wide counters come from the shared cache (one query on a miss,
+    invalidated by model signals); pending tasks are per user.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Calculate stats
-        total_clients = Client.objects.filter(is_active=True).count()
-        total_households = Household.objects.count()
-        total_accounts = Account.objects.filter(is_active=True).count()
-
-        # Get total AUM from latest risk snapshots
-        # For now, use a placeholder - would aggregate from RiskSnapshot
-        total_aum = RiskSnapshot.objects.aggregate(
-            total=Sum('total_value')
-        )['total'] or 0
-
-        pending_briefings = Briefing.objects.filter(
-            status__in=['draft', 'pending_review']
-        ).count()
-
-        # Pending tasks would come from a Task model
-        pending_tasks = 7  # Placeholder
-
         data = {
-            'total_aum': total_aum,
-            'total_clients': total_clients,
-            'total_households': total_households,
-            'total_accounts': total_accounts,
-            'pending_tasks': pending_tasks,
-            'pending_briefings': pending_briefings,
+            **dashboard_stats(),
+            'pending_tasks': pending_task_count(request.user),
         }
-
         serializer = DashboardStatsSerializer(data)
         return Response(serializer.data)
 
 
+class AumHistoryView(APIView):
+    """
+    AUM and exposure mix over time, firm-wide or for ?household=<id>
+
+    Served from the daily rollups. ?start and ?end (YYYY-MM-DD) default
+    to the last year; ?interval=day|week|month defaults by range length
+    so a chart gets a few hundred points at most.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = AumHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        points = aum_series(
+            params['start'], params['end'],
+            household=params['household'],
+            interval=params['interval'],
+        )
+        return Response({
+            'household': params['household'].pk if params['household'] else None,
+            'start': params['start'],
+            'end': params['end'],
+            'interval': params['interval'],
+            'points': AumPointSerializer(points, many=True).data,
+        })
+
+
 class RecentActivityView(APIView):
     """
     Get recent activity for dashboard
@@ -70,52 +84,7 @@ class RecentActivityView(APIView):
         # Get recent audit events
         events = AuditEvent.objects.select_related('user').order_by('-timestamp')[:limit]
 
-        activity = []
-        for event in events:
-            activity.append({
-                'id': str(event.id),
-                'type': self._get_activity_type(event.event_type),
-                'title': self._get_activity_title(event),
-                'description': event.description or self._get_activity_description(event),
-                'user': event.user_email,
-                'timestamp': event.timestamp.isoformat(),
-                'event_type': event.event_type,
-            })
-
-        return Response(activity)
-
-    def _get_activity_type(self, event_type):
-        type_map = {
-            'auth.': 'auth',
-            'data.': 'data',
-            'doc.': 'document',
-            'comm.': 'briefing',
-            'admin.': 'admin',
-            'sys.': 'system',
-        }
-        for prefix, activity_type in type_map.items():
-            if event_type.startswith(prefix):
-                return activity_type
-        return 'other'
-
-    def _get_activity_title(self, event):
-        titles = {
-            'auth.login': 'User logged in',
-            'auth.logout': 'User logged out',
-            'data.create': 'Record created',
-            'data.update': 'Record updated',
-            'data.view': 'Record viewed',
-            'doc.upload': 'Document uploaded',
-            'doc.download': 'Document downloaded',
-            'doc.view': 'Document viewed',
-            'comm.briefing_sent': 'Briefing activity',
-        }
-        return titles.get(event.event_type, event.event_type.replace('.', ' ').title())
-
-    def _get_activity_description(self, event):
-        if event.target_repr:
-            return f"{event.target_type}: {event.target_repr}"
-        return ''
+        return Response([activity_item(event) for event in events])
 
 
 class UserManagementViewSet(viewsets.ModelViewSet):
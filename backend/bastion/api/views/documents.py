@@ -7,6 +7,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count, Q
 from django.utils import timezone
 
 from bastion.documents.models import Document, DocumentCategory, DocumentAccess
@@ -26,9 +27,12 @@ class DocumentCategoryViewSet(viewsets.ModelViewSet):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = DocumentCategorySerializer
-    queryset = DocumentCategory.objects.all()
+    queryset = DocumentCategory.objects.annotate(
+        active_document_count=Count('documents', filter=Q(documents__status='active'))
+    )
     filter_backends = [filters.OrderingFilter]
     ordering = ['order', 'name']
+    query_budgets = {'list': 3, 'retrieve': 2}
 
 
 class DocumentViewSet(viewsets.ModelViewSet):
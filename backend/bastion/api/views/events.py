@@ -0,0 +1,89 @@
+"""
+Live Event Stream
+Server-sent events for the hub, served under ASGI
+"""
+
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from bastion.briefings.notifications import unread_count
+from bastion.core.events import ACTIVITY_CHANNEL, get_broker, user_channel
+
+
+def format_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class EventStreamView(View):
+    """
+    Per-user server-sent event stream
+    GET /api/events/stream/
+
+    Replaces polling of /notifications/unread/ and /dashboard/activity/.
+    Events: ready (initial unread count), notification, unread_count and
+    activity. EventSource can't send headers, so the access token may be
+    passed as ?token=. The stream closes when the token expires and the
+    client reconnects with a fresh one; this also bounds how long a
+    stream outlives a dropped client.
+    """
+
+    async def get(self, request):
+        authenticated = await sync_to_async(self.authenticate)(request)
+        if authenticated is None:
+            return JsonResponse(
+                {'error': 'Valid access token required'},
+                status=401
+            )
+        user, token = authenticated
+
+        count = await sync_to_async(unread_count)(user.pk)
+        response = StreamingHttpResponse(
+            self.stream(user, token['exp'], count),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+        return response
+
+    def authenticate(self, request):
+        auth = JWTAuthentication()
+        raw_token = request.GET.get('token', '').encode() or None
+        if raw_token is None:
+            header = auth.get_header(request)
+            raw_token = auth.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+
+        try:
+            token = auth.get_validated_token(raw_token)
+            return auth.get_user(token), token
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return None
+
+    async def stream(self, user, expires_at, count):
+        heartbeat = getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15)
+        retry = getattr(settings, 'EVENT_STREAM_RETRY', 5000)
+
+        yield f"retry: {retry}\n" + format_event('ready', {'unread_count': count})
+
+        channels = [user_channel(user.pk), ACTIVITY_CHANNEL]
+        async with get_broker().subscribe(channels) as subscription:
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield format_event('expired', {})
+                    return
+
+                message = await subscription.get(timeout=min(heartbeat, remaining))
+                if message is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_event(message['event'], message['data'])
@@ -0,0 +1,14 @@
+"""
+ASGI config for Bastion project.
+
+Serves the whole API, and is required for the live event stream
+(/api/events/stream/), e.g. uvicorn bastion.asgi:application
+"""
+
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bastion.settings')
+os.environ.setdefault('DJANGO_ENV', 'production')
+
+application = get_asgi_application()
@@ -0,0 +1,55 @@
+"""
+Activity Feed
+Presentation of audit events as hub activity items
+"""
+
+ACTIVITY_TYPES = {
+    'auth.': 'auth',
+    'data.': 'data',
+    'doc.': 'document',
+    'comm.': 'briefing',
+    'admin.': 'admin',
+    'sys.': 'system',
+}
+
+ACTIVITY_TITLES = {
+    'auth.login': 'User logged in',
+    'auth.logout': 'User logged out',
+    'data.create': 'Record created',
+    'data.update': 'Record updated',
+    'data.view': 'Record viewed',
+    'doc.upload': 'Document uploaded',
+    'doc.download': 'Document downloaded',
+    'doc.view': 'Document viewed',
+    'comm.briefing_sent': 'Briefing activity',
+}
+
+
+def activity_type(event_type: str) -> str:
+    for prefix, value in ACTIVITY_TYPES.items():
+        if event_type.startswith(prefix):
+            return value
+    return 'other'
+
+
+def activity_title(event) -> str:
+    return ACTIVITY_TITLES.get(event.event_type, event.event_type.replace('.', ' ').title())
+
+
+def activity_description(event) -> str:
+    if event.target_repr:
+        return f"{event.target_type}: {event.target_repr}"
+    return ''
+
+
+def activity_item(event) -> dict:
+    """Activity feed entry for an audit event"""
+    return {
+        'id': str(event.id),
+        'type': activity_type(event.event_type),
+        'title': activity_title(event),
+        'description': event.description or activity_description(event),
+        'user': event.user_email,
+        'timestamp': event.timestamp.isoformat(),
+        'event_type': event.event_type,
+    }
@@ -7,8 +7,12 @@ import uuid
 import json
 from django.db import models
 from django.conf import settings
+from django.dispatch import Signal
 from django.utils import timezone
 
+# Sent by AuditEvent.bulk_log(), which bypasses post_save
+events_logged = Signal()
+
 
 class AuditEvent(models.Model):
     """
@@ -172,6 +176,44 @@ class AuditEvent(models.Model):
         """
         Convenience method to create audit events
         """
+        event = cls.build(
+            event_type=event_type,
+            user=user,
+            target=target,
+            description=description,
+            data=data,
+            old_values=old_values,
+            new_values=new_values,
+            client_id=client_id,
+            household_id=household_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            request_id=request_id,
+            severity=severity,
+        )
+        event.save()
+        return event
+
+    @classmethod
+    def build(
+        cls,
+        event_type: str,
+        user=None,
+        target=None,
+        description: str = '',
+        data: dict = None,
+        old_values: dict = None,
+        new_values: dict = None,
+        client_id=None,
+        household_id=None,
+        ip_address: str = None,
+        user_agent: str = '',
+        request_id: str = '',
+        severity: str = 'info',
+    ):
+        """
+        Build an unsaved audit event - use with bulk_log()
+        """
         event = cls(
             event_type=event_type,
             user=user,
@@ -193,9 +235,24 @@ class AuditEvent(models.Model):
             event.target_id = str(target.pk)
             event.target_repr = str(target)[:255]
 
-        event.save()
+        # bulk_create() bypasses save(), so preserve the email here
+        if user and not event.user_email:
+            event.user_email = user.email
+
         return event
 
+    @classmethod
+    def bulk_log(cls, events, batch_size: int = 500):
+        """
+        Insert many new audit events in batched INSERTs
+
+        Events must come from build(); existing events are never touched,
+        so the append-only guarantee of save() still holds.
+        """
+        created = cls.objects.bulk_create(events, batch_size=batch_size)
+        events_logged.send(sender=cls, events=created)
+        return created
+
 
 class AuditQueryLog(models.Model):
     """
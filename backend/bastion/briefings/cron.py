@@ -0,0 +1,179 @@
+"""
+Cron Expressions
+Five-field cron parsing and next-run computation for briefing schedules
+"""
+
+import bisect
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+
+MONTH_NAMES = {
+    name: index for index, name in enumerate(
+        ['jan', 'feb', 'mar', 'apr', 'may', 'jun',
+         'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1
+    )
+}
+DAY_NAMES = {
+    name: index for index, name in enumerate(
+        ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+    )
+}
+ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+# A schedule that never matches (e.g. "0 0 30 2 *") stops searching here
+MAX_SEARCH_DAYS = 366 * 5
+
+
+class CronError(ValueError):
+    """Invalid cron expression"""
+
+
+def _parse_field(text, low, high, names=None):
+    values = set()
+    for part in text.lower().split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(f"Invalid step: {step_text!r}")
+            step = int(step_text)
+
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start = _parse_value(start_text, names)
+            end = _parse_value(end_text, names)
+        else:
+            start = _parse_value(part, names)
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise CronError(f"Value out of range {low}-{high}: {part!r}")
+        values.update(range(start, end + 1, step))
+
+    return tuple(sorted(values))
+
+
+def _parse_value(text, names):
+    if names and text in names:
+        return names[text]
+    if not text.isdigit():
+        raise CronError(f"Invalid value: {text!r}")
+    return int(text)
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    """Parsed cron expression - sorted allowed values per field"""
+    expression: str
+    minutes: tuple
+    hours: tuple
+    days: tuple
+    months: tuple
+    weekdays: tuple  # 0 = Sunday
+    day_wildcard: bool
+    weekday_wildcard: bool
+
+    def _day_matches(self, value: datetime) -> bool:
+        day_ok = value.day in self.days
+        weekday_ok = (value.isoweekday() % 7) in self.weekdays
+        # Standard cron: when both fields are restricted either may match
+        if self.day_wildcard:
+            return weekday_ok
+        if self.weekday_wildcard:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, value: datetime) -> datetime:
+        """
+        First matching time strictly after value
+
+        Naive datetimes are treated as wall-clock time in the schedule
+        timezone; aware datetimes are converted to it and the result is
+        returned in the same timezone.
+        """
+        tz = schedule_timezone()
+        aware = timezone.is_aware(value)
+        local = value.astimezone(tz).replace(tzinfo=None) if aware else value
+
+        current = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = current + timedelta(days=MAX_SEARCH_DAYS)
+
+        while current < limit:
+            if current.month not in self.months:
+                year = current.year + (current.month == 12)
+                month = current.month % 12 + 1
+                current = current.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+
+            if not self._day_matches(current):
+                current = (current + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+
+            if current.hour not in self.hours:
+                index = bisect.bisect_left(self.hours, current.hour)
+                if index == len(self.hours):
+                    current = (current + timedelta(days=1)).replace(hour=0, minute=0)
+                else:
+                    current = current.replace(hour=self.hours[index], minute=0)
+                continue
+
+            index = bisect.bisect_left(self.minutes, current.minute)
+            if index == len(self.minutes):
+                current = current.replace(minute=0) + timedelta(hours=1)
+                continue
+
+            result = current.replace(minute=self.minutes[index])
+            if aware:
+                return result.replace(tzinfo=tz)
+            return result
+
+        raise CronError(f"Schedule never fires: {self.expression!r}")
+
+
+@lru_cache(maxsize=512)
+def parse_cron(expression: str) -> CronSchedule:
+    """Parse a cron expression once; repeated lookups hit the cache"""
+    text = ALIASES.get(expression.strip().lower(), expression.strip())
+    fields = text.split()
+    if len(fields) != 5:
+        raise CronError('Cron expression must have 5 fields: minute hour day month weekday')
+
+    minute, hour, day, month, weekday = fields
+    weekdays = _parse_field(weekday, 0, 7, DAY_NAMES)
+
+    return CronSchedule(
+        expression=expression,
+        minutes=_parse_field(minute, 0, 59),
+        hours=_parse_field(hour, 0, 23),
+        days=_parse_field(day, 1, 31),
+        months=_parse_field(month, 1, 12, MONTH_NAMES),
+        weekdays=tuple(sorted({value % 7 for value in weekdays})),
+        day_wildcard=day.startswith('*'),
+        weekday_wildcard=weekday.startswith('*'),
+    )
+
+
+def schedule_timezone() -> ZoneInfo:
+    """Timezone schedules are evaluated in (wall-clock cron semantics)"""
+    return ZoneInfo(getattr(settings, 'BRIEFING_SCHEDULE_TIMEZONE', settings.TIME_ZONE))
+
+
+def next_run(expression: str, after: datetime = None) -> datetime:
+    """Next fire time for a cron expression, as an aware datetime"""
+    return parse_cron(expression).next_after(after or timezone.now())
@@ -0,0 +1,138 @@
+"""
+Briefing Delivery
+Email delivery for briefings and notifications
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
+
+from bastion.core.mail import DeliveryJob, DeliveryQueue
+from .models import Briefing, Notification
+from .tracking import tracking_pixel_url
+
+logger = logging.getLogger('bastion.briefings')
+
+
+def briefing_recipients(briefing) -> list:
+    """
+    Email addresses for a briefing
+
+    A client briefing goes to that client; a household briefing goes to
+    every active member. Expects household clients to be prefetched when
+    called in bulk.
+    """
+    if briefing.client_id:
+        return [briefing.client.email] if briefing.client.email else []
+    if briefing.household_id:
+        return [
+            client.email for client in briefing.household.clients.all()
+            if client.is_active and client.email
+        ]
+    return []
+
+
+def build_message(briefing, recipients, connection=None) -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        subject=briefing.subject,
+        body=briefing.body_markdown,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=recipients,
+        connection=connection,
+    )
+    if briefing.body_html:
+        html = briefing.body_html
+        pixel_url = tracking_pixel_url(briefing)
+        if pixel_url:
+            html += f'<img src="{pixel_url}" width="1" height="1" alt="" style="display:none">'
+        message.attach_alternative(html, 'text/html')
+    return message
+
+
+def _needs_email(briefing) -> bool:
+    return briefing.delivery_method in (
+        Briefing.DeliveryMethod.EMAIL,
+        Briefing.DeliveryMethod.BOTH,
+    )
+
+
+def deliver_briefings(briefings) -> dict:
+    """
+    Deliver many briefings through the pooled send queue
+
+    Messages go out concurrently over persistent connections; refused
+    recipients are retried individually with backoff. A briefing counts
+    as delivered if at least one recipient accepted it - permanent
+    per-recipient failures are logged. Returns {briefing_id: error or None}.
+    """
+    results = {}
+    jobs = []
+    for briefing in briefings:
+        if not _needs_email(briefing):
+            results[briefing.pk] = None
+            continue
+        recipients = briefing_recipients(briefing)
+        jobs.append(DeliveryJob(
+            key=briefing.pk,
+            message=build_message(briefing, recipients),
+            recipients=recipients,
+        ))
+
+    if jobs:
+        for job in DeliveryQueue().send_all(jobs):
+            results[job.key] = job.error
+            if job.failed:
+                logger.warning(
+                    f"DELIVERY: recipients failed | briefing={job.key} | {job.failed}"
+                )
+    return results
+
+
+def build_notification_message(notification) -> EmailMultiAlternatives:
+    body = notification.message
+    if notification.link:
+        body = f"{body}\n\n{notification.link_text or 'View'}: {notification.link}"
+    return EmailMultiAlternatives(
+        subject=f"[Bastion] {notification.title}",
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[notification.user.email],
+    )
+
+
+def deliver_notification_emails(notification_ids) -> tuple:
+    """
+    Email notifications and mark them sent in one UPDATE
+
+    Notifications already emailed are skipped, so retries are safe.
+    Returns (sent, failed).
+    """
+    notifications = list(
+        Notification.objects.filter(id__in=notification_ids, email_sent=False)
+        .select_related('user')
+    )
+    jobs = [
+        DeliveryJob(
+            key=notification.pk,
+            message=build_notification_message(notification),
+            recipients=[notification.user.email] if notification.user.email else [],
+        )
+        for notification in notifications
+    ]
+    if not jobs:
+        return 0, 0
+
+    completed = DeliveryQueue().send_all(jobs)
+    sent_ids = [job.key for job in completed if job.error is None]
+    if sent_ids:
+        Notification.objects.filter(id__in=sent_ids).update(
+            email_sent=True,
+            email_sent_at=timezone.now(),
+        )
+
+    failed = len(completed) - len(sent_ids)
+    if failed:
+        logger.warning(f"DELIVERY: notification emails failed | count={failed}")
+    return len(sent_ids), failed
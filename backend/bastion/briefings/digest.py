@@ -0,0 +1,179 @@
+"""
+Notification Digests
+Groups unsent notifications per user into one periodic email
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+
+from bastion.core.mail import DeliveryJob, DeliveryQueue
+from .models import Notification
+
+logger = logging.getLogger('bastion.briefings')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _unsent():
+    # Served by the partial notification_email_unsent index
+    return Notification.objects.filter(email_sent=False)
+
+
+def expire_stale(now=None) -> int:
+    """
+    Retire unsent notifications too old to be worth emailing
+
+    They are marked sent with no email_sent_at, in one UPDATE, so they
+    leave the unsent index without flooding anyone after downtime.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=_setting('NOTIFICATION_DIGEST_MAX_AGE', 7 * 24 * 3600))
+    return _unsent().filter(created_at__lt=cutoff).update(email_sent=True)
+
+
+def due_user_ids(now=None, limit: int = None) -> list:
+    """
+    Users whose oldest unsent notification has waited a full window
+
+    A digest collects everything that arrived while the window was open,
+    so bursts of notifications become one email.
+    """
+    now = now or timezone.now()
+    window = timedelta(seconds=_setting('NOTIFICATION_DIGEST_WINDOW', 15 * 60))
+    limit = limit or _setting('NOTIFICATION_DIGEST_BATCH_SIZE', 200)
+    return list(
+        _unsent().filter(created_at__lte=now - window)
+        .order_by('user_id').values_list('user_id', flat=True).distinct()[:limit]
+    )
+
+
+def claim_notifications(user_ids, now) -> list:
+    """
+    Mark the users' unsent notifications sent and return them
+
+    One SELECT and one UPDATE for the whole batch. Rows are locked with
+    SKIP LOCKED where supported so overlapping runs take disjoint work.
+    """
+    with transaction.atomic():
+        queryset = (
+            _unsent().filter(user_id__in=user_ids, created_at__lte=now)
+            .select_related('user').order_by('user_id', 'created_at')
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+        notifications = list(queryset)
+        if notifications:
+            Notification.objects.filter(id__in=[n.pk for n in notifications]).update(
+                email_sent=True,
+                email_sent_at=now,
+            )
+    return notifications
+
+
+def build_digest(user, notifications) -> EmailMultiAlternatives:
+    """One email listing a user's notifications, newest last"""
+    limit = _setting('NOTIFICATION_DIGEST_MAX_ITEMS', 20)
+    shown = notifications[-limit:]
+    hidden = len(notifications) - len(shown)
+    count = len(notifications)
+
+    lines = []
+    for notification in shown:
+        lines.append(f"- {notification.title}")
+        if notification.message:
+            lines.append(f"  {notification.message}")
+        if notification.link:
+            lines.append(f"  {notification.link}")
+    if hidden:
+        lines.append(f"...and {hidden} earlier in the hub.")
+
+    items = format_html_join(
+        '', '<li><strong>{}</strong><br>{}</li>',
+        ((n.title, n.message) for n in shown),
+    )
+    more = format_html('<p>...and {} earlier in the hub.</p>', hidden) if hidden else ''
+
+    message = EmailMultiAlternatives(
+        subject=f"[Bastion] {count} new notification{'s' if count != 1 else ''}",
+        body='\n'.join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+    message.attach_alternative(format_html('<ul>{}</ul>{}', items, more), 'text/html')
+    return message
+
+
+def send_digest_batch(now=None):
+    """
+    Claim, render and send one batch of digests
+
+    Read notifications are marked but left out of the email; users with
+    nothing left to report, no address or a disabled account get no
+    email. Users whose delivery fails have their notifications released
+    for the next run. Returns (sent, failed), or None when nothing is due.
+    """
+    now = now or timezone.now()
+    user_ids = due_user_ids(now)
+    if not user_ids:
+        return None
+
+    by_user = defaultdict(list)
+    users = {}
+    for notification in claim_notifications(user_ids, now):
+        users[notification.user_id] = notification.user
+        if not notification.is_read:
+            by_user[notification.user_id].append(notification)
+
+    jobs = [
+        DeliveryJob(
+            key=user_id,
+            message=build_digest(users[user_id], notifications),
+            recipients=[users[user_id].email],
+        )
+        for user_id, notifications in by_user.items()
+        if users[user_id].email and users[user_id].is_active
+    ]
+    if not jobs:
+        return 0, 0
+
+    failed_users = [job.key for job in DeliveryQueue().send_all(jobs) if job.error]
+    if failed_users:
+        Notification.objects.filter(
+            user_id__in=failed_users, email_sent=True, email_sent_at=now,
+        ).update(email_sent=False, email_sent_at=None)
+        logger.warning(f"DIGEST: delivery failed | users={len(failed_users)}")
+
+    return len(jobs) - len(failed_users), len(failed_users)
+
+
+def send_digests():
+    """Send every due digest; returns (sent, failed)"""
+    now = timezone.now()
+    expired = expire_stale(now)
+    if expired:
+        logger.info(f"DIGEST: retired stale notifications | count={expired}")
+
+    total_sent = total_failed = 0
+    while True:
+        result = send_digest_batch(now)
+        if result is None:
+            break
+        sent, failed = result
+        total_sent += sent
+        total_failed += failed
+        if failed:
+            # Released notifications would be picked up again straight away
+            break
+
+    if total_sent or total_failed:
+        logger.info(f"DIGEST: done | sent={total_sent} | failed={total_failed}")
+    return total_sent, total_failed
@@ -0,0 +1,238 @@
+"""
+Briefing Dispatch
+Claims approved briefings that have come due and delivers them
+"""
+
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Min, Prefetch, Q
+from django.utils import timezone
+
+from bastion.audit.models import AuditEvent
+from bastion.core.models import Client
+from .delivery import deliver_briefings
+from .models import Briefing, Notification
+from .notifications import create_notifications
+
+logger = logging.getLogger('bastion.briefings')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _due_filter(now):
+    """
+    Approved and due, or stuck in SENDING past the claim lease
+
+    A claim whose worker died is retried after the lease expires, so
+    delivery is at-least-once rather than at-most-once.
+    """
+    lease = timedelta(seconds=_setting('BRIEFING_DISPATCH_LEASE', 900))
+    return (
+        Q(status=Briefing.Status.APPROVED, scheduled_for__lte=now)
+        | Q(status=Briefing.Status.SENDING, updated_at__lt=now - lease)
+    )
+
+
+def _with_recipients(queryset):
+    return queryset.select_related('client', 'household').prefetch_related(Prefetch(
+        'household__clients',
+        queryset=Client.objects.filter(is_active=True).only(
+            'id', 'email', 'is_active', 'household_id', 'user_id', 'portal_enabled'
+        ),
+    ))
+
+
+def claim_due_briefings(limit: int = None) -> list:
+    """
+    Claim a batch of due briefings for this worker
+
+    Rows are selected over the (status, scheduled_for) index with FOR
+    UPDATE SKIP LOCKED where supported, so concurrent workers take
+    disjoint batches without blocking. The claim moves rows to SENDING
+    stamped with a claim time; only rows carrying our stamp are
+    returned, which keeps claims exclusive on databases without row
+    locks too.
+    """
+    limit = limit or _setting('BRIEFING_DISPATCH_BATCH_SIZE', 100)
+    now = timezone.now()
+
+    with transaction.atomic():
+        queryset = Briefing.objects.filter(_due_filter(now)).order_by('scheduled_for')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        ids = list(queryset.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+
+        Briefing.objects.filter(Q(id__in=ids) & _due_filter(now)).update(
+            status=Briefing.Status.SENDING,
+            updated_at=now,
+        )
+
+    return list(_with_recipients(
+        Briefing.objects.filter(id__in=ids, status=Briefing.Status.SENDING, updated_at=now)
+    ))
+
+
+def claim_briefing(briefing) -> bool:
+    """Move one approved briefing to SENDING; False if someone beat us to it"""
+    now = timezone.now()
+    claimed = Briefing.objects.filter(
+        pk=briefing.pk, status=Briefing.Status.APPROVED,
+    ).update(status=Briefing.Status.SENDING, updated_at=now)
+    if claimed:
+        briefing.status, briefing.updated_at = Briefing.Status.SENDING, now
+    return bool(claimed)
+
+
+def send_claimed_briefings(briefing_ids, user=None):
+    """Deliver and record briefings already claimed into SENDING"""
+    briefings = list(_with_recipients(
+        Briefing.objects.filter(id__in=briefing_ids, status=Briefing.Status.SENDING)
+    ))
+    if not briefings:
+        return 0, 0
+    return record_results(briefings, deliver_briefings(briefings), user=user)
+
+
+def portal_user_ids(briefing) -> list:
+    """Portal users who can see a briefing - the client, or active household members"""
+    if briefing.client_id:
+        clients = [briefing.client]
+    elif briefing.household_id:
+        clients = [c for c in briefing.household.clients.all() if c.is_active]
+    else:
+        clients = []
+    return [c.user_id for c in clients if c.portal_enabled and c.user_id]
+
+
+def record_results(briefings, results, user=None):
+    """Transition statuses, write audit events and notify portal users in bulk"""
+    now = timezone.now()
+    sent_ids = [b.pk for b in briefings if results.get(b.pk) is None]
+    failed_ids = [b.pk for b in briefings if results.get(b.pk) is not None]
+
+    events = []
+    for briefing in briefings:
+        error = results.get(briefing.pk)
+        data = {
+            'status': 'failed' if error else 'sent',
+            'delivery_method': briefing.delivery_method,
+        }
+        if error:
+            data['error'] = error
+        events.append(AuditEvent.build(
+            event_type=AuditEvent.EventType.COMM_BRIEFING_SENT,
+            user=user,
+            target=briefing,
+            client_id=briefing.client_id,
+            household_id=briefing.household_id,
+            severity='error' if error else 'info',
+            data=data,
+        ))
+
+    with transaction.atomic():
+        if sent_ids:
+            Briefing.objects.filter(id__in=sent_ids).update(
+                status=Briefing.Status.SENT,
+                sent_at=now,
+                updated_at=now,
+            )
+        if failed_ids:
+            Briefing.objects.filter(id__in=failed_ids).update(
+                status=Briefing.Status.FAILED,
+                updated_at=now,
+            )
+        AuditEvent.bulk_log(events)
+
+        create_notifications([
+            Notification(
+                user_id=user_id,
+                title='New briefing available',
+                message=briefing.subject,
+                notification_type=Notification.NotificationType.INFO,
+            )
+            for briefing in briefings if results.get(briefing.pk) is None
+            for user_id in portal_user_ids(briefing)
+        ])
+
+    for briefing in briefings:
+        if results.get(briefing.pk) is None:
+            briefing.status, briefing.sent_at = Briefing.Status.SENT, now
+        else:
+            briefing.status = Briefing.Status.FAILED
+
+    return len(sent_ids), len(failed_ids)
+
+
+def dispatch_due_briefings(limit: int = None):
+    """Claim, deliver and record one batch; returns (sent, failed)"""
+    briefings = claim_due_briefings(limit)
+    if not briefings:
+        return 0, 0
+
+    results = deliver_briefings(briefings)
+    sent, failed = record_results(briefings, results)
+    logger.info(f"DISPATCH: batch done | sent={sent} | failed={failed}")
+    return sent, failed
+
+
+def next_scheduled_at():
+    """Earliest future send time - one indexed MIN() query"""
+    return Briefing.objects.filter(
+        status=Briefing.Status.APPROVED,
+        scheduled_for__isnull=False,
+    ).aggregate(next_send=Min('scheduled_for'))['next_send']
+
+
+class BriefingDispatcher:
+    """
+    Dispatch worker loop
+
+    Drains due briefings batch by batch, then sleeps until the next
+    scheduled_for (capped). Run several processes to scale throughput;
+    SKIP LOCKED keeps their batches disjoint.
+    """
+
+    def __init__(self, max_sleep: float = None):
+        self.max_sleep = max_sleep or _setting('BRIEFING_DISPATCH_MAX_SLEEP', 30)
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        total_sent = total_failed = 0
+        while not self._stop.is_set():
+            sent, failed = dispatch_due_briefings()
+            if not sent and not failed:
+                break
+            total_sent += sent
+            total_failed += failed
+        return total_sent, total_failed
+
+    def seconds_until_next(self) -> float:
+        next_send = next_scheduled_at()
+        if next_send is None:
+            return self.max_sleep
+        delay = (next_send - timezone.now()).total_seconds()
+        return min(max(delay, 0), self.max_sleep)
+
+    def run_forever(self):
+        logger.info('DISPATCH: started')
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                delay = self.seconds_until_next()
+            except Exception:
+                logger.exception('DISPATCH: tick failed')
+                delay = self.max_sleep
+            close_old_connections()
+            self._stop.wait(delay)
+        logger.info('DISPATCH: stopped')
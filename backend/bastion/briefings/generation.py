@@ -0,0 +1,363 @@
+"""
+Bulk Briefing Generation
+Renders one briefing per household from a template in a single job
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from bastion.audit.models import AuditEvent
+from bastion.core.dashboard import invalidate_dashboard_stats
+from bastion.core.models import Household, RiskSnapshot, User
+from .models import Briefing, BriefingBatch, Notification
+from .notifications import notify_users
+from .rendering import render_markdown_many
+from .templating import get_compiled_template
+
+logger = logging.getLogger('bastion.briefings')
+
+# Household lookups accepted for TargetType.FILTER
+TARGET_FILTER_FIELDS = {
+    'name__icontains',
+    'clients__client_type',
+    'clients__risk_tolerance',
+    'clients__portal_enabled',
+    'clients__is_active',
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# =============================================================================
+# TARGETS & CONTEXT
+# =============================================================================
+
+def resolve_target_households(batch):
+    """Queryset of households targeted by a batch"""
+    queryset = Household.objects.all()
+
+    if batch.target_type == BriefingBatch.TargetType.HOUSEHOLDS:
+        return queryset.filter(id__in=batch.household_ids)
+
+    if batch.target_type == BriefingBatch.TargetType.FILTER:
+        lookups = {
+            key: value for key, value in (batch.target_filter or {}).items()
+            if key in TARGET_FILTER_FIELDS
+        }
+        return queryset.filter(**lookups).distinct()
+
+    return queryset
+
+
+def load_household_contexts(household_ids, batch):
+    """
+    Build template contexts for a chunk of households
+
+    Uses a fixed number of queries regardless of chunk size: one for the
+    households and their primary contacts, one for the two most recent
+    snapshots of each household.
+    """
+    households = list(
+        Household.objects.filter(id__in=household_ids)
+        .select_related('primary_contact')
+        .order_by('name')
+    )
+
+    snapshots = {}
+    recent = (
+        RiskSnapshot.objects.filter(household_id__in=household_ids)
+        .annotate(row=Window(
+            RowNumber(),
+            partition_by=[F('household_id')],
+            order_by=F('as_of_date').desc(),
+        ))
+        .filter(row__lte=2)
+        .values(
+            'household_id', 'row', 'as_of_date', 'total_value',
+            'equity_exposure', 'fixed_income_exposure', 'cash_exposure',
+            'alternative_exposure', 'risk_score', 'max_drawdown_ytd',
+        )
+    )
+    for snapshot in recent:
+        snapshots.setdefault(snapshot['household_id'], {})[snapshot['row']] = snapshot
+
+    static_context = {key: str(value) for key, value in (batch.extra_context or {}).items()}
+    period = batch.period_label or _format_period(batch.period_start, batch.period_end)
+
+    results = []
+    for household in households:
+        latest = snapshots.get(household.id, {}).get(1)
+        previous = snapshots.get(household.id, {}).get(2)
+        contact = household.primary_contact
+
+        change = _format_change(latest, previous)
+        context = {
+            **static_context,
+            'client_name': contact.full_name if contact else household.name,
+            'household_name': household.name,
+            'period': period,
+            'period_start': batch.period_start.isoformat() if batch.period_start else '',
+            'period_end': batch.period_end.isoformat() if batch.period_end else '',
+            'value_change': change,
+            'weekly_change': change,  # Name used by the weekly update template
+        }
+        context.update(_snapshot_context(latest))
+        results.append((household, context))
+
+    return results
+
+
+def _snapshot_context(snapshot):
+    if not snapshot:
+        return {
+            'as_of_date': '',
+            'portfolio_value': 'N/A',
+            'equity_exposure': '',
+            'fixed_income_exposure': '',
+            'cash_exposure': '',
+            'alternative_exposure': '',
+            'risk_score': '',
+            'max_drawdown_ytd': '',
+        }
+    return {
+        'as_of_date': snapshot['as_of_date'].isoformat(),
+        'portfolio_value': _format_currency(snapshot['total_value']),
+        'equity_exposure': _format_percent(snapshot['equity_exposure']),
+        'fixed_income_exposure': _format_percent(snapshot['fixed_income_exposure']),
+        'cash_exposure': _format_percent(snapshot['cash_exposure']),
+        'alternative_exposure': _format_percent(snapshot['alternative_exposure']),
+        'risk_score': snapshot['risk_score'] or '',
+        'max_drawdown_ytd': _format_percent(snapshot['max_drawdown_ytd']),
+    }
+
+
+def _format_currency(value):
+    return f"${Decimal(value):,.2f}"
+
+
+def _format_percent(value):
+    if value is None:
+        return ''
+    return f"{Decimal(value):.1f}%"
+
+
+def _format_change(latest, previous):
+    if not latest or not previous or not previous['total_value']:
+        return 'N/A'
+    change = (latest['total_value'] - previous['total_value']) / previous['total_value'] * 100
+    return f"{change:+.1f}%"
+
+
+def _format_period(start, end):
+    if start and end:
+        return f"{start:%b %d, %Y} - {end:%b %d, %Y}"
+    if end or start:
+        return f"{(end or start):%b %d, %Y}"
+    return ''
+
+
+# =============================================================================
+# RENDERING
+# =============================================================================
+
+@contextmanager
+def _render_pool(total):
+    """
+    Process pool for Markdown conversion, or None to render inline
+
+    Small batches don't amortize pool startup. Daemonic processes cannot
+    start children, so Celery prefork children render inline; batches
+    are routed to BRIEFING_GENERATION_QUEUE, whose worker runs the
+    threads (or solo) pool and so can start one.
+    """
+    processes = _setting('BRIEFING_RENDER_PROCESSES', 4)
+    threshold = _setting('BRIEFING_RENDER_POOL_THRESHOLD', 200)
+
+    if processes <= 1 or total < threshold:
+        yield None
+        return
+    if multiprocessing.current_process().daemon:
+        logger.warning(
+            f"BATCH: rendering {total} briefings inline in a daemonic worker; run the "
+            f"{_setting('BRIEFING_GENERATION_QUEUE', 'briefing-generation')} queue with --pool=threads"
+        )
+        yield None
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        yield pool
+
+
+def render_contexts(template, contexts, pool=None):
+    """
+    Render (subject, body_markdown, body_html) for each context
+
+    Templates render inline from the compiled cache; Markdown goes
+    through the content-hash cache so identical bodies convert once and
+    only distinct misses are sent to the pool.
+    """
+    compiled = get_compiled_template(template)
+    rendered = [compiled.render(context) for context in contexts]
+    html = render_markdown_many([body for _, body in rendered], pool=pool)
+    return [
+        (subject, body_markdown, body_html)
+        for (subject, body_markdown), body_html in zip(rendered, html)
+    ]
+
+
+# =============================================================================
+# BATCH EXECUTION
+# =============================================================================
+
+def run_briefing_batch(batch_id):
+    """
+    Execute a briefing batch
+
+    Households are processed in chunks; each chunk is loaded, rendered,
+    and written (briefings, attachment links, audit events) with a
+    constant number of queries inside its own transaction. Progress is
+    stored on the batch so the API can report it while the job runs.
+    """
+    # Claim the batch in one conditional UPDATE so only one worker runs it
+    now = timezone.now()
+    claimed = BriefingBatch.objects.filter(pk=batch_id, status=BriefingBatch.Status.PENDING).update(
+        status=BriefingBatch.Status.RUNNING, started_at=now, updated_at=now
+    )
+    batch = BriefingBatch.objects.select_related('template', 'created_by').get(pk=batch_id)
+    if not claimed:
+        logger.warning(f"BATCH: {batch.pk} already {batch.status}, skipping")
+        return batch
+
+    household_ids = list(resolve_target_households(batch).values_list('id', flat=True))
+    batch.total_count = len(household_ids)
+    batch.save(update_fields=['total_count', 'updated_at'])
+
+    chunk_size = _setting('BRIEFING_BATCH_CHUNK_SIZE', 500)
+    errors = []
+
+    with _render_pool(len(household_ids)) as pool:
+        for start in range(0, len(household_ids), chunk_size):
+            chunk = household_ids[start:start + chunk_size]
+            try:
+                created = _process_chunk(batch, chunk, pool)
+                failed = 0
+            except Exception as exc:
+                logger.exception(f"BATCH: {batch.pk} chunk at {start} failed")
+                errors.append({'offset': start, 'count': len(chunk), 'error': str(exc)[:500]})
+                created, failed = 0, len(chunk)
+
+            BriefingBatch.objects.filter(pk=batch.pk).update(
+                processed_count=F('processed_count') + len(chunk),
+                created_count=F('created_count') + created,
+                failed_count=F('failed_count') + failed,
+                updated_at=timezone.now(),
+            )
+
+    batch.refresh_from_db()
+    batch.errors = errors
+    batch.completed_at = timezone.now()
+    if household_ids and batch.created_count == 0:
+        batch.status = BriefingBatch.Status.FAILED
+    else:
+        batch.status = BriefingBatch.Status.COMPLETED
+    batch.save(update_fields=['errors', 'completed_at', 'status', 'updated_at'])
+    # Briefings were bulk-inserted without save signals
+    invalidate_dashboard_stats()
+
+    logger.info(
+        f"BATCH: {batch.pk} {batch.status} | created={batch.created_count} | "
+        f"failed={batch.failed_count}"
+    )
+    notify_batch_finished(batch)
+    return batch
+
+
+def notify_batch_finished(batch):
+    """Tell advisors (active staff) and the batch creator that a batch is done"""
+    failed = batch.status == BriefingBatch.Status.FAILED
+    advisors = User.objects.filter(is_active=True).filter(
+        Q(is_staff=True) | Q(pk=batch.created_by_id)
+    )
+    notify_users(
+        advisors,
+        title=f"Briefing batch {'failed' if failed else 'completed'}: {batch.template.name}",
+        message=(
+            f"{batch.created_count} briefings created, {batch.failed_count} failed "
+            f"out of {batch.total_count} households."
+        ),
+        notification_type=(
+            Notification.NotificationType.ALERT if failed
+            else Notification.NotificationType.SUCCESS
+        ),
+        link='/hub/briefings',
+        link_text='Review briefings',
+    )
+
+
+def _process_chunk(batch, household_ids, pool):
+    template = batch.template
+    entries = load_household_contexts(household_ids, batch)
+    if not entries:
+        return 0
+
+    rendered = render_contexts(template, [context for _, context in entries], pool)
+
+    status = (
+        Briefing.Status.PENDING_REVIEW if template.requires_approval
+        else Briefing.Status.APPROVED
+    )
+
+    briefings = []
+    for (household, _), (subject, body_markdown, body_html) in zip(entries, rendered):
+        briefings.append(Briefing(
+            title=f"{template.name} - {household.name}"[:255],
+            subject=subject[:500],
+            household=household,
+            template=template,
+            batch=batch,
+            body_markdown=body_markdown,
+            body_html=body_html,
+            status=status,
+            delivery_method=batch.delivery_method,
+            scheduled_for=batch.scheduled_for,
+            created_by=batch.created_by,
+            period_start=batch.period_start,
+            period_end=batch.period_end,
+        ))
+
+    Attachment = Briefing.attachments.through
+    links = [
+        Attachment(briefing_id=briefing.pk, document_id=document_id)
+        for briefing in briefings
+        for document_id in batch.attachment_ids
+    ]
+
+    events = [
+        AuditEvent.build(
+            event_type=AuditEvent.EventType.COMM_BRIEFING_SENT,
+            user=batch.created_by,
+            target=briefing,
+            household_id=briefing.household_id,
+            data={'status': 'created', 'batch_id': str(batch.pk)},
+        )
+        for briefing in briefings
+    ]
+
+    with transaction.atomic():
+        Briefing.objects.bulk_create(briefings, batch_size=500)
+        if links:
+            Attachment.objects.bulk_create(links, batch_size=1000)
+        AuditEvent.bulk_log(events)
+
+    return len(briefings)
@@ -0,0 +1,33 @@
+"""
+Management command to check current risk snapshots against the outreach triggers
+"""
+
+from django.core.management.base import BaseCommand
+from bastion.briefings.triggers import evaluate_triggers
+
+
+class Command(BaseCommand):
+    help = 'Raises outreach alerts for clients and households past an active trigger threshold'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--client',
+            action='append',
+            default=None,
+            help='Only this client (repeatable)'
+        )
+        parser.add_argument(
+            '--household',
+            action='append',
+            default=None,
+            help='Only this household (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        clients, households = options['client'], options['household']
+        if clients or households:
+            # Limiting to one target type skips the other
+            clients, households = clients or [], households or []
+
+        alerts = evaluate_triggers(client_ids=clients, household_ids=households)
+        self.stdout.write(self.style.SUCCESS(f'Raised {len(alerts)} outreach alerts'))
@@ -0,0 +1,38 @@
+"""
+Management command to run a briefing dispatch worker
+"""
+
+import signal
+from django.core.management.base import BaseCommand
+from bastion.briefings.dispatch import BriefingDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Delivers approved briefings when their scheduled time arrives'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver everything currently due and exit'
+        )
+        parser.add_argument(
+            '--max-sleep',
+            type=float,
+            default=None,
+            help='Maximum seconds between wakeups'
+        )
+
+    def handle(self, *args, **options):
+        dispatcher = BriefingDispatcher(max_sleep=options['max_sleep'])
+
+        if options['once']:
+            sent, failed = dispatcher.run_once()
+            self.stdout.write(self.style.SUCCESS(f'Sent {sent} briefings ({failed} failed)'))
+            return
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: dispatcher.stop())
+
+        self.stdout.write('Briefing dispatcher running (Ctrl+C to stop)...')
+        dispatcher.run_forever()
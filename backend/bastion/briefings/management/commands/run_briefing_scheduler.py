@@ -0,0 +1,38 @@
+"""
+Management command to run the briefing scheduler loop
+"""
+
+import signal
+from django.core.management.base import BaseCommand
+from bastion.briefings.scheduler import BriefingScheduler
+
+
+class Command(BaseCommand):
+    help = 'Runs the scheduler that fires BriefingTemplate.schedule_cron runs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Fire any due templates and exit'
+        )
+        parser.add_argument(
+            '--max-sleep',
+            type=float,
+            default=None,
+            help='Maximum seconds between wakeups'
+        )
+
+    def handle(self, *args, **options):
+        scheduler = BriefingScheduler(max_sleep=options['max_sleep'])
+
+        if options['once']:
+            fired = scheduler.run_once()
+            self.stdout.write(self.style.SUCCESS(f'Fired {len(fired)} scheduled batches'))
+            return
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: scheduler.stop())
+
+        self.stdout.write('Briefing scheduler running (Ctrl+C to stop)...')
+        scheduler.run_forever()
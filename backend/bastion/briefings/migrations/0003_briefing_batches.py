@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('briefings', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BriefingBatch',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target_type', models.CharField(choices=[('all', 'All Households'), ('households', 'Selected Households'), ('filter', 'Filtered Households')], default='all', max_length=20)),
+                ('household_ids', models.JSONField(blank=True, default=list)),
+                ('target_filter', models.JSONField(blank=True, default=dict)),
+                ('period_label', models.CharField(blank=True, max_length=100)),
+                ('period_start', models.DateField(blank=True, null=True)),
+                ('period_end', models.DateField(blank=True, null=True)),
+                ('extra_context', models.JSONField(blank=True, default=dict)),
+                ('attachment_ids', models.JSONField(blank=True, default=list)),
+                ('delivery_method', models.CharField(default='portal', max_length=20)),
+                ('scheduled_for', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('processed_count', models.PositiveIntegerField(default=0)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_briefing_batches', to=settings.AUTH_USER_MODEL)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='batches', to='briefings.briefingtemplate')),
+            ],
+            options={
+                'verbose_name_plural': 'briefing batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='briefing',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='briefings', to='briefings.briefingbatch'),
+        ),
+    ]
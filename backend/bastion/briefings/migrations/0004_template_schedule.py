@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:05
+
+from django.db import migrations, models
+
+
+def schedule_existing_templates(apps, schema_editor):
+    from bastion.briefings.cron import CronError, next_run
+
+    BriefingTemplate = apps.get_model('briefings', 'BriefingTemplate')
+    for template in BriefingTemplate.objects.filter(is_active=True).exclude(schedule_cron=''):
+        try:
+            template.next_run_at = next_run(template.schedule_cron)
+        except CronError:
+            continue
+        template.save(update_fields=['next_run_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('briefings', '0003_briefing_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='briefingtemplate',
+            name='last_run_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='briefingtemplate',
+            name='next_run_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='briefingtemplate',
+            index=models.Index(condition=models.Q(('is_active', True), ('next_run_at__isnull', False)), fields=['next_run_at'], name='briefingtemplate_next_run'),
+        ),
+        migrations.RunPython(schedule_existing_templates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('briefings', '0004_template_schedule'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='briefing',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('pending_review', 'Pending Review'), ('approved', 'Approved'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='draft', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('briefings', '0005_briefing_sending_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='briefing',
+            name='open_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
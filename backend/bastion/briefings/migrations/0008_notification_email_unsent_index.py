@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('briefings', '0007_notification_unread_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('email_sent', False)), fields=['created_at', 'user'], name='notification_email_unsent'),
+        ),
+    ]
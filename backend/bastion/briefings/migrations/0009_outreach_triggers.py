@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_snapshot_series'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('briefings', '0008_notification_email_unsent_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutreachTrigger',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('metric', models.CharField(choices=[('drawdown', 'Drawdown'), ('max_drawdown_ytd', 'Max Drawdown YTD'), ('period_return', 'Period Return'), ('volatility', 'Volatility'), ('exposure_drift', 'Exposure Drift')], max_length=30)),
+                ('comparison', models.CharField(choices=[('lte', 'At or below'), ('gte', 'At or above')], max_length=3)),
+                ('threshold', models.DecimalField(decimal_places=4, max_digits=9)),
+                ('risk_tolerance', models.CharField(blank=True, max_length=50)),
+                ('action', models.CharField(choices=[('notify', 'Notify Advisors'), ('draft_briefing', 'Draft Market Alert')], default='notify', max_length=20)),
+                ('cooldown_days', models.PositiveIntegerField(default=7)),
+                ('is_active', models.BooleanField(default=True)),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outreach_triggers', to='core.client')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_outreach_triggers', to=settings.AUTH_USER_MODEL)),
+                ('household', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outreach_triggers', to='core.household')),
+                ('template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outreach_triggers', to='briefings.briefingtemplate')),
+            ],
+            options={
+                'ordering': ['metric', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutreachAlert',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('as_of_date', models.DateField()),
+                ('value', models.DecimalField(decimal_places=4, max_digits=9)),
+                ('briefing', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='briefings.briefing')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outreach_alerts', to='core.client')),
+                ('household', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outreach_alerts', to='core.household')),
+                ('trigger', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='briefings.outreachtrigger')),
+            ],
+            options={
+                'ordering': ['-as_of_date'],
+                'indexes': [models.Index(fields=['trigger', 'as_of_date'], name='outreach_alert_trigger_date')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='outreachalert',
+            constraint=models.UniqueConstraint(fields=('trigger', 'client', 'as_of_date'), name='outreach_alert_client_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='outreachalert',
+            constraint=models.UniqueConstraint(fields=('trigger', 'household', 'as_of_date'), name='outreach_alert_household_date'),
+        ),
+    ]
@@ -6,6 +6,7 @@ Automated and manual client communications
 from django.db import models
 from django.conf import settings
 from bastion.core.models import BaseModel, Client, Household
+from .cron import next_run
 
 
 class BriefingTemplate(BaseModel):
@@ -42,6 +43,8 @@ class BriefingTemplate(BaseModel):
 
     # Scheduling (for automated briefings)
     schedule_cron = models.CharField(max_length=100, blank=True)  # e.g., "0 9 * * 1" for Monday 9am
+    next_run_at = models.DateTimeField(null=True, blank=True, editable=False)  # Precomputed from schedule_cron
+    last_run_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     # Metadata
     created_by = models.ForeignKey(
@@ -53,10 +56,122 @@ class BriefingTemplate(BaseModel):
 
     class Meta:
         ordering = ['template_type', 'name']
+        indexes = [
+            # Scheduler reads only the earliest due active template
+            models.Index(
+                fields=['next_run_at'],
+                name='briefingtemplate_next_run',
+                condition=models.Q(is_active=True, next_run_at__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_template_type_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Deferred fields are absent from __dict__; avoid loading them here
+        instance._loaded_schedule = (
+            instance.__dict__.get('schedule_cron'),
+            instance.__dict__.get('is_active'),
+        )
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Recompute the next run only when the schedule itself changes
+        schedule = (self.schedule_cron, self.is_active)
+        if schedule != getattr(self, '_loaded_schedule', None):
+            self.next_run_at = self.compute_next_run()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'next_run_at'}
+        super().save(*args, **kwargs)
+        self._loaded_schedule = schedule
+
+    def compute_next_run(self, after=None):
+        """Next scheduled run, or None if unscheduled or inactive"""
+        if not self.schedule_cron or not self.is_active:
+            return None
+        return next_run(self.schedule_cron, after)
+
+
+class BriefingBatch(BaseModel):
+    """
+    Bulk generation job - renders one briefing per target household
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    class TargetType(models.TextChoices):
+        ALL = 'all', 'All Households'
+        HOUSEHOLDS = 'households', 'Selected Households'
+        FILTER = 'filter', 'Filtered Households'
+
+    template = models.ForeignKey(
+        BriefingTemplate,
+        on_delete=models.PROTECT,
+        related_name='batches'
+    )
+
+    # Targets
+    target_type = models.CharField(
+        max_length=20,
+        choices=TargetType.choices,
+        default=TargetType.ALL
+    )
+    household_ids = models.JSONField(default=list, blank=True)
+    target_filter = models.JSONField(default=dict, blank=True)
+
+    # Period reference
+    period_label = models.CharField(max_length=100, blank=True)
+    period_start = models.DateField(null=True, blank=True)
+    period_end = models.DateField(null=True, blank=True)
+
+    # Generation options
+    extra_context = models.JSONField(default=dict, blank=True)  # Static template variables
+    attachment_ids = models.JSONField(default=list, blank=True)
+    delivery_method = models.CharField(max_length=20, default='portal')
+    scheduled_for = models.DateTimeField(null=True, blank=True)
+
+    # Progress
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    total_count = models.PositiveIntegerField(default=0)
+    processed_count = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    # Metadata
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='created_briefing_batches'
+    )
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'briefing batches'
+
+    def __str__(self):
+        return f"{self.template.name} batch ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        if not self.total_count:
+            return 100 if self.status == self.Status.COMPLETED else 0
+        return round(self.processed_count * 100 / self.total_count)
+
 
 class Briefing(BaseModel):
     """
@@ -66,6 +181,7 @@ class Briefing(BaseModel):
         DRAFT = 'draft', 'Draft'
         PENDING_REVIEW = 'pending_review', 'Pending Review'
         APPROVED = 'approved', 'Approved'
+        SENDING = 'sending', 'Sending'
         SENT = 'sent', 'Sent'
         FAILED = 'failed', 'Failed'
 
@@ -102,6 +218,13 @@ class Briefing(BaseModel):
         blank=True,
         related_name='briefings'
     )
+    batch = models.ForeignKey(
+        BriefingBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='briefings'
+    )
 
     # Content
     body_markdown = models.TextField()  # Markdown content
@@ -130,6 +253,7 @@ class Briefing(BaseModel):
     scheduled_for = models.DateTimeField(null=True, blank=True)
     sent_at = models.DateTimeField(null=True, blank=True)
     opened_at = models.DateTimeField(null=True, blank=True)  # Email tracking
+    open_count = models.PositiveIntegerField(default=0, editable=False)
 
     # Provenance
     created_by = models.ForeignKey(
@@ -207,7 +331,148 @@ class Notification(BaseModel):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read']),
+            # Unread badge reconciliation and the unread list
+            models.Index(
+                fields=['user', 'created_at'],
+                name='notification_unread',
+                condition=models.Q(is_read=False),
+            ),
+            # Incremental digest scans only see notifications not yet emailed
+            models.Index(
+                fields=['created_at', 'user'],
+                name='notification_email_unsent',
+                condition=models.Q(email_sent=False),
+            ),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.user}"
+
+
+class OutreachTrigger(BaseModel):
+    """
+    Risk threshold that prompts client outreach when crossed
+    Scoped to one client or household, a risk-tolerance segment, or
+    everyone; per metric the most specific scope with a trigger wins
+    """
+    class Metric(models.TextChoices):
+        DRAWDOWN = 'drawdown', 'Drawdown'
+        MAX_DRAWDOWN_YTD = 'max_drawdown_ytd', 'Max Drawdown YTD'
+        PERIOD_RETURN = 'period_return', 'Period Return'
+        VOLATILITY = 'volatility', 'Volatility'
+        EXPOSURE_DRIFT = 'exposure_drift', 'Exposure Drift'
+
+    class Comparison(models.TextChoices):
+        AT_OR_BELOW = 'lte', 'At or below'
+        AT_OR_ABOVE = 'gte', 'At or above'
+
+    class Action(models.TextChoices):
+        NOTIFY = 'notify', 'Notify Advisors'
+        DRAFT_BRIEFING = 'draft_briefing', 'Draft Market Alert'
+
+    name = models.CharField(max_length=255)
+    metric = models.CharField(max_length=30, choices=Metric.choices)
+    comparison = models.CharField(max_length=3, choices=Comparison.choices)
+    threshold = models.DecimalField(max_digits=9, decimal_places=4)  # Percentage, e.g. -10 for drawdowns
+
+    # Scope (all empty = every client and household)
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outreach_triggers'
+    )
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outreach_triggers'
+    )
+    risk_tolerance = models.CharField(max_length=50, blank=True)  # Client segment
+
+    # Outcome
+    action = models.CharField(
+        max_length=20,
+        choices=Action.choices,
+        default=Action.NOTIFY
+    )
+    template = models.ForeignKey(
+        BriefingTemplate,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outreach_triggers'
+    )  # Defaults to the first active market alert template
+    cooldown_days = models.PositiveIntegerField(default=7)  # No repeat alert for a target within this window
+    is_active = models.BooleanField(default=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='created_outreach_triggers'
+    )
+
+    class Meta:
+        ordering = ['metric', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.get_metric_display()} {self.comparison} {self.threshold})"
+
+
+class OutreachAlert(BaseModel):
+    """
+    One trigger firing for one client or household snapshot
+    Kept to dedupe repeat alerts within the trigger's cooldown
+    """
+    trigger = models.ForeignKey(
+        OutreachTrigger,
+        on_delete=models.CASCADE,
+        related_name='alerts'
+    )
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outreach_alerts'
+    )
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outreach_alerts'
+    )
+    as_of_date = models.DateField()
+    value = models.DecimalField(max_digits=9, decimal_places=4)
+    briefing = models.ForeignKey(
+        Briefing,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        ordering = ['-as_of_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['trigger', 'client', 'as_of_date'],
+                name='outreach_alert_client_date'
+            ),
+            models.UniqueConstraint(
+                fields=['trigger', 'household', 'as_of_date'],
+                name='outreach_alert_household_date'
+            ),
+        ]
+        indexes = [
+            # Cooldown lookups: latest alert per trigger and target
+            models.Index(fields=['trigger', 'as_of_date'], name='outreach_alert_trigger_date'),
+        ]
+
+    def __str__(self):
+        target = self.client or self.household
+        return f"{self.trigger.name}: {target} ({self.as_of_date})"
@@ -0,0 +1,234 @@
+"""
+Notifications
+Unread counts and live updates for user notifications
+"""
+
+import logging
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import models, transaction
+
+from bastion.core.events import publish_many, publish_to_user, user_channel
+from .models import Notification
+
+logger = logging.getLogger('bastion.briefings')
+
+UNREAD_KEY_PREFIX = 'notifications:unread'
+
+# INCRBY only counters that exist; a missing counter is rebuilt on read.
+# Returns the new values, -1 where the counter was missing.
+_INCR_EXISTING = """
+local values = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        values[i] = redis.call('INCRBY', key, ARGV[i])
+    else
+        values[i] = -1
+    end
+end
+return values
+"""
+
+
+def _unread_key(user_id) -> str:
+    return f'{UNREAD_KEY_PREFIX}:{user_id}'
+
+
+def _unread_timeout() -> int:
+    return getattr(settings, 'NOTIFICATION_UNREAD_COUNT_TIMEOUT', 3600)
+
+
+def reconcile_unread_count(user_id) -> int:
+    """Recount from the database (partial unread index) and re-seed the cache"""
+    count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    cache.set(_unread_key(user_id), count, timeout=_unread_timeout())
+    return count
+
+
+def unread_count(user_id) -> int:
+    """
+    Unread count for the header badge
+
+    Served from a per-user cache counter; the database is only read to
+    reconcile a missing counter. The counter expires periodically so any
+    drift corrects itself.
+    """
+    count = cache.get(_unread_key(user_id))
+    if count is None:
+        count = reconcile_unread_count(user_id)
+    return count
+
+
+def adjust_unread_count(user_id, delta: int):
+    """
+    Apply a change to the unread counter once the transaction commits
+
+    A missing or negative counter is rebuilt from the database. Live
+    streams receive the new count.
+    """
+    def apply():
+        try:
+            count = cache.incr(_unread_key(user_id), delta)
+        except ValueError:
+            count = None
+        if count is None or count < 0:
+            count = reconcile_unread_count(user_id)
+        publish_unread_count(user_id, count)
+
+    if delta:
+        transaction.on_commit(apply)
+
+
+def _redis_client(backend):
+    """
+    The raw redis-py client behind Django's Redis cache, or None
+
+    Reached through a private attribute of RedisCache; anything else
+    (another backend, or a Django version without it) falls back to
+    per-key incr.
+    """
+    if not isinstance(backend, RedisCache):
+        return None
+    get_client = getattr(getattr(backend, '_cache', None), 'get_client', None)
+    if get_client is None:
+        return None
+    try:
+        return get_client(write=True)
+    except TypeError:
+        return None
+
+
+def increment_unread_counts(deltas: dict) -> dict:
+    """
+    Apply {user_id: delta} to many unread counters at once
+
+    On Redis this is a single script call; other cache backends fall
+    back to one incr per counter. Missing counters are left missing (the
+    next read reconciles them). Returns {user_id: new count} for the
+    counters that existed.
+    """
+    items = [(user_id, delta) for user_id, delta in deltas.items() if delta]
+    if not items:
+        return {}
+
+    backend = caches['default']
+    client = _redis_client(backend)
+    if client is not None:
+        keys = [backend.make_and_validate_key(_unread_key(user_id)) for user_id, _ in items]
+        values = client.eval(_INCR_EXISTING, len(keys), *keys, *[delta for _, delta in items])
+        return {
+            user_id: value for (user_id, _), value in zip(items, values) if value >= 0
+        }
+
+    counts = {}
+    for user_id, delta in items:
+        try:
+            counts[user_id] = cache.incr(_unread_key(user_id), delta)
+        except ValueError:
+            pass
+    return counts
+
+
+def notification_event(notification) -> dict:
+    """Stream payload for a new notification"""
+    return {
+        'id': str(notification.id),
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'link': notification.link,
+        'link_text': notification.link_text,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+def notification_created(notification):
+    """Count and publish a newly created notification"""
+    publish_to_user(notification.user_id, 'notification', notification_event(notification))
+    if not notification.is_read:
+        adjust_unread_count(notification.user_id, 1)
+
+
+def publish_unread_count(user_id, count: int = None):
+    if count is None:
+        count = unread_count(user_id)
+    publish_to_user(user_id, 'unread_count', {'count': count})
+
+
+def create_notifications(notifications, email: bool = False) -> list:
+    """
+    Insert prepared Notification objects and run their side effects in bulk
+
+    One INSERT per NOTIFICATION_FANOUT_CHUNK_SIZE rows. After commit the
+    unread counters are bumped in one call, and every recipient's stream
+    gets its notification and new count in one pipelined publish.
+    Notifications are normally emailed in the user's next digest; with
+    email=True they are queued for immediate delivery instead.
+    """
+    chunk_size = getattr(settings, 'NOTIFICATION_FANOUT_CHUNK_SIZE', 1000)
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(notifications, batch_size=chunk_size)
+
+        def after_commit():
+            unread = Counter(n.user_id for n in created if not n.is_read)
+            counts = increment_unread_counts(unread)
+            events = [
+                (user_channel(n.user_id), 'notification', notification_event(n))
+                for n in created
+            ]
+            events.extend(
+                (user_channel(user_id), 'unread_count', {'count': count})
+                for user_id, count in counts.items()
+            )
+            publish_many(events)
+
+            if email:
+                # Imported here: tasks imports the dispatch module, which uses this one
+                from .tasks import send_notification_emails
+                ids = [str(n.pk) for n in created]
+                for start in range(0, len(ids), chunk_size):
+                    send_notification_emails.delay(ids[start:start + chunk_size])
+
+        transaction.on_commit(after_commit)
+    return created
+
+
+def notify_users(recipients, title: str, message: str = '',
+                 notification_type: str = Notification.NotificationType.INFO,
+                 link: str = '', link_text: str = '', email: bool = False) -> int:
+    """
+    Fan one notification out to many users
+
+    recipients is a User queryset or an iterable of user ids; querysets
+    are streamed by primary key so memory stays flat. Each chunk is
+    inserted and committed on its own. Returns the number created.
+    """
+    if isinstance(recipients, models.QuerySet):
+        recipients = recipients.values_list('pk', flat=True).iterator(chunk_size=2000)
+    user_ids = iter(recipients)
+    chunk_size = getattr(settings, 'NOTIFICATION_FANOUT_CHUNK_SIZE', 1000)
+
+    total = 0
+    while True:
+        chunk = list(islice(user_ids, chunk_size))
+        if not chunk:
+            break
+        total += len(create_notifications([
+            Notification(
+                user_id=user_id,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+                link=link,
+                link_text=link_text,
+            )
+            for user_id in chunk
+        ], email=email))
+
+    logger.info(f"NOTIFY: fan-out done | title={title!r} | recipients={total}")
+    return total
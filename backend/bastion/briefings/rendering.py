@@ -0,0 +1,171 @@
+"""
+Briefing Markdown Rendering
+Content-addressed HTML cache with reusable Markdown parsers
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import markdown
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_EXTENSIONS = ('tables', 'fenced_code')
+CACHE_KEY_PREFIX = 'briefing_html'
+
+_local = threading.local()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def content_hash(text: str, extensions=DEFAULT_EXTENSIONS) -> str:
+    """Hash of the Markdown source and the extension set used to render it"""
+    digest = hashlib.sha256()
+    digest.update(','.join(sorted(extensions)).encode())
+    digest.update(b'\0')
+    digest.update(text.encode())
+    return digest.hexdigest()
+
+
+def _parser(extensions) -> markdown.Markdown:
+    """Thread-local Markdown parser per extension set - built once, reset per use"""
+    parsers = getattr(_local, 'parsers', None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    key = tuple(sorted(extensions))
+    parser = parsers.get(key)
+    if parser is None:
+        parser = parsers[key] = markdown.Markdown(extensions=list(key))
+    return parser
+
+
+def convert_many(texts, extensions=DEFAULT_EXTENSIONS) -> list:
+    """
+    Convert Markdown to HTML with one reused parser - no caching
+
+    Module-level so it can run in a worker process.
+    """
+    parser = _parser(extensions)
+    return [parser.reset().convert(text) for text in texts]
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class MarkdownRenderer:
+    """
+    Markdown to HTML rendering with two cache layers
+
+    Lookups go process LRU -> shared cache (Redis in production) ->
+    render. Keys are content hashes, so identical bodies - common in
+    templated weeks - render once across all processes.
+    """
+
+    def __init__(self, extensions=DEFAULT_EXTENSIONS):
+        self.extensions = tuple(extensions)
+        self.local = LRUCache(_setting('BRIEFING_MARKDOWN_CACHE_SIZE', 1024))
+
+    def _key(self, digest):
+        return f'{CACHE_KEY_PREFIX}:{digest}'
+
+    def render(self, text: str) -> str:
+        """Render a single Markdown document"""
+        return self.render_many([text])[0]
+
+    def render_many(self, texts, pool=None) -> list:
+        """
+        Render many documents, deduplicating by content
+
+        Each distinct body is looked up once; misses are fetched from the
+        shared cache in one get_many, and the remainder is converted either
+        inline or across the given process pool, then stored with one
+        set_many.
+        """
+        digests = [content_hash(text, self.extensions) for text in texts]
+        html_by_digest = {}
+        sources = {}
+
+        for digest, text in zip(digests, texts):
+            if digest in html_by_digest or digest in sources:
+                continue
+            html = self.local.get(digest)
+            if html is not None:
+                html_by_digest[digest] = html
+            else:
+                sources[digest] = text
+
+        if sources:
+            shared = cache.get_many([self._key(digest) for digest in sources])
+            for digest in list(sources):
+                html = shared.get(self._key(digest))
+                if html is not None:
+                    html_by_digest[digest] = html
+                    self.local.set(digest, html)
+                    del sources[digest]
+
+        if sources:
+            pending = list(sources.items())
+            converted = self._convert([text for _, text in pending], pool)
+            fresh = {}
+            for (digest, _), html in zip(pending, converted):
+                html_by_digest[digest] = html
+                self.local.set(digest, html)
+                fresh[self._key(digest)] = html
+            cache.set_many(fresh, timeout=_setting('BRIEFING_MARKDOWN_CACHE_TIMEOUT', 7 * 24 * 3600))
+
+        return [html_by_digest[digest] for digest in digests]
+
+    def _convert(self, texts, pool):
+        if pool is None or len(texts) < 2:
+            return convert_many(texts, self.extensions)
+
+        processes = _setting('BRIEFING_RENDER_PROCESSES', 4)
+        size = -(-len(texts) // processes)
+        futures = [
+            pool.submit(convert_many, texts[i:i + size], self.extensions)
+            for i in range(0, len(texts), size)
+        ]
+        converted = []
+        for future in futures:
+            converted.extend(future.result())
+        return converted
+
+
+renderer = MarkdownRenderer()
+
+
+def render_markdown(text: str) -> str:
+    """Render briefing Markdown to HTML"""
+    return renderer.render(text)
+
+
+def render_markdown_many(texts, pool=None) -> list:
+    """Render many briefing bodies, rendering each distinct body once"""
+    return renderer.render_many(texts, pool=pool)
@@ -0,0 +1,145 @@
+"""
+Briefing Scheduler
+Fires scheduled BriefingTemplates as bulk generation batches
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from bastion.audit.models import AuditEvent
+from .models import BriefingTemplate, BriefingBatch
+from .tasks import generate_briefing_batch
+
+logger = logging.getLogger('bastion.briefings')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def due_templates():
+    """Active scheduled templates whose next run has passed"""
+    return BriefingTemplate.objects.filter(
+        is_active=True,
+        next_run_at__isnull=False,
+        next_run_at__lte=timezone.now(),
+    ).order_by('next_run_at')
+
+
+def next_due_at():
+    """Earliest upcoming run across all templates - one indexed MIN() query"""
+    return BriefingTemplate.objects.filter(
+        is_active=True,
+        next_run_at__isnull=False,
+    ).aggregate(next_run=Min('next_run_at'))['next_run']
+
+
+def fire_due_templates(limit: int = 50):
+    """
+    Claim due templates and queue one batch per run
+
+    Safe to call from several scheduler processes at once. On Postgres
+    rows are locked with FOR UPDATE SKIP LOCKED so concurrent schedulers
+    skip each other's work; everywhere, the claim is a conditional
+    UPDATE on the observed next_run_at, so only one process can advance
+    a given run. Missed runs are coalesced into a single firing.
+    """
+    now = timezone.now()
+    batches = []
+
+    with transaction.atomic():
+        queryset = due_templates().select_related('created_by')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+
+        for template in queryset[:limit]:
+            scheduled_at = template.next_run_at
+            claimed = BriefingTemplate.objects.filter(
+                pk=template.pk,
+                next_run_at=scheduled_at,
+            ).update(
+                last_run_at=scheduled_at,
+                next_run_at=template.compute_next_run(max(now, scheduled_at)),
+            )
+            if not claimed:
+                continue
+
+            batch = BriefingBatch.objects.create(
+                template=template,
+                target_type=BriefingBatch.TargetType.ALL,
+                period_start=template.last_run_at.date() if template.last_run_at else None,
+                period_end=scheduled_at.date(),
+                created_by=template.created_by,
+            )
+            batches.append(batch)
+
+        if batches:
+            AuditEvent.bulk_log([
+                AuditEvent.build(
+                    event_type=AuditEvent.EventType.DATA_CREATE,
+                    target=batch,
+                    description='Scheduled briefing batch',
+                    data={
+                        'model': 'BriefingBatch',
+                        'template': str(batch.template_id),
+                        'trigger': 'schedule',
+                    },
+                )
+                for batch in batches
+            ])
+
+            batch_ids = [str(batch.pk) for batch in batches]
+            transaction.on_commit(
+                lambda: [generate_briefing_batch.delay(batch_id) for batch_id in batch_ids]
+            )
+
+    for batch in batches:
+        logger.info(f"SCHEDULER: fired {batch.template} | batch={batch.pk}")
+    return batches
+
+
+class BriefingScheduler:
+    """
+    Single lightweight scheduling loop
+
+    Sleeps until the earliest next_run_at instead of scanning every
+    template each minute. Sleep is capped so edits to schedules are
+    picked up within BRIEFING_SCHEDULER_MAX_SLEEP seconds.
+    """
+
+    def __init__(self, max_sleep: float = None):
+        self.max_sleep = max_sleep or _setting('BRIEFING_SCHEDULER_MAX_SLEEP', 60)
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def seconds_until_next(self) -> float:
+        next_run = next_due_at()
+        if next_run is None:
+            return self.max_sleep
+        delay = (next_run - timezone.now()).total_seconds()
+        return min(max(delay, 0), self.max_sleep)
+
+    def run_once(self):
+        fired = fire_due_templates()
+        # Release the connection between wakeups; the loop may sleep a long time
+        connection.close_if_unusable_or_obsolete()
+        return fired
+
+    def run_forever(self):
+        logger.info('SCHEDULER: started')
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                delay = self.seconds_until_next()
+            except Exception:
+                logger.exception('SCHEDULER: tick failed')
+                delay = self.max_sleep
+            self._stop.wait(delay)
+        logger.info('SCHEDULER: stopped')
@@ -0,0 +1,68 @@
+"""
+Briefing background tasks
+"""
+
+from celery import shared_task
+
+from django.contrib.auth import get_user_model
+
+from .delivery import deliver_notification_emails
+from .digest import send_digests
+from .dispatch import dispatch_due_briefings as _dispatch_due_briefings
+from .dispatch import send_claimed_briefings
+from .generation import run_briefing_batch
+from .tracking import flush_opens
+from .triggers import evaluate_triggers
+
+
+@shared_task
+def generate_briefing_batch(batch_id):
+    """Run a bulk briefing generation job"""
+    batch = run_briefing_batch(batch_id)
+    return {
+        'batch_id': str(batch.pk),
+        'status': batch.status,
+        'created': batch.created_count,
+        'failed': batch.failed_count,
+    }
+
+
+@shared_task
+def dispatch_due_briefings():
+    """Deliver one batch of approved briefings that have come due"""
+    sent, failed = _dispatch_due_briefings()
+    return {'sent': sent, 'failed': failed}
+
+
+@shared_task
+def send_briefings(briefing_ids, user_id=None):
+    """Deliver briefings claimed by the API send action"""
+    user = get_user_model().objects.filter(pk=user_id).first() if user_id else None
+    sent, failed = send_claimed_briefings(briefing_ids, user=user)
+    return {'sent': sent, 'failed': failed}
+
+
+@shared_task
+def send_notification_emails(notification_ids):
+    """Email notifications and mark them sent"""
+    sent, failed = deliver_notification_emails(notification_ids)
+    return {'sent': sent, 'failed': failed}
+
+
+@shared_task
+def flush_briefing_opens():
+    """Write accumulated email opens to the database"""
+    return {'updated': flush_opens()}
+
+
+@shared_task
+def send_notification_digests():
+    """Email each user one digest of their unsent notifications"""
+    sent, failed = send_digests()
+    return {'sent': sent, 'failed': failed}
+
+
+@shared_task
+def evaluate_outreach_triggers():
+    """Check every current risk snapshot against the outreach triggers"""
+    return {'alerts': len(evaluate_triggers())}
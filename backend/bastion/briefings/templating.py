@@ -0,0 +1,201 @@
+"""
+Briefing Template Engine
+Compiles {{variable}} templates once and renders them many times
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+
+
+PLACEHOLDER_RE = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}')
+VARIABLE_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class TemplateError(ValueError):
+    """Base error for briefing template problems"""
+
+
+class TemplateSyntaxError(TemplateError):
+    """Template contains a malformed placeholder"""
+
+
+class TemplateVariableError(TemplateError):
+    """Template references variables that are not declared or supplied"""
+
+    def __init__(self, message, variables=None):
+        super().__init__(message)
+        self.variables = sorted(variables or [])
+
+
+class _RenderContext(dict):
+    """Context mapping that renders unknown variables as empty strings"""
+
+    def __missing__(self, key):
+        return ''
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    A single template string compiled to a str.format_map pattern
+
+    Rendering is one C-level format call, so a compiled template can be
+    applied to thousands of contexts per second.
+    """
+    source: str
+    pattern: str
+    variables: frozenset
+
+    def render(self, context: dict, strict: bool = False) -> str:
+        if strict:
+            missing = self.variables - context.keys()
+            if missing:
+                raise TemplateVariableError(
+                    f"Missing template variables: {', '.join(sorted(missing))}",
+                    missing,
+                )
+        return self.pattern.format_map(_RenderContext(context))
+
+
+@dataclass(frozen=True)
+class CompiledBriefingTemplate:
+    """Compiled subject and body for a BriefingTemplate"""
+    subject: CompiledTemplate
+    body: CompiledTemplate
+
+    @property
+    def variables(self) -> frozenset:
+        return self.subject.variables | self.body.variables
+
+    def render(self, context: dict, strict: bool = False) -> tuple[str, str]:
+        """Render (subject, body_markdown) for one context"""
+        if strict:
+            missing = self.variables - context.keys()
+            if missing:
+                raise TemplateVariableError(
+                    f"Missing template variables: {', '.join(sorted(missing))}",
+                    missing,
+                )
+        return self.subject.render(context), self.body.render(context)
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    """
+    Compile a template string
+
+    Literal braces are escaped for str.format, and each {{name}} becomes
+    a {name} replacement field. Stray '{{' or '}}' are rejected so typos
+    don't silently leak into client communications.
+    """
+    parts = []
+    variables = set()
+    position = 0
+
+    for match in PLACEHOLDER_RE.finditer(source):
+        parts.append(_escape_literal(source[position:match.start()], position))
+        name = match.group(1)
+        variables.add(name)
+        parts.append('{' + name + '}')
+        position = match.end()
+
+    parts.append(_escape_literal(source[position:], position))
+
+    return CompiledTemplate(
+        source=source,
+        pattern=''.join(parts),
+        variables=frozenset(variables),
+    )
+
+
+def _escape_literal(text: str, offset: int) -> str:
+    for token in ('{{', '}}'):
+        index = text.find(token)
+        if index != -1:
+            raise TemplateSyntaxError(
+                f"Malformed placeholder near position {offset + index}: "
+                f"{text[index:index + 30]!r}"
+            )
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def validate_template(subject_template: str, body_template: str, available_variables) -> frozenset:
+    """
+    Validate template sources against the declared variables
+
+    Returns the set of variables used. Raises TemplateSyntaxError or
+    TemplateVariableError.
+    """
+    if not isinstance(available_variables, (list, tuple)):
+        raise TemplateVariableError('available_variables must be a list of names')
+
+    invalid = [
+        name for name in available_variables
+        if not isinstance(name, str) or not VARIABLE_NAME_RE.match(name)
+    ]
+    if invalid:
+        raise TemplateVariableError(
+            f"Invalid variable names: {', '.join(map(str, invalid))}",
+            map(str, invalid),
+        )
+
+    compiled = CompiledBriefingTemplate(
+        subject=compile_template(subject_template),
+        body=compile_template(body_template),
+    )
+
+    undeclared = compiled.variables - set(available_variables)
+    if undeclared:
+        raise TemplateVariableError(
+            f"Undeclared template variables: {', '.join(sorted(undeclared))}",
+            undeclared,
+        )
+
+    return compiled.variables
+
+
+class TemplateCache:
+    """
+    Process-local cache of compiled templates
+
+    Keyed by template id and validated against updated_at, so an edited
+    template is recompiled on next use and the stale entry is replaced.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, template) -> CompiledBriefingTemplate:
+        key = template.pk
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == template.updated_at:
+            return entry[1]
+
+        compiled = CompiledBriefingTemplate(
+            subject=compile_template(template.subject_template),
+            body=compile_template(template.body_template),
+        )
+        with self._lock:
+            self._entries[key] = (template.updated_at, compiled)
+        return compiled
+
+    def invalidate(self, template_id=None):
+        with self._lock:
+            if template_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(template_id, None)
+
+
+template_cache = TemplateCache()
+
+
+def get_compiled_template(template) -> CompiledBriefingTemplate:
+    """Get the compiled form of a BriefingTemplate"""
+    return template_cache.get(template)
+
+
+def render_briefing_template(template, context: dict, strict: bool = False) -> tuple[str, str]:
+    """Render (subject, body_markdown) for a BriefingTemplate"""
+    return get_compiled_template(template).render(context, strict=strict)
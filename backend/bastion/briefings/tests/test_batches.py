@@ -0,0 +1,53 @@
+"""
+Bulk briefing batch requests
+"""
+
+import uuid
+
+import pytest
+
+from bastion.api.serializers import BriefingBatchCreateSerializer
+from bastion.briefings.models import BriefingTemplate
+from bastion.core.models import Household
+from bastion.documents.models import Document
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def template():
+    return BriefingTemplate.objects.create(
+        name='Quarterly', template_type=BriefingTemplate.TemplateType.values[0],
+        subject_template='Update', body_template='Hello {{ household_name }}',
+    )
+
+
+def _document(**kwargs):
+    return Document.objects.create(
+        title='Outlook', file='documents/outlook.pdf', file_name='outlook.pdf',
+        file_type='application/pdf', **kwargs,
+    )
+
+
+def _errors(template, attachment_ids):
+    serializer = BriefingBatchCreateSerializer(data={
+        'template': str(template.pk), 'attachment_ids': [str(pk) for pk in attachment_ids],
+    })
+    return None if serializer.is_valid() else serializer.errors.get('attachment_ids')
+
+
+def test_firm_wide_documents_can_be_attached(template):
+    document = _document()
+    assert _errors(template, [document.pk, document.pk]) is None
+
+
+def test_unknown_and_inactive_documents_rejected(template):
+    archived = _document(status=Document.Status.ARCHIVED)
+    errors = _errors(template, [uuid.uuid4(), archived.pk])
+    assert 'Unknown or inactive documents' in str(errors)
+
+
+def test_household_documents_rejected(template):
+    household = Household.objects.create(name='Byron')
+    errors = _errors(template, [_document().pk, _document(household=household).pk])
+    assert 'Only firm-wide documents' in str(errors)
@@ -0,0 +1,22 @@
+"""
+Cron schedule parsing
+"""
+
+from datetime import datetime, timezone
+
+from bastion.briefings.cron import parse_cron
+
+
+def test_stepped_wildcard_day_does_not_restrict_weekday():
+    # Standard cron: a day field starting with '*' leaves only the weekday
+    # restriction, so this fires on every Monday, even-dated ones included
+    schedule = parse_cron('0 9 */2 * 1')
+    assert schedule.day_wildcard
+    after = datetime(2026, 10, 10, tzinfo=timezone.utc)  # Saturday
+    assert schedule.next_after(after).date() == datetime(2026, 10, 12).date()
+
+
+def test_restricted_day_and_weekday_fire_on_either():
+    schedule = parse_cron('0 9 15 * 1')
+    after = datetime(2026, 10, 13, tzinfo=timezone.utc)  # Tuesday
+    assert schedule.next_after(after).date() == datetime(2026, 10, 15).date()
@@ -0,0 +1,71 @@
+"""
+Bulk briefing and notification delivery, against a local aiosmtpd server
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bastion.briefings.delivery import deliver_notification_emails
+from bastion.briefings.dispatch import send_claimed_briefings
+from bastion.briefings.models import Briefing, Notification
+from bastion.core.models import Client, User
+
+pytestmark = pytest.mark.django_db
+
+
+def _updates(queries, table):
+    return [q['sql'] for q in queries if q['sql'].startswith(f'UPDATE "{table}"')]
+
+
+def test_notification_emails_marked_sent_in_one_update(smtp_server):
+    users = [User.objects.create_user(email=f'advisor{i}@example.com') for i in range(6)]
+    notifications = Notification.objects.bulk_create([
+        Notification(user=user, title='Drift alert', message='Rebalance needed')
+        for user in users
+    ])
+    smtp_server.responses['advisor5@example.com'] = ['550 No such user']
+
+    with CaptureQueriesContext(connection) as queries:
+        sent, failed = deliver_notification_emails([n.pk for n in notifications])
+
+    assert (sent, failed) == (5, 1)
+    assert len(smtp_server.messages) == 5
+    assert len(_updates(queries, Notification._meta.db_table)) == 1
+    unsent = Notification.objects.filter(email_sent=False)
+    assert [n.user.email for n in unsent] == ['advisor5@example.com']
+    assert Notification.objects.filter(email_sent=True, email_sent_at__isnull=False).count() == 5
+
+    # Already emailed notifications are skipped on retry
+    smtp_server.responses.clear()
+    assert deliver_notification_emails([n.pk for n in notifications]) == (1, 0)
+    assert len(smtp_server.messages) == 6
+
+
+def test_claimed_briefings_recorded_with_bulk_status_updates(smtp_server):
+    clients = [
+        Client.objects.create(first_name='Client', last_name=str(i), email=f'client{i}@example.com')
+        for i in range(8)
+    ]
+    briefings = Briefing.objects.bulk_create([
+        Briefing(
+            title='Quarterly review', subject='Your quarter', body_markdown='Summary',
+            client=client, status=Briefing.Status.SENDING,
+            delivery_method=Briefing.DeliveryMethod.EMAIL,
+        )
+        for client in clients
+    ])
+    smtp_server.responses['client0@example.com'] = ['451 Try again later']
+    smtp_server.responses['client7@example.com'] = ['550 Mailbox unavailable']
+
+    with CaptureQueriesContext(connection) as queries:
+        sent, failed = send_claimed_briefings([b.pk for b in briefings])
+
+    assert (sent, failed) == (7, 1)
+    # The transient refusal was retried; the permanent one was not
+    assert smtp_server.rcpt_attempts['client0@example.com'] == 2
+    assert smtp_server.rcpt_attempts['client7@example.com'] == 1
+    # One UPDATE for the sent briefings, one for the failed
+    assert len(_updates(queries, Briefing._meta.db_table)) == 2
+    assert Briefing.objects.filter(status=Briefing.Status.SENT, sent_at__isnull=False).count() == 7
+    assert Briefing.objects.get(status=Briefing.Status.FAILED).client == clients[7]
@@ -0,0 +1,23 @@
+"""
+Notification unread counters
+"""
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+
+from bastion.briefings import notifications
+
+
+def test_counters_incremented_per_key_without_redis():
+    cache.clear()
+    cache.set(notifications._unread_key('a'), 2)
+
+    assert notifications.increment_unread_counts({'a': 3, 'b': 1, 'c': 0}) == {'a': 5}
+    assert cache.get(notifications._unread_key('b')) is None
+
+
+def test_redis_cache_without_private_client_falls_back(monkeypatch):
+    backend = RedisCache('redis://localhost:6379/0', {})
+    monkeypatch.delattr(RedisCache, '_cache')
+
+    assert notifications._redis_client(backend) is None
@@ -0,0 +1,36 @@
+"""
+Email open-tracking pixel
+"""
+
+import uuid
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework.throttling import AnonRateThrottle
+from rest_framework.views import APIView
+
+from bastion.briefings import tracking
+
+pytestmark = pytest.mark.django_db
+
+
+def test_pixel_never_throttled_behind_a_shared_proxy(monkeypatch):
+    # What every other view gets from DEFAULT_THROTTLE_CLASSES outside tests
+    monkeypatch.setattr(APIView, 'throttle_classes', [AnonRateThrottle])
+    monkeypatch.setattr(AnonRateThrottle, 'THROTTLE_RATES', {'anon': '20/minute'})
+    cache.clear()
+    recorded = []
+    monkeypatch.setattr(
+        'bastion.api.views.briefings.record_open',
+        lambda briefing_id, fingerprint='': recorded.append(fingerprint),
+    )
+    briefing_id = str(uuid.uuid4())
+    url = f'/api/track/briefings/{tracking.tracking_token(briefing_id)}/open.gif'
+
+    client = APIClient()
+    for index in range(40):
+        response = client.get(url, REMOTE_ADDR='66.249.84.1', HTTP_USER_AGENT=f'GoogleImageProxy {index}')
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'image/gif'
+    assert len(recorded) == 40
@@ -0,0 +1,55 @@
+"""
+Outreach trigger evaluation
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from bastion.briefings import triggers
+from bastion.briefings.models import Notification, OutreachAlert, OutreachTrigger
+from bastion.core.models import Client, LatestRiskSnapshot, RiskSnapshot, User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def drawdown_client():
+    User.objects.create_user(email='advisor@example.com', is_staff=True)
+    client = Client.objects.create(first_name='Ada', last_name='Byron', email='ada@example.com')
+    snapshot = RiskSnapshot.objects.create(
+        client=client, as_of_date=date(2026, 3, 31), total_value=Decimal('1000000'),
+        equity_exposure=60, fixed_income_exposure=30, cash_exposure=10,
+        max_drawdown_ytd=Decimal('-18.5'), data_source='Test', source_timestamp=timezone.now(),
+    )
+    LatestRiskSnapshot.objects.update_or_create(
+        client=client, defaults={'snapshot': snapshot, 'as_of_date': snapshot.as_of_date},
+    )
+    OutreachTrigger.objects.create(
+        name='Drawdown', metric=OutreachTrigger.Metric.MAX_DRAWDOWN_YTD,
+        comparison=OutreachTrigger.Comparison.AT_OR_BELOW, threshold=Decimal('-10'),
+        action=OutreachTrigger.Action.NOTIFY,
+    )
+    return client
+
+
+def test_crossed_threshold_raises_alert_and_notifies(drawdown_client):
+    [alert] = triggers.evaluate_triggers()
+
+    assert alert.client_id == drawdown_client.pk
+    assert alert.value == Decimal('-18.5000')
+    assert Notification.objects.filter(notification_type=Notification.NotificationType.ALERT).count() == 1
+    # Inside the cooldown nothing fires again
+    assert triggers.evaluate_triggers() == []
+
+
+def test_alert_raised_concurrently_is_not_fanned_out_twice(drawdown_client, monkeypatch):
+    triggers.evaluate_triggers()
+    # An evaluation that read the alerts before the first one committed
+    monkeypatch.setattr(triggers, '_recent_alerts', lambda *args: {})
+
+    assert triggers.evaluate_triggers() == []
+    assert OutreachAlert.objects.count() == 1
+    assert Notification.objects.count() == 1
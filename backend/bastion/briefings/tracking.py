@@ -0,0 +1,195 @@
+"""
+Briefing Open Tracking
+Cache-side accumulation of email opens, flushed to the database in batches
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Case, DateTimeField, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+from .models import Briefing
+
+logger = logging.getLogger('bastion.briefings')
+
+KEY_PREFIX = 'briefing_open'
+TOKEN_SALT = 'bastion.briefings.open'
+
+# 1x1 transparent GIF
+PIXEL = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04'
+    b'\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def tracking_token(briefing_id) -> str:
+    """Signed, opaque token identifying a briefing in a pixel URL"""
+    return signing.dumps(str(briefing_id), salt=TOKEN_SALT, compress=True)
+
+
+def briefing_for_token(token: str):
+    """Briefing id for a token, or None if it was tampered with"""
+    try:
+        return signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def tracking_pixel_url(briefing) -> str:
+    """Absolute pixel URL, or '' when BRIEFING_TRACKING_BASE_URL is unset"""
+    base_url = _setting('BRIEFING_TRACKING_BASE_URL', '')
+    if not base_url:
+        return ''
+    path = reverse('briefing-open-pixel', kwargs={'token': tracking_token(briefing.pk)})
+    return base_url.rstrip('/') + path
+
+
+def _interval() -> int:
+    return _setting('BRIEFING_OPEN_FLUSH_INTERVAL', 60)
+
+
+def _bucket(at: float = None) -> int:
+    return int((at or time.time()) // _interval())
+
+
+def _key(*parts) -> str:
+    return ':'.join([KEY_PREFIX, *map(str, parts)])
+
+
+def record_open(briefing_id, fingerprint: str = '') -> bool:
+    """
+    Record one pixel fetch without touching the database
+
+    Repeat fetches from the same client (by fingerprint) within
+    BRIEFING_OPEN_DEDUPE_WINDOW are ignored. Otherwise the open is added
+    to the current time bucket: a per-briefing counter, the first open
+    time in the bucket, and - on the first open of that briefing in the
+    bucket - an entry in the bucket's briefing list. Returns False for a
+    deduplicated hit.
+    """
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+    if not cache.add(_key('seen', briefing_id, digest), 1,
+                     timeout=_setting('BRIEFING_OPEN_DEDUPE_WINDOW', 3600)):
+        return False
+
+    now = time.time()
+    bucket = _bucket(now)
+    ttl = _setting('BRIEFING_OPEN_RETENTION', 24 * 3600)
+
+    count_key = _key('count', bucket, briefing_id)
+    cache.add(count_key, 0, timeout=ttl)
+    cache.incr(count_key)
+
+    if cache.add(_key('first', bucket, briefing_id), now, timeout=ttl):
+        size_key = _key('size', bucket)
+        cache.add(size_key, 0, timeout=ttl)
+        index = cache.incr(size_key)
+        cache.set(_key('member', bucket, index), str(briefing_id), timeout=ttl)
+    return True
+
+
+def _collect(bucket):
+    """
+    Opens accumulated in one closed bucket
+
+    Returns ({briefing_id: (count, first_open)}, keys to delete once
+    the opens are written).
+    """
+    size = cache.get(_key('size', bucket))
+    if not size:
+        return {}, []
+
+    member_keys = [_key('member', bucket, index) for index in range(1, size + 1)]
+    briefing_ids = [pk for pk in cache.get_many(member_keys).values() if pk]
+
+    count_keys = {_key('count', bucket, pk): pk for pk in briefing_ids}
+    first_keys = {_key('first', bucket, pk): pk for pk in briefing_ids}
+    counts = cache.get_many(list(count_keys))
+    firsts = cache.get_many(list(first_keys))
+
+    opens = {}
+    for key, pk in count_keys.items():
+        first = firsts.get(_key('first', bucket, pk))
+        count = counts.get(key) or 0
+        if count and first:
+            opens[pk] = (count, first)
+
+    return opens, member_keys + list(count_keys) + list(first_keys) + [_key('size', bucket)]
+
+
+def apply_opens(opens: dict, batch_size: int = 500) -> int:
+    """
+    Write accumulated opens with one UPDATE per batch
+
+    open_count is incremented and opened_at set only where still empty,
+    so the earliest open survives across flushes.
+    """
+    items = list(opens.items())
+    updated = 0
+    for start in range(0, len(items), batch_size):
+        chunk = items[start:start + batch_size]
+        count_cases = [When(pk=pk, then=Value(count)) for pk, (count, _) in chunk]
+        first_cases = [
+            When(pk=pk, then=Value(datetime.fromtimestamp(first, tz=timezone.utc)))
+            for pk, (_, first) in chunk
+        ]
+        updated += Briefing.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+            open_count=F('open_count') + Case(
+                *count_cases, default=Value(0), output_field=IntegerField()
+            ),
+            opened_at=Coalesce(
+                'opened_at',
+                Case(*first_cases, default=None, output_field=DateTimeField()),
+            ),
+        )
+    return updated
+
+
+def flush_opens() -> int:
+    """
+    Flush all closed buckets to the database
+
+    The current bucket and the one before it are left alone so in-flight
+    hits land before their bucket is read. Each bucket is claimed with
+    cache.add, so concurrent flushers never apply it twice. Returns the
+    number of briefings updated.
+    """
+    current = _bucket()
+    lookback = _setting('BRIEFING_OPEN_RETENTION', 24 * 3600) // _interval()
+    start = max(cache.get(_key('flushed'), current - lookback), current - lookback)
+    closed = range(start + 1, current - 1)
+    if not closed:
+        return 0
+
+    sizes = cache.get_many([_key('size', bucket) for bucket in closed])
+    opens = {}
+    flushed_keys = []
+    for bucket in closed:
+        if not sizes.get(_key('size', bucket)):
+            continue
+        if not cache.add(_key('flushing', bucket), 1, timeout=_interval() * 10):
+            continue
+        bucket_opens, keys = _collect(bucket)
+        for pk, (count, first) in bucket_opens.items():
+            total, earliest = opens.get(pk, (0, first))
+            opens[pk] = (total + count, min(earliest, first))
+        flushed_keys.extend(keys)
+
+    updated = apply_opens(opens) if opens else 0
+    cache.delete_many(flushed_keys)
+    cache.set(_key('flushed'), closed[-1], timeout=None)
+    if not opens:
+        return 0
+    logger.info(f"TRACKING: flushed opens | briefings={updated} | opens={sum(c for c, _ in opens.values())}")
+    return updated
@@ -0,0 +1,350 @@
+"""
+Outreach Triggers
+Evaluates volatility and drawdown thresholds over current risk snapshots
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from bastion.audit.models import AuditEvent
+from bastion.core.analytics import update_snapshot_analytics
+from bastion.core.models import Client, Household, LatestRiskSnapshot, User
+from .generation import _format_percent, _snapshot_context, render_contexts
+from .models import Briefing, BriefingTemplate, Notification, OutreachAlert, OutreachTrigger
+from .notifications import create_notifications
+
+logger = logging.getLogger('bastion.briefings')
+
+METRICS = tuple(OutreachTrigger.Metric.values)
+_SNAPSHOT_FIELDS = (
+    'total_value', 'equity_exposure', 'fixed_income_exposure', 'cash_exposure',
+    'alternative_exposure', 'risk_score', 'max_drawdown_ytd',
+)
+
+# Scope precedence: a trigger for the target beats its segment's, which beats everyone's
+_TARGET, _SEGMENT, _EVERYONE = 3, 2, 1
+
+
+# =============================================================================
+# CURRENT SNAPSHOTS
+# =============================================================================
+
+def current_snapshots(client_ids=None, household_ids=None) -> dict:
+    """
+    Every target's current snapshot as arrays, metrics as floats
+
+    Read through the latest-snapshot pointers; inactive clients are left
+    out. Targets default to the whole book.
+    """
+    pointers = LatestRiskSnapshot.objects.filter(
+        Q(client__isnull=False, client__is_active=True) | Q(household__isnull=False)
+    )
+    floats = {name: Cast(F(f'snapshot__{name}'), FloatField()) for name in METRICS}
+    columns = ('client_id', 'household_id', 'as_of_date', 'client__risk_tolerance', *floats)
+
+    def read(queryset):
+        return list(queryset.annotate(**floats).values_list(*columns))
+
+    if client_ids is None and household_ids is None:
+        rows = read(pointers)
+    else:
+        rows = []
+        for field, ids in (('client_id', list(client_ids or ())), ('household_id', list(household_ids or ()))):
+            for start in range(0, len(ids), 1000):
+                rows.extend(read(pointers.filter(**{f'{field}__in': ids[start:start + 1000]})))
+
+    clients, households, dates, tolerances, *values = zip(*rows) if rows else ((),) * len(columns)
+    return {
+        'clients': np.array(clients, dtype=object),
+        'households': np.array(households, dtype=object),
+        'keys': np.array([c or h for c, h in zip(clients, households)], dtype=object),
+        'dates': np.array(dates, dtype='datetime64[D]'),
+        'tolerances': np.array([t or '' for t in tolerances], dtype=object),
+        'values': np.array(values, dtype=float).reshape(len(METRICS), len(rows)).T,
+    }
+
+
+# =============================================================================
+# EVALUATION
+# =============================================================================
+
+def _candidates(snapshots, triggers):
+    """
+    (row, trigger) pairs each trigger applies to, most specific scope only
+
+    Targets and segments are joined without comparing every trigger to
+    every row; the precedence is then resolved for all pairs at once.
+    """
+    count = len(snapshots['keys'])
+    rows_by_key = {key: row for row, key in enumerate(snapshots['keys'])}
+    rows, owners, levels = [], [], []
+    for index, trigger in enumerate(triggers):
+        if trigger.client_id or trigger.household_id:
+            row = rows_by_key.get(trigger.client_id or trigger.household_id)
+            matched, level = (np.array([row]) if row is not None else np.empty(0, dtype=int)), _TARGET
+        elif trigger.risk_tolerance:
+            matched, level = np.flatnonzero(snapshots['tolerances'] == trigger.risk_tolerance), _SEGMENT
+        else:
+            matched, level = np.arange(count), _EVERYONE
+        rows.append(matched)
+        owners.append(np.full(len(matched), index))
+        levels.append(np.full(len(matched), level))
+
+    rows = np.concatenate(rows).astype(int)
+    owners = np.concatenate(owners).astype(int)
+    levels = np.concatenate(levels).astype(int)
+    metrics = np.array([METRICS.index(t.metric) for t in triggers], dtype=int)[owners]
+
+    best = np.zeros((count, len(METRICS)), dtype=int)
+    np.maximum.at(best, (rows, metrics), levels)
+    keep = levels == best[rows, metrics]
+    return rows[keep], owners[keep], metrics[keep]
+
+
+def crossed(snapshots, triggers):
+    """(row, trigger index) pairs whose metric is past the threshold; missing metrics never fire"""
+    if not triggers or not len(snapshots['keys']):
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    rows, owners, metrics = _candidates(snapshots, triggers)
+    values = snapshots['values'][rows, metrics]
+    thresholds = np.array([float(t.threshold) for t in triggers])[owners]
+    below = np.array([t.comparison == OutreachTrigger.Comparison.AT_OR_BELOW for t in triggers])[owners]
+    with np.errstate(invalid='ignore'):
+        fired = np.where(below, values <= thresholds, values >= thresholds)
+    return rows[fired], owners[fired]
+
+
+def _recent_alerts(triggers, earliest) -> dict:
+    """Latest alert date per (trigger, target) inside the longest cooldown"""
+    window = max(t.cooldown_days for t in triggers)
+    latest = {}
+    alerts = OutreachAlert.objects.filter(
+        trigger__in=triggers, as_of_date__gte=earliest - timedelta(days=window)
+    ).values_list('trigger_id', 'client_id', 'household_id', 'as_of_date')
+    for trigger_id, client_id, household_id, as_of_date in alerts.iterator(chunk_size=5000):
+        key = (trigger_id, client_id or household_id)
+        latest[key] = max(latest.get(key, as_of_date), as_of_date)
+    return latest
+
+
+def evaluate_triggers(client_ids=None, household_ids=None) -> list:
+    """
+    Check the targets' current snapshots against every active trigger
+
+    One read of the current snapshots, one vectorized pass over all
+    (target, trigger) pairs, then alerts deduped against each trigger's
+    cooldown and bulk-inserted with their notifications or draft
+    briefings. Targets default to the whole book. Returns new alerts.
+    """
+    triggers = list(OutreachTrigger.objects.filter(is_active=True).select_related('template'))
+    if not triggers:
+        return []
+    snapshots = current_snapshots(client_ids, household_ids)
+    rows, owners = crossed(snapshots, triggers)
+    if not len(rows):
+        return []
+
+    recent = _recent_alerts(triggers, snapshots['dates'][rows].min().item())
+    alerts = []
+    for row, owner in zip(rows, owners):
+        trigger = triggers[owner]
+        as_of = snapshots['dates'][row].item()
+        last = recent.get((trigger.pk, snapshots['keys'][row]))
+        if last is not None and as_of - last < timedelta(days=max(trigger.cooldown_days, 1)):
+            continue
+        value = snapshots['values'][row, METRICS.index(trigger.metric)]
+        alerts.append(OutreachAlert(
+            trigger=trigger,
+            client_id=snapshots['clients'][row],
+            household_id=snapshots['households'][row],
+            as_of_date=as_of,
+            value=Decimal(str(float(np.clip(value, -99999, 99999)))).quantize(Decimal('0.0001')),
+        ))
+    if not alerts:
+        return []
+
+    with transaction.atomic():
+        alerts = _insert_alerts(alerts)
+        notify = [a for a in alerts if a.trigger.action == OutreachTrigger.Action.NOTIFY]
+        drafts = [a for a in alerts if a.trigger.action == OutreachTrigger.Action.DRAFT_BRIEFING]
+        names = _target_names(alerts)
+        if notify:
+            _notify_advisors(notify, names)
+        if drafts:
+            _draft_briefings(drafts, names)
+
+    logger.info(
+        f"TRIGGERS: evaluated | targets={len(snapshots['keys'])} | crossed={len(rows)} | "
+        f"alerts={len(alerts)} | notified={len(notify)} | drafted={len(drafts)}"
+    )
+    return alerts
+
+
+def _insert_alerts(alerts) -> list:
+    """
+    Insert alerts, returning only the ones this call created
+
+    A concurrent evaluation may have raised the same (trigger, target,
+    date) alert; the conflict is skipped, and so is its fan-out. Primary
+    keys are assigned before the insert, so the rows written here are
+    the ones whose keys read back.
+    """
+    OutreachAlert.objects.bulk_create(alerts, batch_size=1000, ignore_conflicts=True)
+    ids = [alert.pk for alert in alerts]
+    inserted = set()
+    for start in range(0, len(ids), 1000):
+        inserted.update(OutreachAlert.objects.filter(pk__in=ids[start:start + 1000]).values_list('pk', flat=True))
+    if len(inserted) < len(alerts):
+        logger.info(f"TRIGGERS: skipped alerts raised concurrently | count={len(alerts) - len(inserted)}")
+    return [alert for alert in alerts if alert.pk in inserted]
+
+
+# =============================================================================
+# OUTCOMES
+# =============================================================================
+
+def _target_names(alerts) -> dict:
+    client_ids = {a.client_id for a in alerts if a.client_id}
+    household_ids = {a.household_id for a in alerts if a.household_id}
+    names = {}
+    for pk, first, last, household_id in Client.objects.filter(pk__in=client_ids).values_list(
+        'pk', 'first_name', 'last_name', 'household_id'
+    ):
+        names[pk] = (f'{first} {last}', household_id)
+    for pk, name in Household.objects.filter(pk__in=household_ids).values_list('pk', 'name'):
+        names[pk] = (name, pk)
+    return names
+
+
+def _description(alert) -> str:
+    trigger = alert.trigger
+    return (
+        f"{trigger.get_metric_display()} {_format_percent(alert.value)} on {alert.as_of_date:%b %d, %Y} "
+        f"({trigger.get_comparison_display().lower()} {_format_percent(trigger.threshold)})"
+    )
+
+
+def _notify_advisors(alerts, names):
+    """One notification per alert for every active staff user"""
+    advisors = list(User.objects.filter(is_active=True, is_staff=True).values_list('pk', flat=True))
+    notifications = []
+    for alert in alerts:
+        name, _ = names.get(alert.client_id or alert.household_id, ('Unknown', None))
+        link = f'/hub/clients/{alert.client_id}' if alert.client_id else '/hub/risk'
+        notifications.extend(
+            Notification(
+                user_id=user_id,
+                title=f"{alert.trigger.name}: {name}"[:255],
+                message=_description(alert),
+                notification_type=Notification.NotificationType.ALERT,
+                link=link,
+                link_text='Review client' if alert.client_id else 'Review risk',
+            )
+            for user_id in advisors
+        )
+    create_notifications(notifications)
+
+
+def _draft_briefings(alerts, names):
+    """
+    Draft a market alert briefing per alert, left for an advisor to finish
+
+    Rendered from the trigger's template, or the first active market
+    alert template; alerts with neither are skipped.
+    """
+    fallback = BriefingTemplate.objects.filter(
+        template_type=BriefingTemplate.TemplateType.MARKET_ALERT, is_active=True
+    ).order_by('name').first()
+    snapshots = {
+        (pointer['client_id'] or pointer['household_id']): {
+            'as_of_date': pointer['as_of_date'],
+            **{field: pointer[f'snapshot__{field}'] for field in _SNAPSHOT_FIELDS},
+        }
+        for pointer in LatestRiskSnapshot.objects.filter(
+            Q(client_id__in=[a.client_id for a in alerts if a.client_id])
+            | Q(household_id__in=[a.household_id for a in alerts if a.household_id])
+        ).values('client_id', 'household_id', 'as_of_date', *(f'snapshot__{f}' for f in _SNAPSHOT_FIELDS))
+    }
+
+    by_template = {}
+    for alert in alerts:
+        template = alert.trigger.template or fallback
+        if template is None:
+            logger.warning(f"TRIGGERS: no market alert template | trigger={alert.trigger_id}")
+            continue
+        by_template.setdefault(template, []).append(alert)
+
+    briefings, events, drafted = [], [], []
+    for template, group in by_template.items():
+        contexts = []
+        for alert in group:
+            name, _ = names.get(alert.client_id or alert.household_id, ('', None))
+            context = _snapshot_context(snapshots.get(alert.client_id or alert.household_id))
+            contexts.append({
+                **context,
+                'client_name': name,
+                'household_name': name,
+                'alert_title': alert.trigger.name,
+                'alert_description': _description(alert),
+                'portfolio_impact': f"Portfolio value {context['portfolio_value']} as of {context['as_of_date']}",
+                'our_response': '',
+            })
+
+        for alert, (subject, body_markdown, body_html) in zip(group, render_contexts(template, contexts)):
+            name, household_id = names.get(alert.client_id or alert.household_id, ('', None))
+            alert.briefing = Briefing(
+                title=f"{template.name} - {name}"[:255],
+                subject=subject[:500],
+                household_id=household_id,
+                client_id=alert.client_id,
+                template=template,
+                body_markdown=body_markdown,
+                body_html=body_html,
+                status=Briefing.Status.DRAFT,
+            )
+            briefings.append(alert.briefing)
+            drafted.append(alert)
+            events.append(AuditEvent.build(
+                event_type=AuditEvent.EventType.COMM_BRIEFING_SENT,
+                target=alert.briefing,
+                client_id=alert.client_id,
+                household_id=household_id,
+                data={'status': 'created', 'trigger_id': str(alert.trigger_id)},
+            ))
+
+    Briefing.objects.bulk_create(briefings, batch_size=500)
+    AuditEvent.bulk_log(events)
+    OutreachAlert.objects.bulk_update(drafted, ['briefing'], batch_size=500)
+
+
+# =============================================================================
+# HOOKS
+# =============================================================================
+
+def evaluate_on_commit(snapshot):
+    """
+    Refresh the snapshot's metrics and evaluate its target on commit
+
+    Calls within one transaction collapse into one evaluation of every
+    target touched.
+    """
+    pending = getattr(connection, '_outreach_targets', None) or (set(), set())
+    (pending[0] if snapshot.client_id else pending[1]).add(snapshot.client_id or snapshot.household_id)
+    connection._outreach_targets = pending
+
+    def run():
+        targets = getattr(connection, '_outreach_targets', None)
+        connection._outreach_targets = None
+        if not targets:
+            return
+        client_ids, household_ids = (list(ids) for ids in targets)
+        update_snapshot_analytics(client_ids=client_ids, household_ids=household_ids)
+        evaluate_triggers(client_ids=client_ids, household_ids=household_ids)
+
+    transaction.on_commit(run)
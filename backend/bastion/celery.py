@@ -0,0 +1,14 @@
+"""
+Celery application for Bastion background work
+"""
+
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bastion.settings')
+
+app = Celery('bastion')
+
+# All CELERY_* settings are read from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,86 @@
+"""
+Shared pytest fixtures
+"""
+
+import asyncio
+import socket
+import threading
+from collections import defaultdict
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from bastion.core import mail
+
+
+class SMTPRecorder:
+    """
+    aiosmtpd handler recording what a local SMTP stand-in receives
+
+    `responses` maps a recipient to the RCPT replies to give, in order;
+    once they run out the recipient is accepted. `delay` holds each DATA
+    command open so overlapping sends can be observed.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.peers = set()
+        self.rcpt_attempts = defaultdict(int)
+        self.responses = {}
+        self.delay = 0.0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        self.rcpt_attempts[address] += 1
+        replies = self.responses.get(address)
+        if replies:
+            return replies.pop(0)
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            self.peers.add(session.peer)
+            self.messages.append(envelope)
+        finally:
+            with self._lock:
+                self.active -= 1
+        return '250 Message accepted for delivery'
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(settings):
+    """A local SMTP server, with the pooled backend pointed at it"""
+    recorder = SMTPRecorder()
+    controller = Controller(recorder, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+
+    settings.EMAIL_BACKEND = 'bastion.core.mail.PooledSMTPEmailBackend'
+    settings.EMAIL_HOST = controller.hostname
+    settings.EMAIL_PORT = controller.port
+    settings.EMAIL_HOST_USER = ''
+    settings.EMAIL_HOST_PASSWORD = ''
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_USE_SSL = False
+    settings.EMAIL_RETRY_BACKOFF = 0.05
+    try:
+        yield recorder
+    finally:
+        with mail._pools_lock:
+            pools, mail._pools = list(mail._pools.values()), {}
+        for pool in pools:
+            pool.close_all()
+        controller.stop()
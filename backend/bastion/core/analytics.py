@@ -0,0 +1,367 @@
+"""
+Risk Analytics
+Vectorized drawdown, volatility, drift and return metrics over snapshot histories
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F, FloatField, Q, Window
+from django.db.models.functions import Cast, RowNumber
+
+from .bulk import bulk_write
+from .models import Client, Household, RiskSnapshot
+
+logger = logging.getLogger('bastion.core')
+
+TARGETS = ('client', 'household')
+EXPOSURE_FIELDS = ('equity_exposure', 'fixed_income_exposure', 'cash_exposure', 'alternative_exposure')
+METRICS = ('drawdown', 'max_drawdown_ytd', 'period_return', 'volatility', 'exposure_drift')
+# Written to the snapshots; max_drawdown_ytd is the custodian's and left alone
+STORED_METRICS = ('drawdown', 'period_return', 'volatility', 'exposure_drift')
+
+# Written back with these precisions, clipped to the column ranges
+_COLUMNS = {
+    'drawdown': (Decimal('0.01'), 999),
+    'max_drawdown_ytd': (Decimal('0.01'), 999),
+    'period_return': (Decimal('0.0001'), 99999),
+    'volatility': (Decimal('0.0001'), 99999),
+    'exposure_drift': (Decimal('0.01'), 999),
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@dataclass
+class SnapshotHistory:
+    """
+    Snapshot histories of many targets as flat arrays
+
+    Rows are sorted by target then date; `group` is each row's target
+    index and `starts` the first row of every target.
+    """
+    targets: list
+    ids: np.ndarray
+    group: np.ndarray
+    starts: np.ndarray
+    dates: np.ndarray
+    values: np.ndarray
+    exposures: np.ndarray
+    stored: dict
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def ends(self) -> np.ndarray:
+        """Last row of every target"""
+        return np.append(self.starts[1:], len(self.values)) - 1
+
+
+def load_histories(target: str = 'client', ids=None, start=None, end=None, before: int = 0) -> SnapshotHistory:
+    """
+    Read the snapshot histories of many clients or households in one query
+
+    Values come back from the database as floats, so no Decimal objects
+    are built per row. `before` reads that many more rows of every target
+    ahead of `start`, for returns and windows reaching back past it.
+    """
+    field = f'{target}_id'
+    queryset = RiskSnapshot.objects.filter(**{f'{field}__isnull': False})
+    if ids is not None:
+        queryset = queryset.filter(**{f'{field}__in': list(ids)})
+    if start and before:
+        earlier = queryset.filter(as_of_date__lt=start).annotate(
+            _recency=Window(RowNumber(), partition_by=[F(field)], order_by=F('as_of_date').desc())
+        ).filter(_recency__lte=before).values('pk')
+        queryset = queryset.filter(Q(as_of_date__gte=start) | Q(pk__in=earlier))
+    elif start:
+        queryset = queryset.filter(as_of_date__gte=start)
+    if end:
+        queryset = queryset.filter(as_of_date__lte=end)
+
+    names = ('total_value', *EXPOSURE_FIELDS, *METRICS)
+    floats = {name: Cast(F(name), FloatField()) for name in names}
+    rows = list(
+        queryset.order_by(field, 'as_of_date')
+        .annotate(**{f'_{name}': expression for name, expression in floats.items()})
+        .values_list('id', field, 'as_of_date', *(f'_{name}' for name in floats))
+    )
+
+    count = len(rows)
+    columns = list(zip(*rows)) if rows else [()] * (3 + len(names))
+    keys = np.array(columns[1], dtype=object)
+    first = np.ones(count, dtype=bool)
+    if count:
+        first[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(first)
+
+    # None (NULL) becomes NaN
+    numbers = np.array(columns[3:], dtype=float).reshape(len(names), count)
+    return SnapshotHistory(
+        targets=list(keys[starts]),
+        ids=np.array(columns[0], dtype=object),
+        group=np.cumsum(first) - 1,
+        starts=starts,
+        dates=np.array(columns[2], dtype='datetime64[D]'),
+        values=numbers[0],
+        exposures=numbers[1:5].T,
+        stored=dict(zip(METRICS, numbers[5:] / 100)),
+    )
+
+
+# =============================================================================
+# METRICS
+# =============================================================================
+
+def _segment_ids(*keys) -> np.ndarray:
+    """Consecutive segment number for rows sorted by the given keys"""
+    change = np.zeros(len(keys[0]), dtype=bool)
+    if len(change):
+        change[0] = True
+        for key in keys:
+            change[1:] |= key[1:] != key[:-1]
+    return np.cumsum(change) - 1
+
+
+def segmented_accumulate(ufunc, values, segments) -> np.ndarray:
+    """
+    ufunc.accumulate restarted at every segment, without a Python loop
+
+    Each segment is shifted past the range of the one before it, so the
+    running maximum (or minimum) never carries over a boundary.
+    """
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return values.copy()
+    span = float(finite.max() - finite.min()) + 1.0
+    shift = segments * span * (1 if ufunc is np.maximum else -1)
+    return ufunc.accumulate(values + shift) - shift
+
+
+def period_returns(history: SnapshotHistory) -> np.ndarray:
+    """Fractional change since the target's previous snapshot; NaN on the first"""
+    returns = np.full(len(history), np.nan)
+    previous = history.values[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = np.where(previous > 0, history.values[1:] / previous - 1, np.nan)
+    returns[history.starts] = np.nan
+    return returns
+
+
+def drawdowns(history: SnapshotHistory):
+    """
+    Drawdown from the year-to-date peak, and its running worst
+
+    Peaks reset each calendar year. Values are compared in log space so
+    the segment shift stays well inside float precision.
+    """
+    years = history.dates.astype('datetime64[Y]').astype(int)
+    segments = _segment_ids(history.group, years)
+    logs = np.log(np.maximum(history.values, 1e-2))
+    peaks = segmented_accumulate(np.maximum, logs, segments)
+    drawdown = np.expm1(logs - peaks)
+    worst = segmented_accumulate(np.minimum, drawdown, segments)
+    return drawdown, worst
+
+
+def _trailing(history: SnapshotHistory, window: int) -> np.ndarray:
+    """Index of the first row in each row's trailing window, within its target"""
+    index = np.arange(len(history))
+    return np.maximum(index - window + 1, history.starts[history.group])
+
+
+def rolling_volatility(history: SnapshotHistory, returns: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sample standard deviation of the last `window` period returns
+
+    Window sums come from cumulative sums, so the cost is linear in the
+    number of rows whatever the window. NaN until two returns exist.
+    """
+    valid = np.isfinite(returns)
+    r = np.where(valid, returns, 0.0)
+    sums = np.concatenate(([0.0], np.cumsum(r)))
+    squares = np.concatenate(([0.0], np.cumsum(r * r)))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+
+    first = _trailing(history, window)
+    end = np.arange(1, len(history) + 1)
+    n = counts[end] - counts[first]
+    total = sums[end] - sums[first]
+    total_sq = squares[end] - squares[first]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (total_sq - total * total / n) / (n - 1)
+    return np.where(n >= 2, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+
+def exposure_drift(history: SnapshotHistory, lookback: int) -> np.ndarray:
+    """
+    Allocation change against the snapshot `lookback` observations back
+
+    Half the summed absolute change across asset classes, in percentage
+    points: the share of the portfolio that moved between classes.
+    """
+    baseline = _trailing(history, lookback + 1)
+    return np.abs(history.exposures - history.exposures[baseline]).sum(axis=1) / 2
+
+
+def compute_metrics(history: SnapshotHistory, window: int = None, lookback: int = None) -> dict:
+    """All per-snapshot metrics as fractional arrays, keyed as METRICS"""
+    window = window or _setting('RISK_VOLATILITY_WINDOW', 20)
+    lookback = lookback or _setting('RISK_DRIFT_LOOKBACK', 20)
+    returns = period_returns(history)
+    drawdown, worst = drawdowns(history)
+    return {
+        'drawdown': drawdown,
+        'max_drawdown_ytd': worst,
+        'period_return': returns,
+        'volatility': rolling_volatility(history, returns, window),
+        'exposure_drift': exposure_drift(history, lookback) / 100,
+    }
+
+
+# =============================================================================
+# SCANS AND WRITE-BACK
+# =============================================================================
+
+def _percent(value, column):
+    if value is None or not np.isfinite(value):
+        return None
+    quantum, limit = _COLUMNS[column]
+    return Decimal(str(float(np.clip(value * 100, -limit, limit)))).quantize(quantum)
+
+
+def _differs(values, stored, column) -> np.ndarray:
+    """Rows where a stored column would not round-trip from `values`"""
+    quantum, limit = _COLUMNS[column]
+    new = np.clip(values * 100, -limit, limit)
+    missing = np.isnan(new)
+    with np.errstate(invalid='ignore'):
+        close = np.abs(new - stored * 100) <= float(quantum) / 2 + 1e-9
+    return np.where(missing, ~np.isnan(stored), ~close)
+
+
+def series(target: str, target_id, start=None, end=None) -> list:
+    """
+    Per-snapshot metrics for one client or household
+
+    Computed over the target's full history up to `end`, so peaks and
+    windows before `start` still count.
+    """
+    history = load_histories(target, ids=[target_id], end=end)
+    metrics = compute_metrics(history)
+    start = np.datetime64(start, 'D') if start else None
+    points = []
+    for i in range(len(history)):
+        if start is not None and history.dates[i] < start:
+            continue
+        points.append({
+            'as_of_date': history.dates[i].item(),
+            'total_value': Decimal(str(history.values[i])).quantize(Decimal('0.01')),
+            **{name: _percent(metrics[name][i], name) for name in METRICS},
+        })
+    return points
+
+
+# Metrics where the most negative value is the worst
+_WORST_LOW = ('drawdown', 'max_drawdown_ytd', 'period_return')
+
+
+def scan(target: str = 'client', as_of=None, lookback_days: int = 365, order: str = 'max_drawdown_ytd',
+         limit: int = 100) -> list:
+    """
+    Book-wide risk scan: every target's metrics at its latest snapshot
+
+    One query loads the histories for the lookback period (extended to
+    January 1st so year-to-date drawdowns are complete); all metrics are
+    computed in vectorized form and the `limit` worst targets returned.
+    Targets with no snapshot inside the lookback are left out, and
+    `period_return` is the return over the lookback.
+    """
+    as_of = as_of or date.today()
+    start = np.datetime64(as_of, 'D') - np.timedelta64(lookback_days, 'D')
+    history = load_histories(target, start=min(start.item(), date(as_of.year, 1, 1)), end=as_of)
+    if not len(history):
+        return []
+
+    metrics = compute_metrics(history)
+    ends = history.ends
+    # First row inside the lookback for every target still reporting
+    rows = np.flatnonzero(history.dates >= start)
+    groups = history.group[rows]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = groups[1:] != groups[:-1]
+    active, opening = groups[first], rows[first]
+    closing = ends[active]
+
+    summary = {name: metrics[name][closing] for name in METRICS}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['period_return'] = np.where(
+            history.values[opening] > 0, history.values[closing] / history.values[opening] - 1, np.nan
+        )
+
+    # Worst first; missing values last
+    key = summary[order] if order in _WORST_LOW else -summary[order]
+    ranked = np.argsort(np.where(np.isfinite(key), key, np.inf), kind='stable')[:limit]
+
+    return [
+        {
+            'id': history.targets[active[i]],
+            'as_of_date': history.dates[closing[i]].item(),
+            'total_value': Decimal(str(history.values[closing[i]])).quantize(Decimal('0.01')),
+            **{name: _percent(summary[name][i], name) for name in METRICS},
+        }
+        for i in ranked
+    ]
+
+
+def update_snapshot_analytics(client_ids=None, household_ids=None, since=None) -> int:
+    """
+    Compute metrics over the histories and write them to the snapshots
+
+    Targets default to every client and household and are read 1000 at
+    a time. With `since`, only snapshots on or after it are written, and
+    histories are read from January 1st of its year (for the year-to-date
+    peaks) plus the rows the returns, volatility window and drift
+    lookback reach back to. Only rows whose stored values differ are
+    written. Returns rows updated.
+    """
+    window = _setting('RISK_VOLATILITY_WINDOW', 20)
+    lookback = _setting('RISK_DRIFT_LOOKBACK', 20)
+    start = date(since.year, 1, 1) if since else None
+    before = max(window, lookback) if since else 0
+    written_from = np.datetime64(since, 'D') if since else None
+
+    updated = 0
+    for target, ids in (('client', client_ids), ('household', household_ids)):
+        if ids is None:
+            ids = (Client if target == 'client' else Household).objects.order_by('pk').values_list('pk', flat=True)
+        ids = list(ids)
+        for offset in range(0, len(ids), 1000):
+            history = load_histories(target, ids=ids[offset:offset + 1000], start=start, before=before)
+            if not len(history):
+                continue
+            metrics = compute_metrics(history, window=window, lookback=lookback)
+
+            # Compare with the stored values before building any Decimals
+            differs = np.zeros(len(history), dtype=bool)
+            for name in STORED_METRICS:
+                differs |= _differs(metrics[name], history.stored[name], name)
+            if written_from is not None:
+                differs &= history.dates >= written_from
+
+            changed = [
+                RiskSnapshot(pk=history.ids[i], **{name: _percent(metrics[name][i], name) for name in STORED_METRICS})
+                for i in np.flatnonzero(differs)
+            ]
+            bulk_write(RiskSnapshot, changed, list(STORED_METRICS))
+            updated += len(changed)
+
+    logger.info(f"ANALYTICS: snapshot metrics written | since={since} | rows={updated}")
+    return updated
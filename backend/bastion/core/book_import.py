@@ -0,0 +1,319 @@
+"""
+Book Import
+Bulk onboarding of households, clients and accounts from a file
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+from django.db.models.functions import Lower
+
+from bastion.audit.models import AuditEvent
+from .bulk import bulk_insert
+from .dashboard import invalidate_dashboard_stats
+from .ingestion import _uuid, _value
+from .models import Account, Client, Household
+from .search import invalidate_typeahead
+
+logger = logging.getLogger('bastion.core')
+
+# One row per account, or per client without accounts. Columns:
+#   client     email (required), first_name, last_name, phone, client_type,
+#              risk_tolerance, time_horizon, notes
+#   household  household_id (existing) or household (name)
+#   account    account_number, account_name, account_type, custodian,
+#              custodian_account_id, opened_date
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    households: int = 0
+    clients: int = 0
+    accounts: int = 0
+    batches: int = 0
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+
+    def reject(self, line, error):
+        self.error_count += 1
+        if len(self.errors) < _setting('BOOK_IMPORT_MAX_REPORTED_ERRORS', 1000):
+            self.errors.append({'line': line, 'error': error})
+
+
+# =============================================================================
+# PARSING
+# =============================================================================
+
+def _text(row, model, name, column=None, required=False, default=''):
+    column = column or name
+    value = _value(row, column)
+    if value is None:
+        if required:
+            raise ValueError(f'{column} is required')
+        return default
+    value = str(value)
+    limit = model._meta.get_field(name).max_length
+    if limit and len(value) > limit:
+        raise ValueError(f'{column} is longer than {limit} characters')
+    return value
+
+
+def _choice(row, model, name, choices, required=False, default=''):
+    value = _text(row, model, name, required=required, default=default)
+    if value and value not in choices.values:
+        raise ValueError(f'{name} must be one of {", ".join(choices.values)}')
+    return value
+
+
+@dataclass
+class ImportRow:
+    """One validated record: a client, where it belongs, and optionally an account"""
+    line: int
+    client: Client
+    household_id: object = None
+    household_name: str = ''
+    account: Account = None
+
+
+def parse_row(line, row) -> ImportRow:
+    """Validate one record's columns into unsaved instances; raises ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError('Record is not an object')
+
+    email = _text(row, Client, 'email', required=True).lower()
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError('email is not a valid email address')
+
+    client = Client(
+        email=email,
+        first_name=_text(row, Client, 'first_name'),
+        last_name=_text(row, Client, 'last_name'),
+        phone=_text(row, Client, 'phone'),
+        client_type=_choice(row, Client, 'client_type', Client.ClientType, default=Client.ClientType.INDIVIDUAL),
+        risk_tolerance=_text(row, Client, 'risk_tolerance'),
+        time_horizon=_text(row, Client, 'time_horizon'),
+        notes=_text(row, Client, 'notes'),
+    )
+    record = ImportRow(
+        line=line,
+        client=client,
+        household_id=_uuid(row, 'household_id'),
+        household_name=_text(row, Household, 'name', column='household'),
+    )
+
+    account_number = _text(row, Account, 'account_number')
+    if account_number:
+        opened = _value(row, 'opened_date')
+        try:
+            opened_date = date.fromisoformat(str(opened)) if opened else None
+        except ValueError:
+            raise ValueError('opened_date must be YYYY-MM-DD')
+        record.account = Account(
+            account_number=account_number,
+            name=_text(row, Account, 'name', column='account_name', required=True),
+            account_type=_choice(row, Account, 'account_type', Account.AccountType, required=True),
+            custodian=_text(row, Account, 'custodian', default='Fidelity'),
+            custodian_account_id=_text(row, Account, 'custodian_account_id'),
+            opened_date=opened_date,
+        )
+    return record
+
+
+# =============================================================================
+# IMPORT
+# =============================================================================
+
+class BookImport:
+    """
+    Imports batches of records, keeping what earlier batches created
+
+    Rows for an email already imported add accounts to that client; its
+    client columns are then ignored. A `household` name reuses the one
+    existing household of that name (case-insensitive) or the household
+    an earlier row created, else creates it; `household_id` must name an
+    existing household.
+    """
+
+    def __init__(self, user=None, source_name: str = ''):
+        self.user = user
+        self.source_name = source_name
+        self.result = ImportResult()
+        self.clients = {}           # email -> Client created by this import
+        self.households = {}        # lower-case name -> household id, None if ambiguous
+        self.account_numbers = set()
+
+    def run(self, records, batch_size: int = None) -> ImportResult:
+        batch_size = batch_size or _setting('BOOK_IMPORT_BATCH_SIZE', 2000)
+        records = iter(records)
+        try:
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                self.result.batches += 1
+                self.result.rows += len(batch)
+                self.import_batch(batch)
+        finally:
+            # Rejections are recorded per check, not in file order
+            self.result.errors.sort(key=lambda error: error['line'])
+            # Also when the stream breaks off: earlier batches are committed
+            if self.result.households or self.result.clients or self.result.accounts:
+                # Bulk inserts bypass the save signals that keep these current
+                invalidate_dashboard_stats()
+                invalidate_typeahead()
+        logger.info(
+            f"BOOK_IMPORT: import finished | source={self.source_name} | rows={self.result.rows} | "
+            f"households={self.result.households} | clients={self.result.clients} | "
+            f"accounts={self.result.accounts} | rejected={self.result.error_count}"
+        )
+        return self.result
+
+    def _parse(self, batch) -> list:
+        parsed = []
+        for line, row, error in batch:
+            if error:
+                self.result.reject(line, error)
+                continue
+            try:
+                parsed.append(parse_row(line, row))
+            except ValueError as exc:
+                self.result.reject(line, str(exc))
+        return parsed
+
+    def _lookups(self, parsed):
+        """What the batch refers to that already exists: one query per kind"""
+        emails = {r.client.email for r in parsed} - self.clients.keys()
+        numbers = {r.account.account_number for r in parsed if r.account} - self.account_numbers
+        household_ids = {r.household_id for r in parsed if r.household_id}
+        names = {r.household_name.lower() for r in parsed if r.household_name} - self.households.keys()
+
+        taken_emails = set(Client.objects.filter(email__in=emails).values_list('email', flat=True)) if emails else set()
+        taken_numbers = set(
+            Account.objects.filter(account_number__in=numbers).values_list('account_number', flat=True)
+        ) if numbers else set()
+        known_households = set(
+            Household.objects.filter(pk__in=household_ids).values_list('pk', flat=True)
+        ) if household_ids else set()
+        if names:
+            for key, pk in Household.objects.annotate(key=Lower('name')).filter(key__in=names).values_list('key', 'pk'):
+                self.households[key] = None if key in self.households else pk
+        return taken_emails, taken_numbers, known_households
+
+    def import_batch(self, batch):
+        """
+        Validate a batch with set-based checks, then insert it in one transaction
+
+        Households, clients and accounts are inserted in that order, and
+        each with a data.create audit event. A batch that fails to write
+        is rejected as a whole and leaves nothing behind.
+        """
+        parsed = self._parse(batch)
+        taken_emails, taken_numbers, known_households = self._lookups(parsed)
+
+        households, clients, accounts, lines = {}, {}, [], []
+        new_numbers = set()
+        for record in parsed:
+            account = record.account
+            email = record.client.email
+            if account and account.account_number in taken_numbers:
+                self.result.reject(record.line, 'An account with this account_number already exists')
+                continue
+            if account and (account.account_number in self.account_numbers or account.account_number in new_numbers):
+                self.result.reject(record.line, 'Duplicate account_number in file')
+                continue
+
+            client = self.clients.get(email) or clients.get(email)
+            if client is None:
+                if email in taken_emails:
+                    self.result.reject(record.line, 'A client with this email already exists')
+                    continue
+                if not record.client.first_name or not record.client.last_name:
+                    self.result.reject(record.line, 'first_name and last_name are required for a new client')
+                    continue
+                client = record.client
+                if record.household_id:
+                    if record.household_id not in known_households:
+                        self.result.reject(record.line, 'Unknown household')
+                        continue
+                    client.household_id = record.household_id
+                elif record.household_name:
+                    key = record.household_name.lower()
+                    if key in self.households and self.households[key] is None:
+                        self.result.reject(record.line, 'More than one household has this name; use household_id')
+                        continue
+                    if key not in self.households and key not in households:
+                        households[key] = Household(name=record.household_name, created_by=self.user)
+                    client.household_id = self.households.get(key) or households[key].pk
+                clients[email] = client
+
+            if account:
+                account.client = client
+                account.household_id = client.household_id
+                accounts.append(account)
+                new_numbers.add(account.account_number)
+            lines.append(record.line)
+
+        if not lines:
+            return
+        try:
+            with transaction.atomic():
+                bulk_insert(Household, list(households.values()))
+                bulk_insert(Client, list(clients.values()))
+                bulk_insert(Account, accounts)
+                AuditEvent.bulk_log(self._audit_events(households.values(), clients.values(), accounts))
+        except DatabaseError as exc:
+            # Most likely a concurrent write taking an email or account number
+            logger.warning(f"BOOK_IMPORT: batch {self.result.batches} failed | error={exc}")
+            for line in lines:
+                self.result.reject(line, f'Batch {self.result.batches} could not be written: {str(exc)[:200]}')
+            return
+
+        self.households.update((key, household.pk) for key, household in households.items())
+        self.clients.update(clients)
+        self.account_numbers |= new_numbers
+        self.result.households += len(households)
+        self.result.clients += len(clients)
+        self.result.accounts += len(accounts)
+
+    def _audit_events(self, households, clients, accounts) -> list:
+        details = {'source': self.source_name}
+        return [
+            *(AuditEvent.build(
+                event_type=AuditEvent.EventType.DATA_CREATE, user=self.user, target=household,
+                household_id=household.pk, data={'model': 'Household', **details},
+            ) for household in households),
+            *(AuditEvent.build(
+                event_type=AuditEvent.EventType.DATA_CREATE, user=self.user, target=client,
+                client_id=client.pk, household_id=client.household_id, data={'model': 'Client', **details},
+            ) for client in clients),
+            *(AuditEvent.build(
+                event_type=AuditEvent.EventType.DATA_CREATE, user=self.user, target=account,
+                client_id=account.client_id, household_id=account.household_id, data={'model': 'Account', **details},
+            ) for account in accounts),
+        ]
+
+
+def import_book(records, user=None, source_name: str = '', batch_size: int = None) -> ImportResult:
+    """
+    Create households, clients and accounts from (line, row, error) records
+
+    Records come from ingestion.read_rows(). Each batch costs a fixed
+    handful of lookups (existing emails, account numbers and households,
+    checked as sets) plus bulk inserts, in its own transaction, so a bad
+    batch never rolls back the ones before it. Rejected rows are listed
+    by line in the result.
+    """
+    return BookImport(user=user, source_name=source_name).run(records, batch_size=batch_size)
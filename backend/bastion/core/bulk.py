@@ -0,0 +1,166 @@
+"""
+Bulk Writes
+COPY-based inserts on PostgreSQL, batched INSERTs elsewhere
+"""
+
+import csv
+import io
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+
+def _text_columns(fields) -> list:
+    # Empty strings in these columns must not be read back as NULL
+    return [
+        f.column for f in fields
+        if isinstance(f, (models.CharField, models.TextField)) and not f.null
+    ]
+
+
+def copy_insert(model, objects, table: str = None, fields=None):
+    """
+    Stream unsaved instances into a table with COPY (PostgreSQL only)
+
+    Values go through each field's get_db_prep_save(), and auto_now
+    timestamps are filled in as save() would. `table` defaults to the
+    model's own; pass a staging table with the same columns to load it
+    instead. `fields` limits the columns written. Meant for models with
+    scalar fields.
+    """
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in fields] if fields else list(model._meta.concrete_fields)
+    now = timezone.now()
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objects:
+        for f in fields:
+            if getattr(f, 'auto_now', False) or (getattr(f, 'auto_now_add', False) and not getattr(obj, f.attname)):
+                setattr(obj, f.attname, now)
+        row = (f.get_db_prep_save(getattr(obj, f.attname), connection) for f in fields)
+        writer.writerow(['' if value is None else value for value in row])
+    buffer.seek(0)
+
+    columns = ', '.join(quote(f.column) for f in fields)
+    options = 'FORMAT csv'
+    text_columns = _text_columns(fields)
+    if text_columns:
+        options += f", FORCE_NOT_NULL ({', '.join(quote(c) for c in text_columns)})"
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(table or model._meta.db_table)} ({columns}) FROM STDIN WITH ({options})',
+            buffer,
+        )
+
+
+def bulk_insert(model, objects, batch_size: int = 1000):
+    """Insert unsaved instances: COPY on PostgreSQL, bulk_create() elsewhere"""
+    if not objects:
+        return
+    if connection.vendor == 'postgresql':
+        copy_insert(model, objects)
+    else:
+        model.objects.bulk_create(objects, batch_size=batch_size)
+
+
+def copy_update(model, objects, fields):
+    """
+    Update `fields` on saved instances through a COPY-loaded staging table
+
+    One UPDATE ... FROM joins the staging rows on the primary key, instead
+    of the per-row CASE expressions bulk_update() builds (PostgreSQL only).
+    """
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    staging = f'{model._meta.db_table}_update'
+    pk = model._meta.pk
+    columns = [model._meta.get_field(name).column for name in fields]
+    assignments = ', '.join(f'{quote(c)} = s.{quote(c)}' for c in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {quote(staging)} ON COMMIT DROP AS '
+            f'SELECT {", ".join(quote(c) for c in (pk.column, *columns))} FROM {table} WITH NO DATA'
+        )
+        # auto_now is not applied to partial rows; only the named fields are written
+        copy_insert(model, objects, table=staging, fields=[pk.name, *fields])
+        cursor.execute(
+            f'UPDATE {table} SET {assignments} FROM {quote(staging)} s '
+            f'WHERE {table}.{quote(pk.column)} = s.{quote(pk.column)}'
+        )
+        cursor.execute(f'DROP TABLE {quote(staging)}')
+
+
+def bulk_write(model, objects, fields):
+    """
+    Update `fields` on saved instances: COPY and one UPDATE on PostgreSQL
+
+    Elsewhere one parameterized UPDATE per row through executemany(),
+    which avoids the CASE expressions bulk_update() builds - those grow
+    with the square of the batch.
+    """
+    if not objects:
+        return
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            copy_update(model, objects, fields)
+        return
+
+    quote = connection.ops.quote_name
+    pk = model._meta.pk
+    columns = [model._meta.get_field(name) for name in fields]
+    sql = (
+        f'UPDATE {quote(model._meta.db_table)} SET '
+        f'{", ".join(f"{quote(f.column)} = %s" for f in columns)} WHERE {quote(pk.column)} = %s'
+    )
+    rows = [
+        [f.get_db_prep_save(getattr(obj, f.attname), connection) for f in (*columns, pk)]
+        for obj in objects
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def copy_upsert(model, objects, unique_fields, update_fields):
+    """
+    COPY instances into a temporary staging table, then upsert from it
+
+    One INSERT ... ON CONFLICT on `unique_fields`; the staging table is
+    dropped when the transaction ends (PostgreSQL only).
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(f.column) for f in model._meta.concrete_fields)
+    table = quote(model._meta.db_table)
+    staging = f'{model._meta.db_table}_staging'
+    conflict = ', '.join(quote(model._meta.get_field(name).column) for name in unique_fields)
+    updates = ', '.join(
+        f'{quote(column)} = EXCLUDED.{quote(column)}'
+        for column in (model._meta.get_field(name).column for name in update_fields)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {quote(staging)} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP'
+        )
+        copy_insert(model, objects, table=staging)
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {quote(staging)} '
+            f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}'
+        )
+        cursor.execute(f'DROP TABLE {quote(staging)}')
+
+
+def bulk_upsert(model, objects, unique_fields, update_fields, batch_size: int = 1000):
+    """Insert or update on a unique constraint: COPY on PostgreSQL, bulk_create() elsewhere"""
+    if not objects:
+        return
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            copy_upsert(model, objects, unique_fields, update_fields)
+    else:
+        model.objects.bulk_create(
+            objects,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=list(update_fields),
+        )
@@ -0,0 +1,105 @@
+"""
+Dashboard Statistics
+Firm-wide hub counters in one query, cached in the shared cache
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Sum, Value
+
+from bastion.briefings.models import Briefing, Notification
+from .models import Account, Client, Household, LatestRiskSnapshot
+
+CACHE_KEY = 'dashboard:stats'
+
+
+def _totals(queryset, **aggregates):
+    """
+    One-row aggregate over a queryset, still composable as SQL
+
+    Grouping by a constant leaves no GROUP BY, so this compiles to
+    SELECT <aggregates> FROM ... WHERE ... rather than being evaluated.
+    """
+    return (
+        queryset.order_by()
+        .annotate(_row=Value(1)).values('_row')
+        .annotate(**aggregates).values(*aggregates)
+    )
+
+
+def latest_aum_pointers():
+    """
+    Current snapshots that make up AUM
+
+    Households, plus active clients outside any household; household
+    members are covered by their household's snapshot, so nothing is
+    counted twice.
+    """
+    return LatestRiskSnapshot.objects.filter(
+        Q(household__isnull=False) | Q(client__is_active=True, client__household__isnull=True)
+    )
+
+
+def _stat_queries():
+    pending = [Briefing.Status.DRAFT, Briefing.Status.PENDING_REVIEW]
+    return [
+        _totals(Client.objects.all(), total_clients=Count('pk', filter=Q(is_active=True))),
+        _totals(Household.objects.all(), total_households=Count('pk')),
+        _totals(Account.objects.all(), total_accounts=Count('pk', filter=Q(is_active=True))),
+        _totals(latest_aum_pointers(), total_aum=Sum('snapshot__total_value')),
+        _totals(
+            Briefing.objects.filter(status__in=pending),
+            pending_briefings=Count('pk'),
+        ),
+    ]
+
+
+def compute_dashboard_stats() -> dict:
+    """
+    All firm-wide counters in a single round trip
+
+    Each table is aggregated once (conditional aggregation where a table
+    feeds several counters) as a one-row derived table, and the rows are
+    cross-joined into one result. AUM sums the maintained latest-snapshot
+    pointers, so its cost follows the number of households and clients
+    rather than snapshot history.
+    """
+    tables, params, columns = [], [], []
+    for index, queryset in enumerate(_stat_queries()):
+        sql, query_params = queryset.query.sql_with_params()
+        tables.append(f'({sql}) AS t{index}')
+        params.extend(query_params)
+        columns.extend(queryset.query.annotation_select)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT * FROM {', '.join(tables)}", params)
+        row = cursor.fetchone()
+
+    stats = {name: value or 0 for name, value in zip(columns, row)}
+    stats['total_aum'] = Decimal(str(stats['total_aum'])).quantize(Decimal('0.01'))
+    return stats
+
+
+def dashboard_stats() -> dict:
+    """Cached firm-wide counters; recomputed on a miss"""
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(CACHE_KEY, stats, timeout=getattr(settings, 'DASHBOARD_STATS_TIMEOUT', 300))
+    return stats
+
+
+def invalidate_dashboard_stats():
+    cache.delete(CACHE_KEY)
+
+
+def pending_task_count(user) -> int:
+    """Open tasks for a user: unread TASK notifications (partial unread index)"""
+    return Notification.objects.filter(
+        user=user,
+        is_read=False,
+        notification_type=Notification.NotificationType.TASK,
+    ).count()
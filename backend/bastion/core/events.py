@@ -0,0 +1,196 @@
+"""
+Live Events
+Pub/sub fan-out behind the hub's server-sent event stream
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger('bastion.events')
+
+CHANNEL_PREFIX = 'bastion:events'
+ACTIVITY_CHANNEL = f'{CHANNEL_PREFIX}:activity'
+
+
+def user_channel(user_id) -> str:
+    return f'{CHANNEL_PREFIX}:user:{user_id}'
+
+
+class Subscription:
+    """Messages for one stream; get() returns None on timeout"""
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    async def get(self, timeout: float):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """
+    Single-process broker for development
+
+    Publishers may run on any thread (sync views run in a thread pool
+    under ASGI); messages are handed to each subscriber's event loop.
+    Only streams served by the publishing process see the message.
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: dict):
+        with self._lock:
+            targets = list(self._subscribers.get(channel, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                pass
+
+    def publish_many(self, messages):
+        for channel, message in messages:
+            self.publish(channel, message)
+
+    @staticmethod
+    def _offer(queue, message):
+        if queue.full():
+            # Slow consumer: drop the oldest message rather than block
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, channels):
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(entry)
+        try:
+            yield Subscription(queue)
+        finally:
+            with self._lock:
+                for channel in channels:
+                    subscribers = self._subscribers.get(channel)
+                    if subscribers:
+                        subscribers.discard(entry)
+                        if not subscribers:
+                            del self._subscribers[channel]
+
+
+class RedisSubscription:
+
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def get(self, timeout: float):
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+
+class RedisBroker:
+    """
+    Redis pub/sub broker for production
+
+    Every web process subscribes only to the channels of the streams it
+    serves, so a publish reaches exactly the processes holding that
+    user's connections.
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, channel: str, message: dict):
+        self._client.publish(channel, json.dumps(message, default=str))
+
+    def publish_many(self, messages):
+        """Publish [(channel, message), ...] in one round trip"""
+        with self._client.pipeline(transaction=False) as pipe:
+            for channel, message in messages:
+                pipe.publish(channel, json.dumps(message, default=str))
+            pipe.execute()
+
+    @asynccontextmanager
+    async def subscribe(self, channels):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(*channels)
+            yield RedisSubscription(pubsub)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Redis broker when EVENT_STREAM_REDIS_URL is set, else in-process"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'EVENT_STREAM_REDIS_URL', '')
+                _broker = RedisBroker(url) if url else InProcessBroker()
+    return _broker
+
+
+def publish(channel: str, event: str, data):
+    """
+    Publish an event once the current transaction commits
+
+    Live updates are best effort: a broker failure is logged, never
+    raised into the write that triggered it.
+    """
+    message = {'event': event, 'data': data}
+
+    def send():
+        try:
+            get_broker().publish(channel, message)
+        except Exception:
+            logger.exception(f"EVENTS: publish failed | channel={channel} | event={event}")
+
+    transaction.on_commit(send)
+
+
+def publish_to_user(user_id, event: str, data):
+    publish(user_channel(user_id), event, data)
+
+
+def publish_many(events):
+    """
+    Publish [(channel, event, data), ...] together after commit
+
+    One pipelined round trip on Redis, for fan-outs to many users.
+    """
+    messages = [(channel, {'event': event, 'data': data}) for channel, event, data in events]
+    if not messages:
+        return
+
+    def send():
+        try:
+            get_broker().publish_many(messages)
+        except Exception:
+            logger.exception(f"EVENTS: bulk publish failed | messages={len(messages)}")
+
+    transaction.on_commit(send)
@@ -0,0 +1,283 @@
+"""
+Household Snapshot Rollup
+Derives household risk snapshots from their members' client snapshots
+"""
+
+import logging
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Q, Window
+from django.db.models.functions import Cast, RowNumber
+from django.utils import timezone
+
+from bastion.briefings.triggers import evaluate_triggers
+
+from .analytics import EXPOSURE_FIELDS, SnapshotHistory, drawdowns, update_snapshot_analytics
+from .bulk import bulk_upsert
+from .dashboard import invalidate_dashboard_stats
+from .models import Client, RiskSnapshot
+from .overview import invalidate_household_overview_on_commit
+from .rollups import rebuild_rollups, rebuild_rollups_on_commit
+from .series import sync_series
+from .snapshots import refresh_latest_snapshots
+
+logger = logging.getLogger('bastion.core')
+
+ROLLUP_SOURCE = 'Client rollup'
+# Written on conflict, replacing a supplied household snapshot for the date
+UPDATE_FIELDS = (
+    'total_value', *EXPOSURE_FIELDS, 'risk_score', 'max_drawdown_ytd',
+    'data_source', 'source_timestamp', 'notes', 'updated_at',
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def rollup_enabled() -> bool:
+    return _setting('HOUSEHOLD_SNAPSHOT_ROLLUP', True)
+
+
+def member_households(client_ids) -> list:
+    """Households the given clients belong to"""
+    client_ids, households = list(client_ids), set()
+    for start in range(0, len(client_ids), 1000):
+        households.update(
+            Client.objects.filter(pk__in=client_ids[start:start + 1000], household__isnull=False)
+            .values_list('household_id', flat=True)
+        )
+    return list(households)
+
+
+def _member_snapshots(household_ids=None, start=None):
+    """
+    Client snapshots of active household members, by household, client and date
+
+    From `start` onwards, each member seeded with its last snapshot
+    before it, which holds until the member's next one.
+    """
+    queryset = RiskSnapshot.objects.filter(client__household__isnull=False, client__is_active=True)
+    if household_ids is not None:
+        queryset = queryset.filter(client__household_id__in=list(household_ids))
+    if start is not None:
+        seeds = queryset.filter(as_of_date__lt=start).annotate(
+            _recency=Window(RowNumber(), partition_by=[F('client_id')], order_by=F('as_of_date').desc())
+        ).filter(_recency=1).values('pk')
+        queryset = queryset.filter(Q(as_of_date__gte=start) | Q(pk__in=seeds))
+    floats = {name: Cast(F(name), FloatField()) for name in ('total_value', *EXPOSURE_FIELDS)}
+    return list(
+        queryset.order_by('client__household_id', 'client_id', 'as_of_date')
+        .annotate(**{f'_{name}': expression for name, expression in floats.items()})
+        .values_list('client__household_id', 'client_id', 'as_of_date', *(f'_{name}' for name in floats))
+    )
+
+
+def _changes(values, first) -> np.ndarray:
+    """Change from the previous row of the same client; the full value on its first row"""
+    previous = np.zeros_like(values)
+    previous[1:] = values[:-1]
+    previous[first] = 0
+    return values - previous
+
+
+def household_points(household_ids=None, since=None):
+    """
+    Household value, exposures and drawdowns on every member snapshot date
+
+    A member's snapshot holds until its next one, so each household's
+    state moves by the change from the member's previous snapshot: the
+    rows are re-sorted by household and date and the changes summed with
+    one cumulative sum. Values are summed in cents as integers and
+    exposures weighted by value. With `since`, members are read from
+    January 1st of its year (for the year-to-date peaks), so points
+    before that hold partial households and are not to be used. Returns
+    the points as a SnapshotHistory, with the member count and
+    year-to-date worst drawdown of each.
+    """
+    rows = _member_snapshots(household_ids, start=date(since.year, 1, 1) if since else None)
+    if not rows:
+        return None, None, None
+    households, clients, dates, *numbers = (np.array(column) for column in zip(*rows))
+    dates = dates.astype('datetime64[D]')
+    cents = np.rint(numbers[0].astype(float) * 100).astype(np.int64)
+    weighted = cents[:, None] * np.column_stack(numbers[1:]).astype(float)
+
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (clients[1:] != clients[:-1]) | (households[1:] != households[:-1])
+    members = first.astype(np.int64)
+    cents = _changes(cents, first)
+    weighted = _changes(weighted, first)
+
+    group = np.cumsum(np.r_[True, households[1:] != households[:-1]]) - 1
+    order = np.lexsort((dates, group))
+    group, dates = group[order], dates[order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+
+    def running(changes):
+        # Cumulative sums restarted per household
+        total = np.cumsum(changes[order], axis=0)
+        before = np.concatenate((np.zeros_like(total[:1]), total))[starts]
+        return total - np.repeat(before, np.diff(np.r_[starts, len(order)]), axis=0)
+
+    cents, weighted, members = running(cents), running(weighted), running(members)
+
+    # Last row of every (household, date) carries the state for that date
+    last = np.r_[(group[1:] != group[:-1]) | (dates[1:] != dates[:-1]), True]
+    cents, weighted, members = cents[last], weighted[last], members[last]
+    group, dates = group[last], dates[last]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exposures = np.where(cents[:, None] > 0, weighted / cents[:, None], 0.0)
+
+    history = SnapshotHistory(
+        targets=list(households[np.r_[True, households[1:] != households[:-1]]]),
+        ids=np.empty(len(dates), dtype=object),
+        group=group,
+        starts=np.flatnonzero(np.r_[True, group[1:] != group[:-1]]),
+        dates=dates,
+        values=cents / 100,
+        exposures=exposures,
+        stored={},
+    )
+    _, worst = drawdowns(history)
+    return history, members, worst
+
+
+def derive_household_snapshots(household_ids=None, since=None) -> int:
+    """
+    Write derived household snapshots from `since` (or the start) onwards
+
+    Dates are taken from the members' snapshots; a supplied household
+    snapshot on such a date is replaced, while supplied snapshots on
+    other dates are kept. Derived rows whose date no longer has member
+    snapshots are removed. Pointers, analytics and AUM rollups are left
+    to the caller (see rollup_households()). Returns rows written.
+    """
+    history, members, worst = household_points(household_ids, since=since)
+    now = timezone.now()
+    snapshots = []
+    for i in range(len(history) if history else 0):
+        if since is not None and history.dates[i].item() < since:
+            continue
+        snapshots.append(RiskSnapshot(
+            household_id=history.targets[history.group[i]],
+            as_of_date=history.dates[i].item(),
+            total_value=Decimal(int(np.rint(history.values[i] * 100))).scaleb(-2),
+            **{
+                name: Decimal(str(round(float(share), 2))).quantize(Decimal('0.01'))
+                for name, share in zip(EXPOSURE_FIELDS, history.exposures[i])
+            },
+            max_drawdown_ytd=Decimal(str(round(float(worst[i]) * 100, 2))).quantize(Decimal('0.01')),
+            data_source=ROLLUP_SOURCE,
+            source_timestamp=now,
+            notes=f'Rolled up from {members[i]} client snapshots',
+        ))
+
+    stale = RiskSnapshot.objects.filter(household__isnull=False, data_source=ROLLUP_SOURCE)
+    if household_ids is not None:
+        stale = stale.filter(household_id__in=list(household_ids))
+    if since is not None:
+        stale = stale.filter(as_of_date__gte=since)
+    current = {(s.household_id, s.as_of_date) for s in snapshots}
+
+    with transaction.atomic():
+        bulk_upsert(RiskSnapshot, snapshots, unique_fields=['household', 'as_of_date'], update_fields=UPDATE_FIELDS)
+        removed = [
+            pk for pk, household_id, as_of_date in stale.values_list('pk', 'household_id', 'as_of_date')
+            if (household_id, as_of_date) not in current
+        ]
+        if removed:
+            RiskSnapshot.objects.filter(pk__in=removed).delete()
+
+    logger.info(
+        f"HOUSEHOLD_ROLLUP: snapshots derived | since={since} | rows={len(snapshots)} | removed={len(removed)}"
+    )
+    return len(snapshots)
+
+
+def rollup_households(household_ids=None, since=None) -> int:
+    """
+    Derive household snapshots and refresh what depends on them
+
+    Latest-snapshot pointers, risk analytics, snapshot series, AUM
+    rollups (on commit), dashboard stats and household overviews follow
+    the derived rows, and the households are checked against the
+    outreach triggers.
+    """
+    written = derive_household_snapshots(household_ids, since=since)
+    ids = household_ids
+    if ids is None:
+        ids = set(RiskSnapshot.objects.filter(
+            household__isnull=False, data_source=ROLLUP_SOURCE
+        ).values_list('household_id', flat=True).distinct())
+    refresh_latest_snapshots(household_ids=ids)
+    update_snapshot_analytics(client_ids=[], household_ids=ids, since=since)
+    sync_series(household_ids=ids, since=since)
+    if since is None:
+        rebuild_rollups()
+    else:
+        rebuild_rollups_on_commit(since)
+    invalidate_dashboard_stats()
+    invalidate_household_overview_on_commit(household_ids=ids)
+    evaluate_triggers(household_ids=ids)
+    return written
+
+
+def rollup_on_commit(household_id, since=None):
+    """
+    Re-derive one household from `since` (None: all dates) on commit
+
+    Requests in one transaction collapse per household to the earliest
+    date, so saving several member snapshots costs one pass each.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, '_household_rollup_since', None) or {}
+    if household_id in pending:
+        earliest = pending[household_id]
+        since = None if earliest is None or since is None else min(earliest, since)
+    pending[household_id] = since
+    connection._household_rollup_since = pending
+
+    def run():
+        households = getattr(connection, '_household_rollup_since', None) or {}
+        connection._household_rollup_since = None
+        for household, earliest in households.items():
+            rollup_households([household], since=earliest)
+
+    transaction.on_commit(run)
+
+
+def rollup_members_on_commit(snapshots):
+    """
+    Re-derive the households of the snapshots' clients on commit
+
+    Each household is re-derived from the earliest member snapshot date
+    touched. Clients are resolved to households in one pass at commit,
+    so a cascade over a member's whole history costs no query per row;
+    a deleted client's household is handled by the client delete hook.
+    """
+    pending = getattr(connection, '_household_rollup_members', None) or {}
+    for snapshot in snapshots:
+        if snapshot.client_id:
+            since = pending.get(snapshot.client_id, snapshot.as_of_date)
+            pending[snapshot.client_id] = min(since, snapshot.as_of_date)
+    connection._household_rollup_members = pending
+
+    def run():
+        members = getattr(connection, '_household_rollup_members', None) or {}
+        connection._household_rollup_members = None
+        client_ids = list(members)
+        households = {}
+        for start in range(0, len(client_ids), 1000):
+            for client_id, household_id in Client.objects.filter(
+                pk__in=client_ids[start:start + 1000], household__isnull=False
+            ).values_list('pk', 'household_id'):
+                households[household_id] = min(households.get(household_id, members[client_id]), members[client_id])
+        for household_id, since in households.items():
+            rollup_households([household_id], since=since)
+
+    transaction.on_commit(run)
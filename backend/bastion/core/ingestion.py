@@ -0,0 +1,295 @@
+"""
+Risk Snapshot Ingestion
+Streams custodian snapshot files into RiskSnapshot with batched upserts
+"""
+
+import csv
+import json
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from bastion.audit.models import AuditEvent
+from bastion.briefings.triggers import evaluate_triggers
+from .analytics import update_snapshot_analytics
+from .bulk import bulk_upsert
+from .dashboard import invalidate_dashboard_stats
+from .household_rollup import derive_household_snapshots, member_households, rollup_enabled
+from .models import Client, Household, RiskSnapshot
+from .overview import invalidate_household_overview_on_commit
+from .rollups import rebuild_rollups
+from .series import sync_series
+from .snapshots import refresh_latest_snapshots
+
+logger = logging.getLogger('bastion.core')
+
+FORMATS = ('csv', 'jsonl', 'json')
+
+_EXPOSURES = ('equity_exposure', 'fixed_income_exposure', 'cash_exposure', 'alternative_exposure')
+# Written on conflict; identity columns and created_at are kept
+UPDATE_FIELDS = (
+    'total_value', *_EXPOSURES, 'risk_score', 'max_drawdown_ytd',
+    'data_source', 'source_timestamp', 'notes', 'updated_at',
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@dataclass
+class IngestionResult:
+    rows: int = 0
+    upserted: int = 0
+    batches: int = 0
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+
+    def reject(self, line, error):
+        self.error_count += 1
+        if len(self.errors) < _setting('SNAPSHOT_INGEST_MAX_REPORTED_ERRORS', 1000):
+            self.errors.append({'line': line, 'error': error})
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+def read_rows(stream, fmt: str):
+    """
+    Yield (line, row, error) from a CSV, JSON Lines or JSON array stream
+
+    CSV and JSON Lines are read one record at a time; a JSON array is
+    parsed whole, so prefer JSON Lines for large files.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+    elif fmt == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                yield line, json.loads(text), None
+            except ValueError as exc:
+                yield line, None, f'Invalid JSON: {exc}'
+    elif fmt == 'json':
+        for index, row in enumerate(json.load(stream), start=1):
+            yield index, row, None
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+
+def _value(row, name):
+    value = row.get(name)
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value in ('', None) else value
+
+
+def _decimal(row, name, required=True, limit=None, default=None):
+    value = _value(row, name)
+    if value is None:
+        if required:
+            raise ValueError(f'{name} is required')
+        return default
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f'{name} is not a number')
+    if not number.is_finite() or (limit is not None and abs(number) > limit):
+        raise ValueError(f'{name} is out of range')
+    return number.quantize(Decimal('0.01'))
+
+
+def _uuid(row, *names):
+    for name in names:
+        value = _value(row, name)
+        if value is not None:
+            try:
+                return uuid.UUID(str(value))
+            except ValueError:
+                raise ValueError(f'{name} is not a valid id')
+    return None
+
+
+def parse_row(row, data_source: str = '', source_timestamp=None) -> RiskSnapshot:
+    """Validate one record into an unsaved snapshot; raises ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError('Record is not an object')
+
+    client_id = _uuid(row, 'client', 'client_id')
+    household_id = _uuid(row, 'household', 'household_id')
+    if bool(client_id) == bool(household_id):
+        raise ValueError('Exactly one of client or household is required')
+
+    as_of = _value(row, 'as_of_date')
+    try:
+        as_of_date = date.fromisoformat(str(as_of)) if as_of else None
+    except ValueError:
+        raise ValueError('as_of_date must be YYYY-MM-DD')
+    if as_of_date is None:
+        raise ValueError('as_of_date is required')
+
+    timestamp = _value(row, 'source_timestamp')
+    if timestamp is not None:
+        timestamp = parse_datetime(str(timestamp))
+        if timestamp is None:
+            raise ValueError('source_timestamp is not a valid datetime')
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+
+    source = _value(row, 'data_source') or data_source
+    if not source:
+        raise ValueError('data_source is required')
+
+    return RiskSnapshot(
+        client_id=client_id,
+        household_id=household_id,
+        as_of_date=as_of_date,
+        total_value=_decimal(row, 'total_value', limit=Decimal('1e13')),
+        equity_exposure=_decimal(row, 'equity_exposure', limit=Decimal('999')),
+        fixed_income_exposure=_decimal(row, 'fixed_income_exposure', limit=Decimal('999')),
+        cash_exposure=_decimal(row, 'cash_exposure', limit=Decimal('999')),
+        alternative_exposure=_decimal(
+            row, 'alternative_exposure', required=False, limit=Decimal('999'), default=Decimal('0')
+        ),
+        risk_score=str(_value(row, 'risk_score') or '')[:50],
+        max_drawdown_ytd=_decimal(row, 'max_drawdown_ytd', required=False, limit=Decimal('999')),
+        data_source=str(source)[:100],
+        source_timestamp=timestamp or source_timestamp or timezone.now(),
+        notes=str(_value(row, 'notes') or ''),
+    )
+
+
+# =============================================================================
+# UPSERT
+# =============================================================================
+
+def _existing(model, ids) -> set:
+    return set(model.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+
+
+def validate_batch(records, result: IngestionResult, **defaults) -> list:
+    """
+    Parse a batch and check its targets with one query per target type
+
+    Later records for the same target and date replace earlier ones, as
+    an upsert of the whole file would.
+    """
+    parsed = []
+    for line, row, error in records:
+        if error:
+            result.reject(line, error)
+            continue
+        try:
+            parsed.append((line, parse_row(row, **defaults)))
+        except ValueError as exc:
+            result.reject(line, str(exc))
+
+    clients = _existing(Client, {s.client_id for _, s in parsed if s.client_id})
+    households = _existing(Household, {s.household_id for _, s in parsed if s.household_id})
+
+    unique = {}
+    for line, snapshot in parsed:
+        if snapshot.client_id and snapshot.client_id not in clients:
+            result.reject(line, 'Unknown client')
+        elif snapshot.household_id and snapshot.household_id not in households:
+            result.reject(line, 'Unknown household')
+        else:
+            unique[(snapshot.client_id, snapshot.household_id, snapshot.as_of_date)] = snapshot
+    return list(unique.values())
+
+
+def upsert_snapshots(snapshots):
+    """Insert or update a validated batch on the (target, as_of_date) constraints"""
+    for target in ('client', 'household'):
+        rows = [s for s in snapshots if getattr(s, f'{target}_id')]
+        bulk_upsert(RiskSnapshot, rows, unique_fields=[target, 'as_of_date'], update_fields=UPDATE_FIELDS)
+
+
+def ingest_snapshots(records, data_source: str = '', user=None, source_name: str = '',
+                     batch_size: int = None) -> IngestionResult:
+    """
+    Load (line, row, error) records from read_rows() in batches
+
+    Each batch is validated, upserted and audited with one
+    sys.integration_sync event in its own transaction, so a bad batch
+    never rolls back the ones before it. Derived household snapshots,
+    latest-snapshot pointers, risk analytics, snapshot series, AUM
+    rollups and dashboard stats are refreshed once at the end, for the
+    targets and dates the load touched.
+    """
+    batch_size = batch_size or _setting('SNAPSHOT_INGEST_BATCH_SIZE', 5000)
+    defaults = {'data_source': data_source, 'source_timestamp': timezone.now()}
+    result = IngestionResult()
+    earliest = None
+    client_ids, household_ids = set(), set()
+    records = iter(records)
+
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        result.batches += 1
+        result.rows += len(batch)
+        errors_before = result.error_count
+
+        snapshots = validate_batch(batch, result, **defaults)
+        with transaction.atomic():
+            if snapshots:
+                upsert_snapshots(snapshots)
+            rejected = result.error_count - errors_before
+            AuditEvent.log(
+                event_type=AuditEvent.EventType.SYS_INTEGRATION_SYNC,
+                user=user,
+                description=f'Risk snapshot batch {result.batches}: '
+                            f'{len(snapshots)} upserted, {rejected} rejected',
+                data={
+                    'source': source_name,
+                    'data_source': data_source,
+                    'batch': result.batches,
+                    'rows': len(batch),
+                    'upserted': len(snapshots),
+                    'rejected': rejected,
+                },
+                severity='warning' if rejected else 'info',
+            )
+
+        result.upserted += len(snapshots)
+        client_ids.update(s.client_id for s in snapshots if s.client_id)
+        household_ids.update(s.household_id for s in snapshots if s.household_id)
+        if snapshots:
+            batch_earliest = min(s.as_of_date for s in snapshots)
+            earliest = batch_earliest if earliest is None else min(earliest, batch_earliest)
+
+    if client_ids and rollup_enabled():
+        # Households of the loaded clients are re-derived from the same date
+        derived = member_households(client_ids)
+        for start in range(0, len(derived), 1000):
+            derive_household_snapshots(derived[start:start + 1000], since=earliest)
+        household_ids.update(derived)
+
+    if earliest is not None:
+        refresh_latest_snapshots(client_ids=client_ids, household_ids=household_ids)
+        update_snapshot_analytics(client_ids=client_ids, household_ids=household_ids, since=earliest)
+        sync_series(client_ids=client_ids, household_ids=household_ids, since=earliest)
+        rebuild_rollups(since=earliest)
+        invalidate_dashboard_stats()
+        invalidate_household_overview_on_commit(household_ids=household_ids, client_ids=client_ids)
+        evaluate_triggers(client_ids=client_ids, household_ids=household_ids)
+
+    logger.info(
+        f"INGEST: risk snapshots loaded | source={source_name or data_source} | rows={result.rows} | "
+        f"upserted={result.upserted} | rejected={result.error_count} | batches={result.batches}"
+    )
+    return result
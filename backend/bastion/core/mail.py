@@ -0,0 +1,390 @@
+"""
+Email Delivery
+Pooled SMTP connections and a bounded, retrying send queue
+"""
+
+import copy
+import heapq
+import itertools
+import logging
+import random
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from queue import Empty, LifoQueue
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import sanitize_address
+
+logger = logging.getLogger('bastion.mail')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# =============================================================================
+# CONNECTION POOL
+# =============================================================================
+
+class SMTPConnectionPool:
+    """
+    Process-wide pool of persistent SMTP connections
+
+    Connections are opened lazily up to `size`, handed out LIFO so warm
+    connections are reused first, and health-checked with NOOP after
+    sitting idle. A connection that errors is discarded, not returned.
+    """
+
+    def __init__(self, host, port, username='', password='', use_tls=False,
+                 use_ssl=False, timeout=None, size=8, idle_check=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.size = size
+        self.idle_check = idle_check
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(
+                self.host, self.port, timeout=self.timeout,
+                context=ssl.create_default_context(),
+            )
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        return smtp
+
+    def _checkout(self):
+        while True:
+            try:
+                smtp, returned_at = self._idle.get_nowait()
+            except Empty:
+                return self._open()
+            if time.monotonic() - returned_at < self.idle_check:
+                return smtp
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(smtp)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; blocks while all `size` are in use"""
+        self._slots.acquire()
+        smtp = None
+        try:
+            smtp = self._checkout()
+            yield smtp
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError):
+            self._discard(smtp)
+            smtp = None
+            raise
+        finally:
+            if smtp is not None:
+                self._idle.put((smtp, time.monotonic()))
+            self._slots.release()
+
+    def _discard(self, smtp):
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                smtp.close()
+            except OSError:
+                pass
+
+    def close_all(self):
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except Empty:
+                return
+            self._discard(smtp)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(**options) -> SMTPConnectionPool:
+    """Shared pool for a given server/credential combination"""
+    key = tuple(sorted(options.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SMTPConnectionPool(**options)
+        return pool
+
+
+class PooledSMTPEmailBackend(BaseEmailBackend):
+    """
+    Django email backend that reuses pooled SMTP connections
+
+    Drop-in replacement for django.core.mail.backends.smtp.EmailBackend:
+    instead of one connection per send_messages() call, connections stay
+    open across calls and threads.
+    """
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        self.pool = get_pool(
+            host=kwargs.get('host') or settings.EMAIL_HOST,
+            port=kwargs.get('port') or settings.EMAIL_PORT,
+            username=kwargs.get('username', settings.EMAIL_HOST_USER),
+            password=kwargs.get('password', settings.EMAIL_HOST_PASSWORD),
+            use_tls=kwargs.get('use_tls', settings.EMAIL_USE_TLS),
+            use_ssl=kwargs.get('use_ssl', settings.EMAIL_USE_SSL),
+            timeout=kwargs.get('timeout', settings.EMAIL_TIMEOUT),
+            size=_setting('EMAIL_POOL_SIZE', 8),
+        )
+
+    def send_messages(self, email_messages):
+        sent = 0
+        for message in email_messages:
+            try:
+                refused = self.send_to(message, message.recipients())
+            except (smtplib.SMTPException, OSError):
+                if not self.fail_silently:
+                    raise
+                continue
+            if len(refused) < len(message.recipients()):
+                sent += 1
+        return sent
+
+    def send_to(self, message, recipients) -> dict:
+        """
+        Send a message to specific recipients on a pooled connection
+
+        Returns {recipient: (code, reason)} for recipients the server
+        refused; raises if every recipient was refused or the transport
+        failed.
+        """
+        if not recipients:
+            return {}
+        encoding = message.encoding or settings.DEFAULT_CHARSET
+        from_email = sanitize_address(message.from_email, encoding)
+        to = [sanitize_address(address, encoding) for address in recipients]
+        payload = message.message().as_bytes(linesep='\r\n')
+
+        with self.pool.connection() as smtp:
+            return smtp.sendmail(from_email, to, payload)
+
+
+# =============================================================================
+# DELIVERY QUEUE
+# =============================================================================
+
+@dataclass
+class DeliveryJob:
+    """One message to deliver; `key` identifies it to the caller"""
+    key: Any
+    message: Any
+    recipients: list
+    attempts: int = 0
+    delivered: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    pending: Optional[list] = None
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.delivered) and not self.failed
+
+    @property
+    def error(self) -> Optional[str]:
+        """Summary error, or None if at least one recipient got the message"""
+        if not self.recipients:
+            return 'No email recipients'
+        if self.delivered:
+            return None
+        return '; '.join(f'{address}: {reason}' for address, reason in self.failed.items())[:500]
+
+
+def _is_transient(code) -> bool:
+    # No code means the transport failed before the server answered
+    return code is None or 400 <= code < 500
+
+
+class DeliveryQueue:
+    """
+    Bounded concurrent send queue with per-recipient retry
+
+    `workers` threads drain a priority queue ordered by ready time. At
+    most `max_pending` jobs are in flight; submit() blocks beyond that,
+    which bounds memory for very large sends. Recipients refused with a
+    4xx (or lost to a dropped connection) are retried alone with
+    exponential backoff and jitter; 5xx refusals fail immediately.
+    """
+
+    def __init__(self, workers=None, max_pending=None, max_attempts=None,
+                 backoff=None, on_complete=None):
+        self.workers = workers or _setting('EMAIL_SEND_CONCURRENCY', 8)
+        self.max_attempts = max_attempts or _setting('EMAIL_MAX_ATTEMPTS', 4)
+        self.backoff = backoff if backoff is not None else _setting('EMAIL_RETRY_BACKOFF', 2.0)
+        self.on_complete = on_complete
+        self._slots = threading.BoundedSemaphore(max_pending or _setting('EMAIL_QUEUE_SIZE', 1000))
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._threads = []
+        self.completed = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f'mail-delivery-{index}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job: DeliveryJob):
+        self._slots.acquire()
+        job.pending = list(job.recipients)
+        with self._cond:
+            self._in_flight += 1
+        if not job.pending:
+            self._finish(job)
+            return
+        self._push(job, 0)
+
+    def join(self):
+        """Wait until every submitted job has finished"""
+        with self._cond:
+            while self._in_flight:
+                self._cond.wait()
+
+    def close(self):
+        self.join()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def send_all(self, jobs) -> list:
+        """Deliver jobs and return them once all are finished"""
+        with self:
+            for job in jobs:
+                self.submit(job)
+        return self.completed
+
+    def _push(self, job, delay):
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), job))
+            self._cond.notify()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._heap:
+                    ready_at = self._heap[0][0]
+                    wait = ready_at - time.monotonic()
+                    if wait <= 0:
+                        return heapq.heappop(self._heap)[2]
+                    self._cond.wait(wait)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _work(self):
+        backend = get_connection(fail_silently=False)
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._attempt(backend, job)
+
+    def _attempt(self, backend, job):
+        job.attempts += 1
+        recipients = job.pending
+        try:
+            refused = _send(backend, job.message, recipients)
+        except smtplib.SMTPRecipientsRefused as exc:
+            refused = exc.recipients
+        except smtplib.SMTPResponseException as exc:
+            refused = {address: (exc.smtp_code, str(exc.smtp_error)) for address in recipients}
+        except Exception as exc:
+            refused = {address: (None, str(exc) or exc.__class__.__name__) for address in recipients}
+
+        refused = {_address(key): value for key, value in refused.items()}
+        retry = []
+        for address in recipients:
+            if _address(address) not in refused:
+                job.delivered.append(address)
+                continue
+            code, reason = refused[_address(address)]
+            if isinstance(reason, bytes):
+                reason = reason.decode(errors='replace')
+            if _is_transient(code) and job.attempts < self.max_attempts:
+                retry.append(address)
+            else:
+                job.failed[address] = f'{code or ""} {reason}'.strip()
+
+        if retry:
+            job.pending = retry
+            delay = self.backoff * (2 ** (job.attempts - 1)) * (1 + random.random() * 0.25)
+            logger.info(f"MAIL: retrying {len(retry)} recipients in {delay:.1f}s | job={job.key}")
+            self._push(job, delay)
+        else:
+            self._finish(job)
+
+    def _finish(self, job):
+        job.pending = []
+        if self.on_complete:
+            try:
+                self.on_complete(job)
+            except Exception:
+                logger.exception(f"MAIL: completion callback failed | job={job.key}")
+        with self._cond:
+            self.completed.append(job)
+            self._in_flight -= 1
+            self._cond.notify_all()
+        self._slots.release()
+
+
+def _address(address) -> str:
+    return address.rsplit('<', 1)[-1].rstrip('>').strip().lower()
+
+
+def _send(backend, message, recipients) -> dict:
+    """Send to recipients; returns refused {address: (code, reason)}"""
+    if isinstance(backend, PooledSMTPEmailBackend):
+        return backend.send_to(message, recipients)
+
+    # Other backends (console, locmem, plain SMTP) can't report
+    # per-recipient refusals: send a copy addressed to just these recipients
+    single = copy.copy(message)
+    single.to, single.cc, single.bcc = list(recipients), [], []
+    single.connection = backend
+    backend.send_messages([single])
+    return {}
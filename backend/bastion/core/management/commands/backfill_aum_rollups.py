@@ -0,0 +1,29 @@
+"""
+Management command to rebuild the daily AUM rollups from risk snapshots
+"""
+
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from bastion.core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds firm and household AUM rollups from risk snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            default=None,
+            help='Only rebuild rows from this date (YYYY-MM-DD) onwards'
+        )
+
+    def handle(self, *args, **options):
+        since = options['since']
+        if since:
+            try:
+                since = date.fromisoformat(since)
+            except ValueError:
+                raise CommandError(f'Invalid --since date: {since}')
+
+        written = rebuild_rollups(since=since)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} AUM rollup rows'))
@@ -0,0 +1,14 @@
+"""
+Management command to rebuild the packed snapshot series from risk snapshots
+"""
+
+from django.core.management.base import BaseCommand
+from bastion.core.series import rebuild_series
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-client and per-household snapshot series from risk snapshots'
+
+    def handle(self, *args, **options):
+        written = rebuild_series()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} snapshot series'))
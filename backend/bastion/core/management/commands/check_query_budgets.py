@@ -0,0 +1,213 @@
+"""
+Management command to check every API router route against its query budget
+"""
+
+import csv
+import io
+import json
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from bastion.core.models import Client, User
+from bastion.core.query_budget import QueryCounter, resolve_budget
+
+
+def _as_of_params():
+    today = timezone.localdate().isoformat()
+    client_id = Client.objects.filter(is_active=True, risk_snapshots__isnull=False).values_list('pk', flat=True).first()
+    samples = [{'as_of': today}]
+    if client_id:
+        samples.append({'as_of': today, 'id': str(client_id)})
+    return samples
+
+
+def _by_household_params():
+    from bastion.documents.models import Document
+
+    counts = list(
+        Document.objects.filter(household__isnull=False).values('household_id')
+        .annotate(documents=Count('pk')).order_by('documents').values_list('household_id', flat=True)
+    )
+    return [{'household_id': str(pk)} for pk in dict.fromkeys(counts[:1] + counts[-1:])]
+
+
+# Collection actions that answer 400 without query parameters:
+# (prefix, url_path) -> callable returning parameter sets to sample
+ACTION_PARAMS = {
+    ('risk-snapshots', 'as_of'): _as_of_params,
+    ('documents', 'by_household'): _by_household_params,
+}
+
+
+def row_count(response) -> int:
+    """Rows in a response: list items, a page's results, or the items of a dict's lists"""
+    if response.streaming:
+        body = b''.join(response.streaming_content).decode()
+        if response['Content-Type'].startswith('text/csv'):
+            return max(len(list(csv.reader(io.StringIO(body)))) - 1, 0)
+        data = json.loads(body or '[]')
+    else:
+        data = response.data
+    if isinstance(data, dict):
+        if isinstance(data.get('results'), list):
+            return len(data['results'])
+        return sum(len(value) for value in data.values() if isinstance(value, list)) or 1
+    return len(data) if isinstance(data, list) else 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the GET actions of every router route against the current data and fails '
+        'on query budget overruns, error responses, or queries that grow with the rows returned'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            default=None,
+            help='Email of the user to run as (default: first active superuser)'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=100,
+            help='Large page size, compared with a page of one'
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=10,
+            help='Objects from the large page each detail action is run for'
+        )
+        parser.add_argument(
+            '--route',
+            action='append',
+            default=None,
+            help='Only this router prefix (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        from bastion.api.urls import router
+
+        users = User.objects.filter(is_active=True)
+        user = (
+            users.filter(email=options['user']).first() if options['user']
+            else users.filter(is_superuser=True).first()
+        )
+        if user is None:
+            raise CommandError('No user to run as; pass --user or create a superuser')
+
+        self.factory = APIRequestFactory()
+        self.user = user
+        self.failures = []
+        self.skipped = []
+        checked = 0
+        # GET handlers may still write (audit trails); none of it is kept
+        with transaction.atomic():
+            for prefix, viewset, _ in router.registry:
+                if options['route'] and prefix not in options['route']:
+                    continue
+                for label, problem in self.check_viewset(prefix, viewset, options['page_size'], options['samples']):
+                    checked += 1
+                    if problem:
+                        self.failures.append((label, problem))
+                        self.stdout.write(self.style.ERROR(f'  FAIL {label}: {problem}'))
+            transaction.set_rollback(True)
+
+        if self.failures:
+            raise CommandError(f'{len(self.failures)} of {checked} routes failed their query budgets')
+        skipped = f' ({len(self.skipped)} skipped without data)' if self.skipped else ''
+        self.stdout.write(self.style.SUCCESS(f'All {checked} routes within their query budgets{skipped}'))
+
+    def run(self, viewset, action, path, page_size=None, **kwargs):
+        """One GET through the viewset, without routing or throttling; returns (view, response, queries, rows)"""
+        initkwargs = {'throttle_classes': []}
+        if page_size and viewset.pagination_class:
+            initkwargs['pagination_class'] = type(
+                'SizedPagination', (viewset.pagination_class,), {'page_size': page_size}
+            )
+        view = viewset.as_view({'get': action}, **initkwargs)
+        request = self.factory.get(path)
+        force_authenticate(request, user=self.user)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = view(request, **kwargs)
+            if not response.streaming:
+                response.render()
+            rows = row_count(response) if response.status_code < 400 else 0
+        return view, response, counter.count, rows
+
+    def check_runs(self, label, runs):
+        """
+        Report one action run over several objects or parameter sets
+
+        Fails on an error status, on the most queries any run took going
+        over budget, or on the run returning the most rows taking more
+        queries than the one returning the fewest (at least one).
+        """
+        view = runs[0][0]
+        budget = resolve_budget(view, 'GET')
+        statuses = sorted({response.status_code for _, response, _, _ in runs})
+        counts = [count for _, _, count, _ in runs]
+        self.stdout.write(
+            f"  {'/'.join(map(str, statuses))} {label} queries={min(counts)}-{max(counts)} "
+            f"runs={len(runs)} budget={budget}"
+        )
+        if statuses[-1] >= 400:
+            return f'status {statuses[-1]}'
+        if budget is not None and max(counts) > budget:
+            return f'{max(counts)} queries, over budget'
+        with_rows = sorted((rows, count) for _, _, count, rows in runs if rows)
+        if with_rows and with_rows[-1][0] > with_rows[0][0] and with_rows[-1][1] > with_rows[0][1]:
+            (few, few_count), (most, most_count) = with_rows[0], with_rows[-1]
+            return f'{few_count} queries for {few} rows, {most_count} for {most} rows'
+        return None
+
+    def check_viewset(self, prefix, viewset, page_size, samples):
+        base = f'/api/{prefix}/'
+        ids = []
+
+        if hasattr(viewset, 'list'):
+            one = self.run(viewset, 'list', base, page_size=1)
+            many = self.run(viewset, 'list', base, page_size=page_size)
+            data = many[1].data
+            results = data.get('results', []) if isinstance(data, dict) else data or []
+            ids = [row['id'] for row in results if isinstance(row, dict) and row.get('id')]
+            yield f'GET {base}', self.check_runs(f'GET {base}', [one, many])
+
+        # Spread across the page, so the objects differ in how much hangs off them
+        ids = ids[::max(len(ids) // samples, 1)][:samples]
+
+        if hasattr(viewset, 'retrieve') and ids:
+            label = f'GET {base}{{id}}/'
+            yield label, self.check_runs(label, [
+                self.run(viewset, 'retrieve', f'{base}{pk}/', pk=pk) for pk in ids
+            ])
+
+        for extra in viewset.get_extra_actions():
+            if 'get' not in extra.mapping:
+                continue
+            handler = extra.mapping['get']
+            if extra.detail:
+                if not ids:
+                    continue
+                label = f'GET {base}{{id}}/{extra.url_path}/'
+                runs = [self.run(viewset, handler, f'{base}{pk}/{extra.url_path}/', pk=pk) for pk in ids]
+            else:
+                label = f'GET {base}{extra.url_path}/'
+                params = ACTION_PARAMS.get((prefix, extra.url_path), lambda: [{}])()
+                if not params:
+                    self.skipped.append(label)
+                    self.stdout.write(self.style.WARNING(f'  SKIP {label}: no data to build its query parameters from'))
+                    continue
+                runs = [
+                    self.run(viewset, handler, f'{base}{extra.url_path}/?{urlencode(query, doseq=True)}')
+                    for query in params
+                ]
+            yield label, self.check_runs(label, runs)
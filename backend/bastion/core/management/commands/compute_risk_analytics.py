@@ -0,0 +1,33 @@
+"""
+Management command to compute drawdown, volatility and drift on risk snapshots
+"""
+
+from django.core.management.base import BaseCommand
+from bastion.core.analytics import update_snapshot_analytics
+
+
+class Command(BaseCommand):
+    help = 'Computes risk analytics over snapshot histories and stores them on the snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--client',
+            action='append',
+            default=None,
+            help='Only this client (repeatable)'
+        )
+        parser.add_argument(
+            '--household',
+            action='append',
+            default=None,
+            help='Only this household (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        clients, households = options['client'], options['household']
+        if clients or households:
+            # Limiting to one target type skips the other
+            clients, households = clients or [], households or []
+
+        updated = update_snapshot_analytics(client_ids=clients, household_ids=households)
+        self.stdout.write(self.style.SUCCESS(f'Updated analytics on {updated} risk snapshots'))
@@ -0,0 +1,77 @@
+"""
+Management command to bulk import households, clients and accounts from a file
+"""
+
+import sys
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from bastion.core.book_import import import_book
+from bastion.core.ingestion import FORMATS, read_rows
+from bastion.core.models import User
+
+
+class Command(BaseCommand):
+    help = 'Creates households, clients and accounts from a CSV, JSON Lines or JSON file ("-" for stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to load, or - to read stdin')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default=None,
+            help='File format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--user',
+            default=None,
+            help='Email of the user the records and audit events are attributed to'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Rows checked and inserted per transaction'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            suffix = Path(path).suffix.lower().lstrip('.')
+            fmt = {'ndjson': 'jsonl'}.get(suffix, suffix)
+            if fmt not in FORMATS:
+                raise CommandError('Cannot infer the format; pass --format')
+
+        user = None
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user with email {options['user']}")
+
+        if path == '-':
+            result = self._import(sys.stdin, fmt, user, options)
+        else:
+            try:
+                with open(path, newline='', encoding='utf-8-sig') as stream:
+                    result = self._import(stream, fmt, user, options)
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        for error in result.errors[:20]:
+            self.stderr.write(f"  line {error['line']}: {error['error']}")
+        if result.error_count > 20:
+            self.stderr.write(f'  ...and {result.error_count - 20} more rejected rows')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.households} households, {result.clients} clients and '
+            f'{result.accounts} accounts from {result.rows} rows in {result.batches} batches '
+            f'({result.error_count} rejected)'
+        ))
+
+    def _import(self, stream, fmt, user, options):
+        return import_book(
+            read_rows(stream, fmt),
+            user=user,
+            source_name=options['path'],
+            batch_size=options['batch_size'],
+        )
@@ -0,0 +1,68 @@
+"""
+Management command to bulk load risk snapshots from a custodian file
+"""
+
+import sys
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from bastion.core.ingestion import FORMATS, ingest_snapshots, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Upserts risk snapshots from a CSV, JSON Lines or JSON file ("-" for stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to load, or - to read stdin')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default=None,
+            help='File format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--data-source',
+            default='',
+            help='Provenance for rows without a data_source column, e.g. "Fidelity API"'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Rows validated and upserted per transaction'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            suffix = Path(path).suffix.lower().lstrip('.')
+            fmt = {'ndjson': 'jsonl'}.get(suffix, suffix)
+            if fmt not in FORMATS:
+                raise CommandError('Cannot infer the format; pass --format')
+
+        if path == '-':
+            result = self._ingest(sys.stdin, fmt, options)
+        else:
+            try:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    result = self._ingest(stream, fmt, options)
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        for error in result.errors[:20]:
+            self.stderr.write(f"  line {error['line']}: {error['error']}")
+        if result.error_count > 20:
+            self.stderr.write(f'  ...and {result.error_count - 20} more rejected rows')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Upserted {result.upserted} of {result.rows} rows in {result.batches} batches '
+            f'({result.error_count} rejected)'
+        ))
+
+    def _ingest(self, stream, fmt, options):
+        return ingest_snapshots(
+            read_rows(stream, fmt),
+            data_source=options['data_source'],
+            source_name=options['path'],
+            batch_size=options['batch_size'],
+        )
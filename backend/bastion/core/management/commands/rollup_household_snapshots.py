@@ -0,0 +1,35 @@
+"""
+Management command to derive household risk snapshots from client snapshots
+"""
+
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from bastion.core.household_rollup import rollup_households
+
+
+class Command(BaseCommand):
+    help = 'Derives household risk snapshots from their members\' client snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--household',
+            action='append',
+            default=None,
+            help='Only this household (repeatable)'
+        )
+        parser.add_argument(
+            '--since',
+            default=None,
+            help='Only derive snapshots from this date (YYYY-MM-DD) onwards'
+        )
+
+    def handle(self, *args, **options):
+        since = options['since']
+        if since:
+            try:
+                since = date.fromisoformat(since)
+            except ValueError:
+                raise CommandError(f'Invalid --since date: {since}')
+
+        written = rollup_households(options['household'], since=since)
+        self.stdout.write(self.style.SUCCESS(f'Derived {written} household snapshots'))
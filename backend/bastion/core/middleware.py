@@ -4,8 +4,12 @@ Custom middleware for the Bastion platform
 
 import uuid
 import logging
+from django.conf import settings
+from django.db import connection
 from django.utils.deprecation import MiddlewareMixin
 
+from .query_budget import QueryCounter, check_budget, resolve_budget
+
 logger = logging.getLogger('bastion.audit')
 
 
@@ -55,3 +59,32 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
             response['Pragma'] = 'no-cache'
 
         return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts database queries per request against the view's query budget
+    QUERY_BUDGET_MODE 'warn' logs overruns, 'raise' fails the request,
+    'off' skips counting (see bastion.core.query_budget)
+    Sync-only: installed by the development and test settings, not in production
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+        if mode == 'off':
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = str(counter.count)
+        budget = getattr(request, 'query_budget', None)
+        check_budget(f'{request.method} {request.path}', counter.count, budget, mode)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = resolve_budget(view_func, request.method)
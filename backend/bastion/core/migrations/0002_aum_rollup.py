@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AumRollup',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('as_of_date', models.DateField()),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('equity_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('fixed_income_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('cash_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('alternative_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('snapshot_count', models.PositiveIntegerField(default=0)),
+                ('household', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='aum_rollups', to='core.household')),
+            ],
+            options={
+                'ordering': ['as_of_date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='aumrollup',
+            constraint=models.UniqueConstraint(fields=('household', 'as_of_date'), name='aum_rollup_household_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='aumrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('household__isnull', True)), fields=('as_of_date',), name='aum_rollup_firm_date'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def populate_latest(apps, schema_editor):
+    RiskSnapshot = apps.get_model('core', 'RiskSnapshot')
+    LatestRiskSnapshot = apps.get_model('core', 'LatestRiskSnapshot')
+
+    newest = {}
+    rows = RiskSnapshot.objects.order_by('as_of_date').values_list(
+        'id', 'client_id', 'household_id', 'as_of_date'
+    )
+    for snapshot_id, client_id, household_id, as_of_date in rows.iterator(chunk_size=5000):
+        newest[(client_id, household_id)] = (snapshot_id, as_of_date)
+
+    LatestRiskSnapshot.objects.bulk_create(
+        [
+            LatestRiskSnapshot(
+                client_id=client_id,
+                household_id=household_id,
+                snapshot_id=snapshot_id,
+                as_of_date=as_of_date,
+            )
+            for (client_id, household_id), (snapshot_id, as_of_date) in newest.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_aum_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestRiskSnapshot',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('as_of_date', models.DateField()),
+                ('client', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='latest_snapshot', to='core.client')),
+                ('household', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='latest_snapshot', to='core.household')),
+                ('snapshot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.risksnapshot')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(populate_latest, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_latest_risk_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='risksnapshot',
+            name='drawdown',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='risksnapshot',
+            name='exposure_drift',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='risksnapshot',
+            name='period_return',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='risksnapshot',
+            name='volatility',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=9, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_risk_snapshot_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotSeries',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('point_count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('client', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='snapshot_series', to='core.client')),
+                ('household', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='snapshot_series', to='core.household')),
+            ],
+            options={
+                'verbose_name_plural': 'snapshot series',
+            },
+        ),
+    ]
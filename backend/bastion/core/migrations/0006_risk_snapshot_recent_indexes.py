@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_snapshot_series'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='risksnapshot',
+            index=models.Index(fields=['client', '-as_of_date'], name='risk_snapshot_client_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='risksnapshot',
+            index=models.Index(fields=['household', '-as_of_date'], name='risk_snapshot_household_recent'),
+        ),
+    ]
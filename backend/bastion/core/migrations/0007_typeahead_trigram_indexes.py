@@ -0,0 +1,37 @@
+# Trigram indexes for the typeahead search (bastion.core.search)
+
+from django.db import migrations
+
+# Expressions must match the queries in bastion.core.search
+INDEXES = {
+    'client_name_trgm': "core_client USING gin (lower(first_name || ' ' || last_name) gin_trgm_ops)",
+    'client_email_trgm': 'core_client USING gin (lower(email) gin_trgm_ops)',
+    'household_name_trgm': 'core_household USING gin (lower(name) gin_trgm_ops)',
+}
+
+
+def create_indexes(apps, schema_editor):
+    # PostgreSQL only; other databases use the in-process prefix index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, definition in INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_risk_snapshot_recent_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
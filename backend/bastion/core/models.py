@@ -4,7 +4,10 @@ Security-first, audit-ready design
 """
 
 import uuid
-from django.db import models
+from decimal import Decimal
+from django.db import connection, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils import timezone
 
@@ -263,11 +266,36 @@ class Account(BaseModel):
 # RISK SNAPSHOT
 # =============================================================================
 
+class RiskSnapshotQuerySet(models.QuerySet):
+
+    def latest_per_target(self, as_of=None):
+        """
+        Newest snapshot per client or household, optionally as of a date
+
+        DISTINCT ON where the database supports it, a ROW_NUMBER() window
+        elsewhere. For current values use LatestRiskSnapshot instead.
+        """
+        queryset = self.filter(as_of_date__lte=as_of) if as_of else self
+        if connection.features.can_distinct_on_fields:
+            return queryset.order_by('client_id', 'household_id', '-as_of_date').distinct(
+                'client_id', 'household_id'
+            )
+        return queryset.annotate(
+            _recency=Window(
+                RowNumber(),
+                partition_by=[F('client_id'), F('household_id')],
+                order_by=F('as_of_date').desc(),
+            )
+        ).filter(_recency=1)
+
+
 class RiskSnapshot(BaseModel):
     """
     Point-in-time risk state for a client or household
     Immutable once created for audit purposes
     """
+    objects = RiskSnapshotQuerySet.as_manager()
+
     # Target
     client = models.ForeignKey(
         Client,
@@ -298,6 +326,12 @@ class RiskSnapshot(BaseModel):
     risk_score = models.CharField(max_length=50, blank=True)  # e.g., "Moderate"
     max_drawdown_ytd = models.DecimalField(max_digits=5, decimal_places=2, null=True)
 
+    # Analytics (written by bastion.core.analytics; percentages)
+    drawdown = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    period_return = models.DecimalField(max_digits=9, decimal_places=4, null=True, blank=True)
+    volatility = models.DecimalField(max_digits=9, decimal_places=4, null=True, blank=True)
+    exposure_drift = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+
     # Provenance
     data_source = models.CharField(max_length=100)  # e.g., "Fidelity API"
     source_timestamp = models.DateTimeField()
@@ -311,7 +345,144 @@ class RiskSnapshot(BaseModel):
             ['client', 'as_of_date'],
             ['household', 'as_of_date'],
         ]
+        indexes = [
+            # Newest-first per target: "latest on or before a date" is one seek
+            models.Index(fields=['client', '-as_of_date'], name='risk_snapshot_client_recent'),
+            models.Index(fields=['household', '-as_of_date'], name='risk_snapshot_household_recent'),
+        ]
 
     def __str__(self):
         target = self.client or self.household
         return f'Risk Snapshot: {target} ({self.as_of_date})'
+
+
+class LatestRiskSnapshot(BaseModel):
+    """
+    Pointer to the newest risk snapshot of a client or household
+    Maintained on snapshot writes so current values are a single join
+    """
+    client = models.OneToOneField(
+        Client,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='latest_snapshot'
+    )
+    household = models.OneToOneField(
+        Household,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='latest_snapshot'
+    )
+    snapshot = models.OneToOneField(
+        RiskSnapshot,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    as_of_date = models.DateField()
+
+    def __str__(self):
+        target = self.client or self.household
+        return f'Latest Snapshot: {target} ({self.as_of_date})'
+
+
+class SnapshotSeries(BaseModel):
+    """
+    Packed snapshot history of one client or household
+    Columnar arrays in one compressed blob (see bastion.core.series);
+    kept in step with snapshot writes, rebuilt by backfill_snapshot_series
+    """
+    client = models.OneToOneField(
+        Client,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='snapshot_series'
+    )
+    household = models.OneToOneField(
+        Household,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='snapshot_series'
+    )
+    start_date = models.DateField()
+    end_date = models.DateField()
+    point_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        verbose_name_plural = 'snapshot series'
+
+    def __str__(self):
+        target = self.client or self.household
+        return f'Snapshot Series: {target} ({self.start_date} - {self.end_date})'
+
+
+# =============================================================================
+# AUM ROLLUP
+# =============================================================================
+
+class AumRollup(BaseModel):
+    """
+    Daily AUM and exposure mix for the firm or one household
+    Derived from risk snapshots; maintained on write, rebuilt by backfill_aum_rollups
+    """
+    # Target (no household = firm-wide)
+    household = models.ForeignKey(
+        Household,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='aum_rollups'
+    )
+    as_of_date = models.DateField()
+
+    # Dollar values, so rows can be summed
+    total_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    equity_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    fixed_income_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    cash_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    alternative_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    # Households and standalone clients counted
+    snapshot_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['as_of_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['household', 'as_of_date'],
+                name='aum_rollup_household_date'
+            ),
+            models.UniqueConstraint(
+                fields=['as_of_date'],
+                condition=models.Q(household__isnull=True),
+                name='aum_rollup_firm_date'
+            ),
+        ]
+
+    def __str__(self):
+        return f'AUM Rollup: {self.household or "Firm"} ({self.as_of_date})'
+
+    def _share(self, value):
+        if not self.total_value:
+            return Decimal('0.00')
+        return (value * 100 / self.total_value).quantize(Decimal('0.01'))
+
+    @property
+    def equity_exposure(self):
+        return self._share(self.equity_value)
+
+    @property
+    def fixed_income_exposure(self):
+        return self._share(self.fixed_income_value)
+
+    @property
+    def cash_exposure(self):
+        return self._share(self.cash_value)
+
+    @property
+    def alternative_exposure(self):
+        return self._share(self.alternative_value)
@@ -0,0 +1,130 @@
+"""
+Household Overview
+Everything the household page shows, in one fixed set of queries, cached briefly
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from bastion.audit.activity import activity_item
+from bastion.audit.models import AuditEvent
+from bastion.briefings.models import Briefing
+from bastion.documents.models import Document
+from .models import Account, Client, Household
+
+CACHE_KEY = 'household_overview:{}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def load_household_overview(household_id):
+    """
+    A household with its active clients and accounts, latest snapshot,
+    recent documents, pending briefings and recent activity
+
+    Six queries whatever the household's size: each section is one
+    select with its relations joined and counts annotated. Documents
+    and briefings filed against a member client are included. None if
+    the household does not exist.
+    """
+    household = Household.objects.select_related('latest_snapshot__snapshot').annotate(
+        active_client_count=Count('clients', filter=Q(clients__is_active=True), distinct=True)
+    ).filter(pk=household_id).first()
+    if household is None:
+        return None
+
+    limit = _setting('HOUSEHOLD_OVERVIEW_ITEMS', 10)
+    clients = list(
+        Client.objects.filter(household=household, is_active=True)
+        .select_related('household', 'latest_snapshot__snapshot')
+        .annotate(active_account_count=Count('accounts', filter=Q(accounts__is_active=True), distinct=True))
+        .order_by('last_name', 'first_name')
+    )
+    accounts = list(
+        Account.objects.filter(household=household, is_active=True).select_related('client').order_by('client', 'name')
+    )
+    filed_here = Q(household=household) | Q(client__household=household)
+    documents = list(
+        Document.objects.filter(filed_here, status=Document.Status.ACTIVE)
+        .select_related('category', 'household')
+        .order_by('-created_at')[:limit]
+    )
+    briefings = list(
+        Briefing.objects.filter(filed_here, status__in=[Briefing.Status.DRAFT, Briefing.Status.PENDING_REVIEW])
+        .select_related('household', 'client')
+        .order_by('-created_at')[:limit]
+    )
+
+    # Events are tied to a household either by their scope columns or as their target
+    client_ids = [client.pk for client in clients]
+    events = AuditEvent.objects.filter(
+        Q(household_id=household.pk)
+        | Q(client_id__in=client_ids)
+        | Q(target_type='Household', target_id=str(household.pk))
+        | Q(target_type='Client', target_id__in=[str(pk) for pk in client_ids])
+    ).order_by('-timestamp')[:limit]
+
+    return {
+        'household': household,
+        'latest_snapshot': getattr(getattr(household, 'latest_snapshot', None), 'snapshot', None),
+        'clients': clients,
+        'accounts': accounts,
+        'documents': documents,
+        'briefings': briefings,
+        'activity': [activity_item(event) for event in events],
+    }
+
+
+def household_overview(household_id, render=None):
+    """
+    Cached overview of a household; loaded on a miss
+
+    `render` turns the loaded overview into what is cached and returned
+    (the API passes its serializer), so a hit runs no queries at all.
+    Related writes invalidate the entry; the short timeout bounds
+    staleness from bulk writes that bypass signals. None if the
+    household does not exist.
+    """
+    key = CACHE_KEY.format(household_id)
+    data = cache.get(key)
+    if data is None:
+        overview = load_household_overview(household_id)
+        if overview is None:
+            return None
+        data = render(overview) if render else overview
+        cache.set(key, data, timeout=_setting('HOUSEHOLD_OVERVIEW_TIMEOUT', 60))
+    return data
+
+
+def invalidate_household_overview(*household_ids):
+    cache.delete_many([CACHE_KEY.format(pk) for pk in set(household_ids) if pk])
+
+
+def invalidate_household_overview_on_commit(household_ids=(), client_ids=()):
+    """
+    Drop the households' overviews once the transaction commits
+
+    Clients are resolved to their households in one query at commit,
+    and calls within one transaction collapse into a single delete.
+    Invalidating after commit keeps a concurrent reader from caching
+    the pre-write state again.
+    """
+    pending = getattr(connection, '_household_overview_pending', None) or (set(), set())
+    pending[0].update(pk for pk in household_ids if pk)
+    pending[1].update(pk for pk in client_ids if pk)
+    connection._household_overview_pending = pending
+
+    def run():
+        households, clients = getattr(connection, '_household_overview_pending', None) or (set(), set())
+        connection._household_overview_pending = None
+        if clients:
+            households |= set(
+                Client.objects.filter(pk__in=clients, household__isnull=False).values_list('household_id', flat=True)
+            )
+        invalidate_household_overview(*households)
+
+    transaction.on_commit(run)
@@ -0,0 +1,81 @@
+"""
+Query Budgets
+Per-action limits on database queries, counted per request
+"""
+
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger('bastion.core')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more queries than its action allows"""
+
+
+def query_budget(limit: int):
+    """
+    Declare the most queries an API action or handler may run
+
+        @action(detail=True, methods=['get'])
+        @query_budget(4)
+        def accounts(self, request, pk=None): ...
+
+    Standard viewset actions are declared with a `query_budgets`
+    attribute instead, e.g. query_budgets = {'list': 4, 'retrieve': 3}.
+    A limit of None exempts a handler whose work grows with its input,
+    such as a bulk import.
+    """
+    def decorate(handler):
+        handler.query_budget = limit
+        return handler
+    return decorate
+
+
+def resolve_budget(view_func, method: str):
+    """
+    The query budget of the view a request resolved to
+
+    Decorated handlers first, then the view class's `query_budgets`,
+    then QUERY_BUDGET_DEFAULT. None for views outside DRF and exempt
+    handlers.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return None
+    actions = getattr(view_func, 'actions', None) or {}
+    name = actions.get(method.lower(), method.lower())
+    handler = getattr(view_class, name, None)
+    if hasattr(handler, 'query_budget'):
+        return handler.query_budget
+    budget = getattr(view_class, 'query_budgets', {}).get(name)
+    if budget is None:
+        budget = _setting('QUERY_BUDGET_DEFAULT', 10)
+    return budget
+
+
+class QueryCounter:
+    """Database execute wrapper counting the statements run through it"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def check_budget(label: str, count: int, budget, mode: str = None):
+    """Report a count over budget: 'warn' logs it, 'raise' fails the request"""
+    mode = mode or _setting('QUERY_BUDGET_MODE', 'off')
+    if budget is None or count <= budget or mode == 'off':
+        return
+    message = f"QUERY_BUDGET: exceeded | view={label} | queries={count} | budget={budget}"
+    if mode == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,239 @@
+"""
+AUM Rollups
+Daily firm and household AUM series derived from risk snapshots
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Max, Q, Subquery
+from django.db.models.functions import Trunc
+
+from .bulk import bulk_insert
+from .models import AumRollup, Client, RiskSnapshot
+
+logger = logging.getLogger('bastion.core')
+
+VALUE_FIELDS = ('total_value', 'equity_value', 'fixed_income_value', 'cash_value', 'alternative_value')
+_EXPOSURE_FIELDS = ('equity_exposure', 'fixed_income_exposure', 'cash_exposure', 'alternative_exposure')
+_SNAPSHOT_FIELDS = ('total_value', *_EXPOSURE_FIELDS)
+_ZERO = (Decimal('0'),) * len(VALUE_FIELDS)
+_CENT = Decimal('0.01')
+
+INTERVALS = ('day', 'week', 'month')
+
+
+def aum_snapshots():
+    """
+    Snapshots that count towards AUM
+
+    Household snapshots, plus client snapshots for clients outside any
+    household; household members are covered by their household's
+    snapshot.
+    """
+    return RiskSnapshot.objects.filter(
+        Q(household__isnull=False) | Q(client__isnull=False, client__household__isnull=True)
+    )
+
+
+def snapshot_values(total, equity, fixed_income, cash, alternative) -> tuple:
+    """Exposure percentages as dollar values, in VALUE_FIELDS order"""
+    return (total, *((total * share / 100).quantize(_CENT) for share in (equity, fixed_income, cash, alternative)))
+
+
+def _values(snapshot) -> tuple:
+    if snapshot is None:
+        return _ZERO
+    return snapshot_values(*(getattr(snapshot, field) for field in _SNAPSHOT_FIELDS))
+
+
+def _counts(snapshot) -> bool:
+    if snapshot.household_id:
+        return True
+    return bool(snapshot.client_id) and Client.objects.filter(
+        pk=snapshot.client_id, household__isnull=True
+    ).exists()
+
+
+def apply_snapshot(snapshot, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) one snapshot's effect on the rollups
+
+    A snapshot holds its target's value from its date until the target's
+    next snapshot, so the firm rows in that range move by the difference
+    from the value it replaces - one UPDATE, however long the history.
+    The household row for the date is written or dropped. Only valid
+    while the target's other snapshots are unchanged; deletes go through
+    rebuild_rollups_on_commit() since cascades remove them together.
+    """
+    if not _counts(snapshot):
+        return
+
+    target = {'household_id': snapshot.household_id} if snapshot.household_id else {'client_id': snapshot.client_id}
+    others = RiskSnapshot.objects.filter(**target).exclude(pk=snapshot.pk)
+    previous = others.filter(as_of_date__lt=snapshot.as_of_date).order_by('-as_of_date').first()
+    following = others.filter(as_of_date__gt=snapshot.as_of_date).order_by('as_of_date').values_list(
+        'as_of_date', flat=True
+    ).first()
+
+    delta = [sign * (new - old) for new, old in zip(_values(snapshot), _values(previous))]
+    count_delta = 0 if previous else sign
+    date = snapshot.as_of_date
+
+    with transaction.atomic():
+        if snapshot.household_id:
+            if sign > 0:
+                AumRollup.objects.update_or_create(
+                    household_id=snapshot.household_id,
+                    as_of_date=date,
+                    defaults={**dict(zip(VALUE_FIELDS, _values(snapshot))), 'snapshot_count': 1},
+                )
+            else:
+                AumRollup.objects.filter(household_id=snapshot.household_id, as_of_date=date).delete()
+
+        firm = AumRollup.objects.filter(household__isnull=True)
+        if not firm.filter(as_of_date=date).exists():
+            # Carry the firm's state forward to the new date before moving it
+            base = firm.filter(as_of_date__lt=date).order_by('-as_of_date').first()
+            AumRollup.objects.get_or_create(
+                household=None,
+                as_of_date=date,
+                defaults={
+                    **{field: getattr(base, field) for field in VALUE_FIELDS},
+                    'snapshot_count': base.snapshot_count,
+                } if base else {},
+            )
+
+        affected = firm.filter(as_of_date__gte=date)
+        if following:
+            affected = affected.filter(as_of_date__lt=following)
+        affected.update(
+            snapshot_count=F('snapshot_count') + count_delta,
+            **{field: F(field) + change for field, change in zip(VALUE_FIELDS, delta)},
+        )
+
+
+def rebuild_rollups(since=None) -> int:
+    """
+    Recompute rollup rows from `since` (or the first snapshot) onwards
+
+    The running state is seeded with each target's newest snapshot before
+    `since`, then one ordered pass over the later AUM snapshots keeps
+    each target's current value and the firm totals, emitting a firm row
+    for every snapshot date and a household row per household snapshot.
+    Returns the rows written.
+    """
+    fields = ('household_id', 'client_id', 'as_of_date', *_SNAPSHOT_FIELDS)
+    snapshots = aum_snapshots()
+    current = {}
+    if since is not None:
+        seed = snapshots.latest_per_target(as_of=since - timedelta(days=1)).values_list(*fields)
+        for household_id, client_id, _, *values in seed.iterator(chunk_size=5000):
+            key = ('household', household_id) if household_id else ('client', client_id)
+            current[key] = snapshot_values(*values)
+        snapshots = snapshots.filter(as_of_date__gte=since)
+    rows = snapshots.order_by('as_of_date').values_list(*fields).iterator(chunk_size=5000)
+
+    totals = [sum(column, Decimal('0')) for column in zip(_ZERO, *current.values())]
+    pending = []
+    written = 0
+    last_date = None
+
+    def emit_firm(date):
+        pending.append(AumRollup(
+            household=None,
+            as_of_date=date,
+            snapshot_count=len(current),
+            **dict(zip(VALUE_FIELDS, totals)),
+        ))
+
+    with transaction.atomic():
+        stale = AumRollup.objects.all()
+        if since is not None:
+            stale = stale.filter(as_of_date__gte=since)
+        stale.delete()
+
+        for household_id, client_id, date, *raw in rows:
+            if last_date is not None and date != last_date:
+                emit_firm(last_date)
+            last_date = date
+
+            values = snapshot_values(*raw)
+            key = ('household', household_id) if household_id else ('client', client_id)
+            old = current.get(key, _ZERO)
+            totals = [total + new - prior for total, new, prior in zip(totals, values, old)]
+            current[key] = values
+
+            if household_id:
+                pending.append(AumRollup(
+                    household_id=household_id,
+                    as_of_date=date,
+                    snapshot_count=1,
+                    **dict(zip(VALUE_FIELDS, values)),
+                ))
+
+            if len(pending) >= 5000:
+                bulk_insert(AumRollup, pending)
+                written += len(pending)
+                pending = []
+
+        if last_date is not None:
+            emit_firm(last_date)
+        bulk_insert(AumRollup, pending)
+        written += len(pending)
+
+    logger.info(f"AUM: rollups rebuilt | since={since} | rows={written}")
+    return written
+
+
+def rebuild_rollups_on_commit(since):
+    """
+    Rebuild from `since` once the current transaction commits
+
+    Calls within one transaction collapse into a single rebuild from the
+    earliest date, so a cascade deleting many snapshots costs one pass.
+    """
+    pending = getattr(connection, '_aum_rollup_since', None)
+    connection._aum_rollup_since = since if pending is None else min(pending, since)
+
+    def run():
+        since = getattr(connection, '_aum_rollup_since', None)
+        connection._aum_rollup_since = None
+        if since is not None:
+            rebuild_rollups(since=since)
+
+    transaction.on_commit(run)
+
+
+def aum_series(start, end, household=None, interval: str = 'day'):
+    """
+    Rollup rows between start and end, one per interval
+
+    Each week or month is represented by its last row (AUM is a level,
+    not a flow). The buckets are picked in SQL, so only the returned
+    points are read.
+    """
+    rows = AumRollup.objects.filter(as_of_date__range=(start, end))
+    rows = rows.filter(household=household) if household else rows.filter(household__isnull=True)
+    if interval != 'day':
+        bucket_ends = (
+            rows.order_by()
+            .annotate(bucket=Trunc('as_of_date', interval))
+            .values('bucket')
+            .annotate(last=Max('as_of_date'))
+            .values('last')
+        )
+        rows = rows.filter(as_of_date__in=Subquery(bucket_ends))
+    return rows.order_by('as_of_date')
+
+
+def default_interval(start, end) -> str:
+    """Daily points up to a quarter, weekly up to two years, then monthly"""
+    span = end - start
+    if span <= timedelta(days=92):
+        return 'day'
+    if span <= timedelta(days=731):
+        return 'week'
+    return 'month'
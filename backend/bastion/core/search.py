@@ -0,0 +1,192 @@
+"""
+Typeahead Search
+Ranked client and household lookup for the hub search box
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Client, Household
+
+GENERATION_KEY = 'typeahead:generation'
+TYPES = ('client', 'household')
+
+# Match tiers, best first
+_PREFIX, _CONTAINS, _EMAIL, _FUZZY = range(4)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+def typeahead(query: str, limit: int = 8, types=TYPES) -> list:
+    """
+    Best matching active clients and households for a partial query
+
+    Name prefixes rank first, then names containing the query, then
+    email prefixes; PostgreSQL adds misspellings by trigram word
+    similarity. Trigram GIN indexes serve the query there; elsewhere an
+    in-process prefix index does (see PrefixIndex).
+    """
+    query = normalize(query)
+    if not query:
+        return []
+    if connection.vendor == 'postgresql':
+        return _trigram_search(query, limit, types)
+    return prefix_index().search(query, limit, types)
+
+
+# =============================================================================
+# POSTGRESQL
+# =============================================================================
+
+# Expressions must match the indexes created in core migration 0007
+_CLIENT_NAME = "lower(first_name || ' ' || last_name)"
+_CLIENT_SQL = f"""
+    (SELECT 'client' AS type, id, first_name || ' ' || last_name AS label, email AS detail,
+        CASE
+            WHEN {_CLIENT_NAME} LIKE %(prefix)s OR lower(last_name) LIKE %(prefix)s THEN {_PREFIX}
+            WHEN {_CLIENT_NAME} LIKE %(contains)s THEN {_CONTAINS}
+            WHEN lower(email) LIKE %(prefix)s THEN {_EMAIL}
+            ELSE {_FUZZY}
+        END AS tier,
+        word_similarity(%(query)s, {_CLIENT_NAME}) AS score
+    FROM core_client
+    WHERE is_active AND (
+        {_CLIENT_NAME} LIKE %(contains)s OR lower(email) LIKE %(prefix)s OR %(query)s <%% {_CLIENT_NAME}
+    )
+    ORDER BY tier, score DESC, label
+    LIMIT %(limit)s)
+"""
+_HOUSEHOLD_SQL = f"""
+    (SELECT 'household' AS type, id, name AS label, '' AS detail,
+        CASE
+            WHEN lower(name) LIKE %(prefix)s THEN {_PREFIX}
+            WHEN lower(name) LIKE %(contains)s THEN {_CONTAINS}
+            ELSE {_FUZZY}
+        END AS tier,
+        word_similarity(%(query)s, lower(name)) AS score
+    FROM core_household
+    WHERE lower(name) LIKE %(contains)s OR %(query)s <%% lower(name)
+    ORDER BY tier, score DESC, label
+    LIMIT %(limit)s)
+"""
+
+
+def _like_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _trigram_search(query, limit, types) -> list:
+    parts = [sql for name, sql in (('client', _CLIENT_SQL), ('household', _HOUSEHOLD_SQL)) if name in types]
+    escaped = _like_escape(query)
+    params = {'query': query, 'prefix': f'{escaped}%', 'contains': f'%{escaped}%', 'limit': limit}
+    with connection.cursor() as cursor:
+        cursor.execute(f"{' UNION ALL '.join(parts)} ORDER BY tier, score DESC, label LIMIT %(limit)s", params)
+        rows = cursor.fetchall()
+    return [
+        {'type': kind, 'id': pk, 'label': label, 'detail': detail}
+        for kind, pk, label, detail, _, _ in rows
+    ]
+
+
+# =============================================================================
+# IN-PROCESS PREFIX INDEX
+# =============================================================================
+
+class PrefixIndex:
+    """
+    Sorted keys per match tier, searched by bisection
+
+    Full names (and "last first") make the prefix tier, every other name
+    word the contains tier, emails their own. A lookup is a binary
+    search and a short forward scan per tier, so its cost barely grows
+    with the book.
+    """
+
+    def __init__(self, clients, households):
+        self.records = []
+        tiers = {_PREFIX: [], _CONTAINS: [], _EMAIL: []}
+        for pk, first, last, email in clients:
+            record = len(self.records)
+            self.records.append({'type': 'client', 'id': pk, 'label': f'{first} {last}', 'detail': email})
+            name = normalize(f'{first} {last}')
+            tiers[_PREFIX].extend((key, record) for key in {name, normalize(f'{last} {first}')})
+            tiers[_CONTAINS].extend((word, record) for word in set(name.split()[1:-1]))
+            tiers[_EMAIL].append((email.lower(), record))
+        for pk, name in households:
+            record = len(self.records)
+            self.records.append({'type': 'household', 'id': pk, 'label': name, 'detail': ''})
+            words = normalize(name).split()
+            tiers[_PREFIX].append((' '.join(words), record))
+            tiers[_CONTAINS].extend((' '.join(words[i:]), record) for i in range(1, len(words)))
+        self.tiers = []
+        for entries in tiers.values():
+            entries.sort()
+            self.tiers.append(([key for key, _ in entries], [record for _, record in entries]))
+
+    def __len__(self):
+        return len(self.records)
+
+    def search(self, query: str, limit: int = 8, types=TYPES) -> list:
+        found, seen = [], set()
+        for keys, records in self.tiers:
+            position = bisect_left(keys, query)
+            while position < len(keys) and keys[position].startswith(query) and len(found) < limit:
+                record = records[position]
+                position += 1
+                if record in seen or self.records[record]['type'] not in types:
+                    continue
+                seen.add(record)
+                found.append(self.records[record])
+        return found
+
+
+_index = {'index': None, 'generation': None, 'built_at': 0.0}
+_index_lock = threading.Lock()
+
+
+def build_prefix_index() -> PrefixIndex:
+    return PrefixIndex(
+        Client.objects.filter(is_active=True).values_list('pk', 'first_name', 'last_name', 'email').iterator(),
+        Household.objects.values_list('pk', 'name').iterator(),
+    )
+
+
+def prefix_index() -> PrefixIndex:
+    """
+    This process's prefix index, rebuilt when clients or households change
+
+    Writes bump a generation counter in the shared cache (see
+    invalidate_typeahead()); a timeout bounds staleness from bulk writes
+    that bypass signals.
+    """
+    generation = cache.get(GENERATION_KEY, 0)
+    timeout = _setting('TYPEAHEAD_INDEX_TIMEOUT', 300)
+    with _index_lock:
+        if (
+            _index['index'] is None
+            or _index['generation'] != generation
+            or time.monotonic() - _index['built_at'] > timeout
+        ):
+            _index.update(index=build_prefix_index(), generation=generation, built_at=time.monotonic())
+        return _index['index']
+
+
+def invalidate_typeahead():
+    """Mark every process's prefix index stale"""
+    if connection.vendor == 'postgresql':
+        return
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
@@ -0,0 +1,302 @@
+"""
+Snapshot Series
+Compact columnar per-target histories stored beside the snapshot rows
+"""
+
+import logging
+import uuid
+import zlib
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .analytics import EXPOSURE_FIELDS
+from .models import RiskSnapshot, SnapshotSeries
+
+logger = logging.getLogger('bastion.core')
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+# Column order in the blob; widest first so every column stays aligned
+_COLUMNS = (('cents', '<i8', 1), ('days', '<i4', 1), ('basis_points', '<i4', len(EXPOSURE_FIELDS)))
+
+
+@dataclass
+class SeriesData:
+    """
+    A target's history as arrays, sorted by date
+
+    Values are held in cents and exposures in basis points, so packing
+    is exact.
+    """
+    dates: np.ndarray
+    cents: np.ndarray
+    basis_points: np.ndarray
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.empty(0, dtype='datetime64[D]'),
+            np.empty(0, dtype=np.int64),
+            np.empty((0, len(EXPOSURE_FIELDS)), dtype=np.int32),
+        )
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.cents / 100
+
+    @property
+    def exposures(self) -> np.ndarray:
+        """Exposure percentages, one column per EXPOSURE_FIELDS entry"""
+        return self.basis_points / 100
+
+    def slice(self, start=None, end=None) -> 'SeriesData':
+        """Points between start and end inclusive, as views (no copy)"""
+        low = np.searchsorted(self.dates, np.datetime64(start, 'D')) if start else 0
+        high = np.searchsorted(self.dates, np.datetime64(end, 'D'), side='right') if end else len(self)
+        return SeriesData(self.dates[low:high], self.cents[low:high], self.basis_points[low:high])
+
+    def take(self, index) -> 'SeriesData':
+        return SeriesData(self.dates[index], self.cents[index], self.basis_points[index])
+
+    def downsample(self, max_points: int) -> 'SeriesData':
+        """At most `max_points` points chosen by LTTB on the value line"""
+        days = (self.dates - _EPOCH).astype(float)
+        return self.take(lttb(days, self.cents.astype(float), max_points))
+
+    def points(self) -> list:
+        """Per-date dicts in the shape of a snapshot summary"""
+        return [
+            {
+                'as_of_date': day.item(),
+                'total_value': Decimal(int(cents)).scaleb(-2),
+                **{name: Decimal(int(bp)).scaleb(-2) for name, bp in zip(EXPOSURE_FIELDS, row)},
+            }
+            for day, cents, row in zip(self.dates, self.cents, self.basis_points)
+        ]
+
+
+# =============================================================================
+# PACKING
+# =============================================================================
+
+def pack(series: SeriesData) -> bytes:
+    """Columns back to back, then zlib; dates are stored as day deltas, which compress to almost nothing"""
+    days = (series.dates - _EPOCH).astype(np.int64)
+    deltas = np.diff(days, prepend=0).astype('<i4')
+    columns = (series.cents.astype('<i8'), deltas, series.basis_points.astype('<i4'))
+    return zlib.compress(b''.join(column.tobytes() for column in columns))
+
+
+def unpack(data: bytes, count: int) -> SeriesData:
+    raw = zlib.decompress(bytes(data))
+    arrays, offset = {}, 0
+    for name, dtype, width in _COLUMNS:
+        size = count * width
+        arrays[name] = np.frombuffer(raw, dtype=dtype, count=size, offset=offset)
+        offset += size * np.dtype(dtype).itemsize
+    dates = _EPOCH + np.cumsum(arrays['days']).astype('timedelta64[D]')
+    return SeriesData(dates, arrays['cents'], arrays['basis_points'].reshape(count, len(EXPOSURE_FIELDS)))
+
+
+def merge(older: SeriesData, newer: SeriesData) -> SeriesData:
+    """Combine two series; on the same date the newer point wins"""
+    if not len(older) or not len(newer):
+        return newer if len(newer) else older
+    dates = np.concatenate((older.dates, newer.dates))
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+    # Last of each run of equal dates, i.e. from `newer` where both have it
+    keep = order[np.r_[dates[1:] != dates[:-1], True]]
+    return SeriesData(
+        np.concatenate((older.dates, newer.dates))[keep],
+        np.concatenate((older.cents, newer.cents))[keep],
+        np.concatenate((older.basis_points, newer.basis_points))[keep],
+    )
+
+
+# =============================================================================
+# DOWNSAMPLING
+# =============================================================================
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points keeping the line's shape
+
+    The first and last points are kept; the rest are split into equal
+    buckets and from each the point forming the largest triangle with
+    the previous pick and the next bucket's average is taken. Peaks and
+    troughs survive, unlike with striding or averaging. Each bucket is
+    one vectorized step, so the cost is linear in the input.
+    """
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    # Bucket i covers edges[i]:edges[i + 1]; the last point is a bucket of its own
+    edges = (np.floor(np.arange(threshold - 1) * (count - 2) / (threshold - 2)).astype(int) + 1)
+    edges = np.append(edges, count)
+    sums_x = np.concatenate(([0.0], np.cumsum(x)))
+    sums_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = np.diff(edges)
+    average_x = (sums_x[edges[1:]] - sums_x[edges[:-1]]) / sizes
+    average_y = (sums_y[edges[1:]] - sums_y[edges[:-1]]) / sizes
+
+    picked = np.empty(threshold, dtype=int)
+    picked[0], picked[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        next_x, next_y = average_x[bucket + 1], average_y[bucket + 1]
+        area = np.abs(
+            (x[previous] - next_x) * (y[low:high] - y[previous])
+            - (x[previous] - x[low:high]) * (next_y - y[previous])
+        )
+        previous = low + int(np.argmax(area))
+        picked[bucket + 1] = previous
+    return picked
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+def read_series(target: str, target_id, start=None, end=None) -> SeriesData:
+    """
+    A client's or household's history between start and end
+
+    One single-row read and a decompress, however long the history.
+    Targets not yet backfilled are read from their snapshot rows.
+    """
+    row = SnapshotSeries.objects.filter(**{f'{target}_id': target_id}).values_list('point_count', 'data').first()
+    if row is None:
+        return _snapshot_arrays(target, [target_id]).get(uuid.UUID(str(target_id)), SeriesData.empty()).slice(start, end)
+    return unpack(row[1], row[0]).slice(start, end)
+
+
+# =============================================================================
+# WRITING
+# =============================================================================
+
+def _snapshot_arrays(target: str, ids, since=None):
+    """Snapshots of the targets from `since` as arrays, sorted by target and date"""
+    field = f'{target}_id'
+    queryset = RiskSnapshot.objects.filter(**{f'{field}__in': ids})
+    if since is not None:
+        queryset = queryset.filter(as_of_date__gte=since)
+    floats = {name: Cast(F(name), FloatField()) for name in ('total_value', *EXPOSURE_FIELDS)}
+    rows = list(
+        queryset.order_by(field, 'as_of_date')
+        .annotate(**{f'_{name}': expression for name, expression in floats.items()})
+        .values_list(field, 'as_of_date', *(f'_{name}' for name in floats))
+    )
+    if not rows:
+        return {}
+    keys, dates, *numbers = zip(*rows)
+    keys = np.array(keys, dtype=object)
+    numbers = np.rint(np.array(numbers, dtype=float) * 100).astype(np.int64)
+    dates = np.array(dates, dtype='datetime64[D]')
+
+    bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True])
+    return {
+        keys[low]: SeriesData(dates[low:high], numbers[0, low:high], numbers[1:, low:high].T.astype(np.int32))
+        for low, high in zip(bounds[:-1], bounds[1:])
+    }
+
+
+def sync_series(client_ids=(), household_ids=(), since=None) -> int:
+    """
+    Bring the targets' series in line with their snapshots from `since`
+
+    Points before `since` are kept from the stored blob; the rest are
+    re-read in one query per 1000 targets, so appends, corrections and
+    deletes all go through here. since=None rebuilds whole histories.
+    Returns series written.
+    """
+    written = 0
+    for target, ids in (('client', list(client_ids)), ('household', list(household_ids))):
+        for start in range(0, len(ids), 1000):
+            chunk = ids[start:start + 1000]
+            written += _sync_chunk(target, chunk, since)
+    if written:
+        logger.info(f"SERIES: snapshot series written | since={since} | series={written}")
+    return written
+
+
+def _sync_chunk(target, ids, since) -> int:
+    field = f'{target}_id'
+    ids = [uuid.UUID(str(target_id)) for target_id in ids]
+    fresh = _snapshot_arrays(target, ids, since)
+    now = timezone.now()
+    with transaction.atomic():
+        stored = {
+            getattr(row, field): row
+            for row in SnapshotSeries.objects.select_for_update().filter(**{f'{field}__in': ids})
+        }
+        created, updated, emptied = [], [], []
+        for target_id in ids:
+            row = stored.get(target_id)
+            series = fresh.get(target_id, SeriesData.empty())
+            if row is not None and since is not None:
+                kept = unpack(row.data, row.point_count).slice(end=np.datetime64(since, 'D') - 1)
+                series = merge(kept, series)
+            if not len(series):
+                if row is not None:
+                    emptied.append(row.pk)
+                continue
+
+            if row is None:
+                row = SnapshotSeries(**{field: target_id})
+                created.append(row)
+            else:
+                updated.append(row)
+            row.data = pack(series)
+            row.point_count = len(series)
+            row.start_date = series.dates[0].item()
+            row.end_date = series.dates[-1].item()
+            row.updated_at = now
+
+        SnapshotSeries.objects.bulk_create(created, batch_size=500)
+        SnapshotSeries.objects.bulk_update(
+            updated, ['data', 'point_count', 'start_date', 'end_date', 'updated_at'], batch_size=500
+        )
+        if emptied:
+            SnapshotSeries.objects.filter(pk__in=emptied).delete()
+    return len(created) + len(updated)
+
+
+def sync_series_on_commit(snapshot):
+    """
+    Sync the snapshot's target from its date once the transaction commits
+
+    Calls within one transaction collapse per target to the earliest
+    date, so a cascade deleting a whole history costs one sync.
+    """
+    pending = getattr(connection, '_snapshot_series_since', None) or {}
+    key = ('client', snapshot.client_id) if snapshot.client_id else ('household', snapshot.household_id)
+    pending[key] = min(pending.get(key, snapshot.as_of_date), snapshot.as_of_date)
+    connection._snapshot_series_since = pending
+
+    def run():
+        targets = getattr(connection, '_snapshot_series_since', None) or {}
+        connection._snapshot_series_since = None
+        for (target, target_id), since in targets.items():
+            sync_series(**{f'{target}_ids': [target_id]}, since=since)
+
+    transaction.on_commit(run)
+
+
+def rebuild_series() -> int:
+    """Rebuild every client and household series from the snapshots"""
+    snapshots = RiskSnapshot.objects.order_by()
+    client_ids = snapshots.filter(client__isnull=False).values_list('client_id', flat=True).distinct()
+    household_ids = snapshots.filter(household__isnull=False).values_list('household_id', flat=True).distinct()
+    SnapshotSeries.objects.exclude(client_id__in=client_ids).exclude(household_id__in=household_ids).delete()
+    return sync_series(client_ids=client_ids, household_ids=household_ids)
@@ -0,0 +1,179 @@
+"""
+Signal handlers
+Cache invalidation, unread counters, snapshot rollups, and live event stream publishing
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from bastion.audit.activity import activity_item
+from bastion.audit.models import AuditEvent, events_logged
+from bastion.briefings.models import Briefing, Notification
+from bastion.briefings.notifications import adjust_unread_count, notification_created
+from bastion.briefings.triggers import evaluate_on_commit
+from bastion.documents.models import Document
+from .dashboard import invalidate_dashboard_stats
+from .events import ACTIVITY_CHANNEL, publish
+from .household_rollup import rollup_enabled, rollup_members_on_commit, rollup_on_commit
+from .models import Account, Client, Household, RiskSnapshot
+from .overview import invalidate_household_overview_on_commit
+from .rollups import apply_snapshot, rebuild_rollups_on_commit
+from .search import invalidate_typeahead
+from .series import sync_series_on_commit
+from .snapshots import record_latest, refresh_latest_on_commit, refresh_latest_snapshots
+
+
+@receiver(post_save, sender=Notification, dispatch_uid='notification_stream')
+def notification_saved(sender, instance, created, **kwargs):
+    if created:
+        notification_created(instance)
+
+
+@receiver(post_delete, sender=Notification, dispatch_uid='notification_unread_delete')
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread_count(instance.user_id, -1)
+
+
+@receiver(post_save, sender=AuditEvent, dispatch_uid='activity_stream')
+def audit_event_logged(sender, instance, created, **kwargs):
+    if created:
+        publish(ACTIVITY_CHANNEL, 'activity', activity_item(instance))
+
+
+@receiver(events_logged, sender=AuditEvent, dispatch_uid='activity_stream_bulk')
+def audit_events_bulk_logged(sender, events, **kwargs):
+    # A bulk job can log thousands of events; the feed only shows the latest
+    limit = getattr(settings, 'EVENT_STREAM_ACTIVITY_BURST', 10)
+    for event in events[-limit:]:
+        publish(ACTIVITY_CHANNEL, 'activity', activity_item(event))
+    _overview_events(*events)
+
+
+@receiver(post_save, sender=AuditEvent, dispatch_uid='household_overview_activity')
+def audit_event_overview(sender, instance, created, **kwargs):
+    if created:
+        _overview_events(instance)
+
+
+def _overview_events(*events):
+    # Household activity: events scoped to a household or client, or targeting one
+    household_ids, client_ids = set(), set()
+    for event in events:
+        household_ids.add(event.household_id)
+        client_ids.add(event.client_id)
+        if event.target_type == 'Household':
+            household_ids.add(event.target_id)
+        elif event.target_type == 'Client':
+            client_ids.add(event.target_id)
+    if household_ids - {None} or client_ids - {None}:
+        invalidate_household_overview_on_commit(household_ids, client_ids)
+
+
+def _dashboard_changed(sender, **kwargs):
+    invalidate_dashboard_stats()
+
+
+for model in (Client, Household, Account, RiskSnapshot, Briefing):
+    post_save.connect(_dashboard_changed, sender=model, dispatch_uid=f'dashboard_save_{model.__name__}')
+    post_delete.connect(_dashboard_changed, sender=model, dispatch_uid=f'dashboard_delete_{model.__name__}')
+
+
+def _typeahead_changed(sender, **kwargs):
+    invalidate_typeahead()
+
+
+for model in (Client, Household):
+    post_save.connect(_typeahead_changed, sender=model, dispatch_uid=f'typeahead_save_{model.__name__}')
+    post_delete.connect(_typeahead_changed, sender=model, dispatch_uid=f'typeahead_delete_{model.__name__}')
+
+
+def _overview_changed(sender, instance, **kwargs):
+    if sender is Household:
+        invalidate_household_overview_on_commit(household_ids=[instance.pk])
+    else:
+        invalidate_household_overview_on_commit(
+            household_ids=[instance.household_id], client_ids=[instance.client_id]
+        )
+
+
+for model in (Household, Account, RiskSnapshot, Document, Briefing):
+    post_save.connect(_overview_changed, sender=model, dispatch_uid=f'overview_save_{model.__name__}')
+    post_delete.connect(_overview_changed, sender=model, dispatch_uid=f'overview_delete_{model.__name__}')
+
+
+def _refresh_latest(*snapshots):
+    refresh_latest_snapshots(
+        client_ids={s.client_id for s in snapshots if s.client_id},
+        household_ids={s.household_id for s in snapshots if s.household_id},
+    )
+
+
+@receiver(pre_save, sender=RiskSnapshot, dispatch_uid='risk_snapshot_edit')
+def risk_snapshot_changing(sender, instance, **kwargs):
+    # Snapshots are meant to be immutable; an edit is applied as remove + add
+    if not instance._state.adding:
+        instance._rollup_previous = RiskSnapshot.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=RiskSnapshot, dispatch_uid='risk_snapshot_save')
+def risk_snapshot_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        apply_snapshot(previous, sign=-1)
+        instance._rollup_previous = None
+    apply_snapshot(instance)
+
+    if created:
+        record_latest(instance)
+    else:
+        _refresh_latest(*filter(None, (previous, instance)))
+
+    _rollup_household(*filter(None, (previous, instance)))
+    for snapshot in filter(None, (previous, instance)):
+        sync_series_on_commit(snapshot)
+    evaluate_on_commit(instance)
+
+
+@receiver(post_delete, sender=RiskSnapshot, dispatch_uid='risk_snapshot_delete')
+def risk_snapshot_deleted(sender, instance, **kwargs):
+    # Runs per row of a cascade: everything here collapses to one pass on commit
+    rebuild_rollups_on_commit(instance.as_of_date)
+    refresh_latest_on_commit(instance)
+    _rollup_household(instance)
+    sync_series_on_commit(instance)
+
+
+def _rollup_household(*snapshots):
+    # A member's snapshot changes its household's derived snapshots from its date on
+    if rollup_enabled() and any(s.client_id for s in snapshots):
+        rollup_members_on_commit(snapshots)
+
+
+@receiver(pre_save, sender=Client, dispatch_uid='client_membership_change')
+def client_changing(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._rollup_membership = Client.objects.filter(pk=instance.pk).values_list(
+            'household_id', 'is_active'
+        ).first()
+
+
+@receiver(post_save, sender=Client, dispatch_uid='client_membership_saved')
+def client_saved(sender, instance, created, **kwargs):
+    # Joining, leaving or (de)activating changes whole household histories
+    previous = getattr(instance, '_rollup_membership', None)
+    instance._rollup_membership = None
+    invalidate_household_overview_on_commit(household_ids=[instance.household_id, previous and previous[0]])
+    if previous is None or previous == (instance.household_id, instance.is_active) or not rollup_enabled():
+        return
+    for household_id in {previous[0], instance.household_id} - {None}:
+        rollup_on_commit(household_id)
+
+
+@receiver(post_delete, sender=Client, dispatch_uid='client_overview_delete')
+def client_deleted(sender, instance, **kwargs):
+    invalidate_household_overview_on_commit(household_ids=[instance.household_id])
+    # The member is gone by commit time, so its snapshots can't name the household
+    if instance.household_id and rollup_enabled():
+        rollup_on_commit(instance.household_id)
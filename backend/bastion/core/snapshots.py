@@ -0,0 +1,117 @@
+"""
+Latest Snapshots
+Maintains the LatestRiskSnapshot pointer per client and household, and
+resolves the latest snapshots as of past dates
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Client, Household, LatestRiskSnapshot, RiskSnapshot
+
+
+def _target(snapshot) -> dict:
+    if snapshot.client_id:
+        return {'client_id': snapshot.client_id}
+    return {'household_id': snapshot.household_id}
+
+
+def _pointer(snapshot) -> LatestRiskSnapshot:
+    return LatestRiskSnapshot(
+        client_id=snapshot.client_id,
+        household_id=snapshot.household_id,
+        snapshot_id=snapshot.pk,
+        as_of_date=snapshot.as_of_date,
+    )
+
+
+def record_latest(snapshot):
+    """
+    Point the snapshot's target at it unless a newer snapshot is current
+
+    A conditional UPDATE, so concurrent inserts for the same target can
+    only move the pointer forward.
+    """
+    target = _target(snapshot)
+    fields = {'snapshot': snapshot, 'as_of_date': snapshot.as_of_date}
+    pointers = LatestRiskSnapshot.objects.filter(**target)
+    if pointers.filter(as_of_date__lte=snapshot.as_of_date).update(**fields):
+        return
+    if pointers.exists():
+        return
+    try:
+        with transaction.atomic():
+            LatestRiskSnapshot.objects.create(**target, **fields)
+    except IntegrityError:
+        # Another writer created the pointer first
+        pointers.filter(as_of_date__lte=snapshot.as_of_date).update(**fields)
+
+
+def refresh_latest_snapshots(client_ids=(), household_ids=()):
+    """
+    Recompute the pointers of the given clients and households
+
+    For bulk loads and deletes: one query finds the newest snapshot of
+    every target, then the pointers are replaced in bulk.
+    """
+    client_ids, household_ids = list(client_ids), list(household_ids)
+    if not client_ids and not household_ids:
+        return 0
+
+    newest = []
+    for field, ids in (('client_id', client_ids), ('household_id', household_ids)):
+        for start in range(0, len(ids), 1000):
+            chunk = ids[start:start + 1000]
+            newest.extend(
+                RiskSnapshot.objects.filter(**{f'{field}__in': chunk})
+                .latest_per_target()
+                .only('id', 'client_id', 'household_id', 'as_of_date')
+            )
+
+    with transaction.atomic():
+        for field, ids in (('client_id', client_ids), ('household_id', household_ids)):
+            for start in range(0, len(ids), 1000):
+                LatestRiskSnapshot.objects.filter(**{f'{field}__in': ids[start:start + 1000]}).delete()
+        LatestRiskSnapshot.objects.bulk_create([_pointer(snapshot) for snapshot in newest], batch_size=1000)
+    return len(newest)
+
+
+def refresh_latest_on_commit(snapshot):
+    """
+    Recompute the snapshot's target pointer once the transaction commits
+
+    Calls within one transaction collapse into one refresh of every
+    target touched, so a cascade deleting a whole history costs one.
+    """
+    pending = getattr(connection, '_latest_snapshot_targets', None) or (set(), set())
+    (pending[0] if snapshot.client_id else pending[1]).add(snapshot.client_id or snapshot.household_id)
+    connection._latest_snapshot_targets = pending
+
+    def run():
+        targets = getattr(connection, '_latest_snapshot_targets', None)
+        connection._latest_snapshot_targets = None
+        if targets:
+            refresh_latest_snapshots(client_ids=targets[0], household_ids=targets[1])
+
+    transaction.on_commit(run)
+
+
+def snapshots_as_of(as_of, target: str = 'client', targets=None):
+    """
+    Every target's newest snapshot on or before `as_of`, as one query
+
+    `targets` narrows the book to a Client or Household queryset. Each
+    target's snapshot is found by a correlated LIMIT 1 subquery, which
+    is a single seek on the (target, as_of_date DESC) index however long
+    the histories; targets with nothing on or before the date are left
+    out.
+    """
+    field = f'{target}_id'
+    if targets is None:
+        targets = (Client if target == 'client' else Household).objects.all()
+    newest = RiskSnapshot.objects.filter(
+        **{field: OuterRef('pk')}, as_of_date__lte=as_of
+    ).order_by('-as_of_date').values('pk')[:1]
+    return RiskSnapshot.objects.filter(
+        pk__in=targets.order_by().annotate(_snapshot=Subquery(newest)).values('_snapshot')
+    ).order_by(field)
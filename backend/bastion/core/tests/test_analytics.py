@@ -0,0 +1,70 @@
+"""
+Snapshot analytics write-back
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from bastion.core import analytics
+from bastion.core.analytics import STORED_METRICS, update_snapshot_analytics
+from bastion.core.models import Client, RiskSnapshot
+
+pytestmark = pytest.mark.django_db
+
+START = date(2024, 10, 1)
+
+
+@pytest.fixture
+def client_history(settings):
+    settings.RISK_VOLATILITY_WINDOW = 5
+    settings.RISK_DRIFT_LOOKBACK = 3
+    client = Client.objects.create(first_name='Ada', last_name='Byron', email='ada@example.com')
+    RiskSnapshot.objects.bulk_create([
+        RiskSnapshot(
+            client=client, as_of_date=START + timedelta(days=7 * week),
+            total_value=Decimal(100000 + (week % 5) * 3000 - week * 200),
+            equity_exposure=50 + week % 7, fixed_income_exposure=40 - week % 7, cash_exposure=10,
+            data_source='Test', source_timestamp=timezone.now(),
+        )
+        for week in range(60)
+    ])
+    return client
+
+
+def _metrics(client):
+    return {
+        snapshot['as_of_date']: snapshot
+        for snapshot in RiskSnapshot.objects.filter(client=client).values('as_of_date', *STORED_METRICS)
+    }
+
+
+def test_since_writes_later_rows_as_a_full_pass_would(client_history, monkeypatch):
+    update_snapshot_analytics(client_ids=[client_history.pk], household_ids=[])
+    full = _metrics(client_history)
+    RiskSnapshot.objects.update(**{name: None for name in STORED_METRICS})
+
+    loaded = []
+    load_histories = analytics.load_histories
+
+    def spy(*args, **kwargs):
+        history = load_histories(*args, **kwargs)
+        loaded.append(len(history))
+        return history
+
+    monkeypatch.setattr(analytics, 'load_histories', spy)
+    since = date(2025, 6, 3)
+    update_snapshot_analytics(client_ids=[client_history.pk], household_ids=[], since=since)
+
+    # From January 1st, plus the five rows the volatility window reaches back to
+    this_year = RiskSnapshot.objects.filter(client=client_history, as_of_date__gte=date(2025, 1, 1)).count()
+    assert loaded == [this_year + 5]
+    partial = _metrics(client_history)
+    for as_of_date, row in partial.items():
+        if as_of_date >= since:
+            assert row == full[as_of_date]
+        else:
+            assert all(row[name] is None for name in STORED_METRICS)
+    assert partial[since]['volatility'] is not None
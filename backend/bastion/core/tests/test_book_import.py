@@ -0,0 +1,59 @@
+"""
+Bulk book import through the API
+"""
+
+import io
+
+import pytest
+from rest_framework.test import APIClient
+
+from bastion.core.models import Client, User
+
+pytestmark = pytest.mark.django_db
+
+HEADER = b'email,first_name,last_name,household,account_number,account_name,account_type\n'
+
+
+@pytest.fixture
+def api():
+    api = APIClient()
+    api.force_authenticate(User.objects.create_superuser(email='admin@example.com', password='secret'))
+    return api
+
+
+def upload(api, content, name='book.csv'):
+    file = io.BytesIO(content)
+    file.name = name
+    return api.post('/api/clients/import/', {'file': file}, format='multipart')
+
+
+def test_rejected_rows_reported_in_line_order(api):
+    Client.objects.create(first_name='Existing', last_name='Client', email='taken@example.com')
+    response = upload(api, HEADER + (
+        b'taken@example.com,Taken,Client,,,,\n'
+        b'not-an-email,Bad,Email,,,,\n'
+        b'new@example.com,New,Client,Import HH,ACC-1,Brokerage,individual\n'
+        b'other@example.com,Other,Client,Import HH,ACC-1,Brokerage,individual\n'
+    ))
+
+    assert response.status_code == 201
+    assert response.data['clients'] == 1
+    assert response.data['households'] == 1
+    assert [error['line'] for error in response.data['errors']] == [2, 3, 5]
+
+
+def test_unreadable_file_uses_error_envelope_with_partial_result(api, settings):
+    settings.BOOK_IMPORT_BATCH_SIZE = 50
+    rows = b''.join(
+        b'client%d@example.com,Client,Number%d,Household %d,ACC-%d,Brokerage,individual\n' % (i, i, i % 10, i)
+        for i in range(300)
+    )
+    response = upload(api, HEADER + rows + b'broken\xff@example.com,Bad,Bytes,,,,\n')
+
+    assert response.status_code == 400
+    error = response.data['error']
+    assert error['code'] == 400
+    assert error['message'].startswith('Could not read the file:')
+    # Batches read before the bad bytes were committed and are reported
+    assert error['details']['clients'] > 0
+    assert error['details']['clients'] == Client.objects.filter(email__startswith='client').count()
@@ -0,0 +1,129 @@
+"""
+Household snapshots derived from member snapshots
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from bastion.core.household_rollup import ROLLUP_SOURCE, _member_snapshots, derive_household_snapshots
+from bastion.core.models import Client, Household, RiskSnapshot
+
+pytestmark = pytest.mark.django_db
+
+START = date(2025, 1, 6)
+
+
+@pytest.fixture
+def household():
+    return Household.objects.create(name='Byron')
+
+
+def member(household, name):
+    return Client.objects.create(
+        first_name=name, last_name='Byron', email=f'{name.lower()}@example.com', household=household,
+    )
+
+
+def snapshots(client, values, equity=60):
+    """One snapshot per {day offset: value}"""
+    RiskSnapshot.objects.bulk_create([
+        RiskSnapshot(
+            client=client, as_of_date=START + timedelta(days=day), total_value=Decimal(value),
+            equity_exposure=equity, fixed_income_exposure=100 - equity, cash_exposure=0,
+            data_source='Test', source_timestamp=timezone.now(),
+        )
+        for day, value in values.items()
+    ])
+
+
+def derived(household):
+    return {
+        (snapshot.as_of_date - START).days: snapshot
+        for snapshot in RiskSnapshot.objects.filter(household=household, data_source=ROLLUP_SOURCE)
+    }
+
+
+def values(household):
+    return {day: snapshot.total_value for day, snapshot in derived(household).items()}
+
+
+def test_members_carry_forward_between_their_snapshots(household):
+    snapshots(member(household, 'Ada'), {0: 1000, 2: 1200}, equity=100)
+    snapshots(member(household, 'Anne'), {1: 3000}, equity=0)
+
+    derive_household_snapshots([household.pk])
+
+    assert values(household) == {0: Decimal('1000.00'), 1: Decimal('4000.00'), 2: Decimal('4200.00')}
+    rows = derived(household)
+    # Exposures weighted by each member's held value
+    assert rows[1].equity_exposure == Decimal('25.00')
+    assert rows[2].equity_exposure == Decimal('28.57')
+    assert rows[1].notes == 'Rolled up from 2 client snapshots'
+
+
+def test_back_dated_member_snapshot_rederives_from_its_date(household):
+    ada, anne = member(household, 'Ada'), member(household, 'Anne')
+    # Anne's only snapshot before the back-dated one is from last year
+    snapshots(ada, {-60: 600, -40: 700, 0: 1000, 10: 900, 20: 1100, 30: 800})
+    snapshots(anne, {-20: 2000, 25: 2500})
+    derive_household_snapshots([household.pk])
+    before = values(household)
+
+    snapshots(ada, {15: 500})
+    since = START + timedelta(days=15)
+    derive_household_snapshots([household.pk], since=since)
+
+    after = derived(household)
+    assert {day: row.total_value for day, row in after.items() if day < 15} == {
+        day: value for day, value in before.items() if day < 15
+    }
+    assert {day: row.total_value for day, row in after.items() if day >= 15} == {
+        15: Decimal('2500.00'), 20: Decimal('3100.00'), 25: Decimal('3600.00'), 30: Decimal('3300.00'),
+    }
+    # The year-to-date peak on January 6th is before `since`
+    assert after[15].max_drawdown_ytd == Decimal('-16.67')
+    assert after[30].max_drawdown_ytd == Decimal('-16.67')
+    # Same as deriving every date
+    written = {day: (row.total_value, row.max_drawdown_ytd) for day, row in after.items()}
+    derive_household_snapshots([household.pk])
+    assert written == {day: (row.total_value, row.max_drawdown_ytd) for day, row in derived(household).items()}
+
+    # Read from January 1st, each member seeded with its last snapshot before it
+    rows = _member_snapshots([household.pk], start=date(2025, 1, 1))
+    assert sorted((as_of_date - START).days for _, _, as_of_date, *_ in rows) == [-40, -20, 0, 10, 15, 20, 25, 30]
+
+
+def test_departed_member_drops_out_of_the_household(household):
+    ada, anne = member(household, 'Ada'), member(household, 'Anne')
+    snapshots(ada, {0: 1000, 2: 1100})
+    snapshots(anne, {1: 500, 3: 600})
+    derive_household_snapshots([household.pk])
+
+    anne.household = None
+    anne.save()
+    derive_household_snapshots([household.pk])
+
+    # Dates only Anne reported on are removed, and her value leaves the rest
+    assert values(household) == {0: Decimal('1000.00'), 2: Decimal('1100.00')}
+
+
+def test_stale_derived_rows_removed_from_since_only(household):
+    ada = member(household, 'Ada')
+    snapshots(ada, {0: 1000, 1: 1100, 2: 1200, 3: 1300})
+    RiskSnapshot.objects.bulk_create([RiskSnapshot(
+        household=household, as_of_date=START + timedelta(days=5), total_value=Decimal(9000),
+        equity_exposure=50, fixed_income_exposure=50, cash_exposure=0,
+        data_source='Custodian', source_timestamp=timezone.now(),
+    )])
+    derive_household_snapshots([household.pk])
+    RiskSnapshot.objects.filter(client=ada, as_of_date__in=[START, START + timedelta(days=2)]).delete()
+
+    derive_household_snapshots([household.pk], since=START + timedelta(days=1))
+
+    # Day 0 is before `since` and kept; day 2 no longer has member snapshots
+    assert values(household) == {0: Decimal('1000.00'), 1: Decimal('1100.00'), 3: Decimal('1300.00')}
+    # Supplied household snapshots on other dates are left alone
+    assert RiskSnapshot.objects.filter(household=household, data_source='Custodian').count() == 1
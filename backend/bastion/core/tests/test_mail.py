@@ -0,0 +1,127 @@
+"""
+Pooled SMTP backend and delivery queue, against a local aiosmtpd server
+"""
+
+import time
+
+from django.core.mail import EmailMessage, get_connection
+
+from bastion.core.mail import DeliveryJob, DeliveryQueue
+
+
+def _message(*recipients, subject='Hello'):
+    return EmailMessage(subject=subject, body='Body', from_email='ops@example.com', to=list(recipients))
+
+
+def _jobs(count):
+    return [
+        DeliveryJob(key=index, message=_message(f'user{index}@example.com'), recipients=[f'user{index}@example.com'])
+        for index in range(count)
+    ]
+
+
+def test_backend_reuses_pooled_connections(smtp_server):
+    backend = get_connection()
+    for index in range(5):
+        assert backend.send_messages([_message(f'user{index}@example.com')]) == 1
+    # A second backend instance shares the same pool
+    get_connection().send_messages([_message('late@example.com')])
+
+    assert len(smtp_server.messages) == 6
+    assert len(smtp_server.peers) == 1
+
+
+def test_queue_delivers_every_job(smtp_server):
+    completed = DeliveryQueue(workers=4).send_all(_jobs(40))
+
+    assert len(completed) == 40
+    assert all(job.ok and job.error is None for job in completed)
+    assert len(smtp_server.messages) == 40
+
+
+def test_queue_bounds_concurrency(smtp_server, settings):
+    settings.EMAIL_POOL_SIZE = 10
+    smtp_server.delay = 0.05
+
+    DeliveryQueue(workers=3).send_all(_jobs(12))
+
+    assert len(smtp_server.messages) == 12
+    assert 1 < smtp_server.max_active <= 3
+    # Connections are reused across jobs, never one per message
+    assert len(smtp_server.peers) <= 3
+
+
+def test_pool_size_caps_open_connections(smtp_server, settings):
+    settings.EMAIL_POOL_SIZE = 2
+    smtp_server.delay = 0.05
+
+    DeliveryQueue(workers=6).send_all(_jobs(12))
+
+    assert len(smtp_server.messages) == 12
+    assert smtp_server.max_active <= 2
+    assert len(smtp_server.peers) <= 2
+
+
+def test_max_pending_bounds_jobs_in_flight(smtp_server):
+    queue = DeliveryQueue(workers=2, max_pending=3)
+    peak = []
+
+    def track(job):
+        peak.append(queue._in_flight)
+
+    queue.on_complete = track
+    queue.send_all(_jobs(10))
+
+    assert len(queue.completed) == 10
+    assert max(peak) <= 3
+
+
+def test_transient_refusal_retries_only_that_recipient_with_backoff(smtp_server):
+    smtp_server.responses['slow@example.com'] = ['451 Try again later', '451 Try again later']
+    job = DeliveryJob(
+        key='retry',
+        message=_message('ok@example.com', 'slow@example.com'),
+        recipients=['ok@example.com', 'slow@example.com'],
+    )
+
+    started = time.monotonic()
+    [done] = DeliveryQueue(workers=1, backoff=0.05).send_all([job])
+    elapsed = time.monotonic() - started
+
+    assert done.ok
+    assert sorted(done.delivered) == ['ok@example.com', 'slow@example.com']
+    assert done.attempts == 3
+    assert smtp_server.rcpt_attempts['ok@example.com'] == 1
+    assert smtp_server.rcpt_attempts['slow@example.com'] == 3
+    # Two backoffs: 0.05s, then 0.1s
+    assert elapsed >= 0.15
+
+
+def test_permanent_refusal_fails_without_retry(smtp_server):
+    smtp_server.responses['gone@example.com'] = ['550 No such user']
+    job = DeliveryJob(
+        key='permanent',
+        message=_message('ok@example.com', 'gone@example.com'),
+        recipients=['ok@example.com', 'gone@example.com'],
+    )
+
+    [done] = DeliveryQueue(workers=1, backoff=0.05).send_all([job])
+
+    assert done.delivered == ['ok@example.com']
+    assert list(done.failed) == ['gone@example.com']
+    assert done.failed['gone@example.com'].startswith('550')
+    # Delivered to someone, so the message as a whole counts as sent
+    assert done.error is None
+    assert smtp_server.rcpt_attempts['gone@example.com'] == 1
+
+
+def test_retries_stop_at_max_attempts(smtp_server):
+    smtp_server.responses['busy@example.com'] = ['451 Try again later'] * 10
+    job = DeliveryJob(key='busy', message=_message('busy@example.com'), recipients=['busy@example.com'])
+
+    [done] = DeliveryQueue(workers=1, max_attempts=3, backoff=0.01).send_all([job])
+
+    assert done.attempts == 3
+    assert not done.delivered
+    assert done.error.startswith('busy@example.com: 451')
+    assert smtp_server.rcpt_attempts['busy@example.com'] == 3
@@ -0,0 +1,161 @@
+"""
+Query budgets of every API router route, over a seeded book
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bastion.audit.models import AuditEvent
+from bastion.briefings.models import (
+    Briefing, BriefingBatch, BriefingTemplate, Notification, OutreachTrigger,
+)
+from bastion.core.management.commands import check_query_budgets
+from bastion.core.models import Account, Client, Household, RiskSnapshot, User
+from bastion.core.snapshots import refresh_latest_snapshots
+from bastion.documents.models import Document, DocumentCategory
+
+pytestmark = pytest.mark.django_db
+
+HOUSEHOLDS = 40
+
+
+@pytest.fixture
+def book():
+    """Households whose clients, accounts, documents and history vary in size"""
+    cache.clear()
+    admin = User.objects.create_superuser(email='admin@example.com', password='secret')
+    User.objects.bulk_create([
+        User(email=f'advisor{i}@example.com', is_staff=True) for i in range(15)
+    ])
+    households = Household.objects.bulk_create([
+        Household(name=f'Household {i:02}', created_by=admin) for i in range(HOUSEHOLDS)
+    ])
+    clients = Client.objects.bulk_create([
+        Client(
+            first_name=f'Client{i}', last_name=f'{j}', email=f'client{i}-{j}@example.com',
+            household=household, risk_tolerance=('Moderate', 'Aggressive')[j % 2],
+        )
+        for i, household in enumerate(households)
+        for j in range(i % 6 + 1)
+    ])
+    accounts = Account.objects.bulk_create([
+        Account(
+            account_number=f'{client.email}-{k}', name=f'Account {k}',
+            account_type=Account.AccountType.values[k % 6],
+            client=client, household=client.household,
+        )
+        for n, client in enumerate(clients)
+        for k in range(n % 4 + 1)
+    ])
+    today = timezone.localdate()
+    RiskSnapshot.objects.bulk_create([
+        RiskSnapshot(
+            **{'client': target} if isinstance(target, Client) else {'household': target},
+            as_of_date=today - timedelta(days=day), total_value=Decimal(100000 + day),
+            equity_exposure=60, fixed_income_exposure=30, cash_exposure=10,
+            max_drawdown_ytd=Decimal('-5'), data_source='Test', source_timestamp=timezone.now(),
+        )
+        for n, target in enumerate([*clients, *households])
+        for day in range(n % 8 + 1)
+    ])
+    refresh_latest_snapshots(
+        client_ids=[c.pk for c in clients], household_ids=[h.pk for h in households],
+    )
+
+    categories = DocumentCategory.objects.bulk_create([
+        DocumentCategory(name=f'Category {i}', slug=f'category-{i}') for i in range(4)
+    ])
+    Document.objects.bulk_create([
+        Document(
+            title=f'Statement {k}', category=categories[k % 4], household=household,
+            client=household.clients.first(), file=f'documents/statement-{i}-{k}.pdf',
+            file_name=f'statement-{i}-{k}.pdf', file_type='application/pdf',
+        )
+        for i, household in enumerate(households)
+        for k in range(i % 5 + 1)
+    ])
+
+    templates = BriefingTemplate.objects.bulk_create([
+        BriefingTemplate(
+            name=f'Template {i}', template_type=BriefingTemplate.TemplateType.values[i],
+            subject_template='Update for {{ client_name }}', body_template='Hello {{ client_name }}',
+        )
+        for i in range(3)
+    ])
+    BriefingBatch.objects.bulk_create([
+        BriefingBatch(template=templates[i % 3], created_by=admin) for i in range(5)
+    ])
+    Briefing.objects.bulk_create([
+        Briefing(
+            title=f'Briefing {n}', subject='Update', body_markdown='Body', client=client,
+            household=client.household, template=templates[n % 3],
+            status=(Briefing.Status.PENDING_REVIEW, Briefing.Status.APPROVED, Briefing.Status.SENT)[n % 3],
+            scheduled_for=timezone.now() + timedelta(days=1) if n % 3 == 1 else None,
+            created_by=admin,
+        )
+        for n, client in enumerate(clients)
+    ])
+    Notification.objects.bulk_create([
+        Notification(user=admin, title=f'Notice {i}', message='Body', is_read=bool(i % 2))
+        for i in range(60)
+    ])
+    OutreachTrigger.objects.create(
+        name='Drawdown', metric=OutreachTrigger.Metric.MAX_DRAWDOWN_YTD,
+        comparison=OutreachTrigger.Comparison.AT_OR_BELOW, threshold=Decimal('-20'),
+        action=OutreachTrigger.Action.NOTIFY,
+    )
+    AuditEvent.bulk_log([
+        AuditEvent.build(
+            event_type=AuditEvent.EventType.DATA_CREATE, user=admin, target=account,
+            client_id=account.client_id, household_id=account.household_id, data={'model': 'Account'},
+        )
+        for account in accounts
+    ])
+    return households
+
+
+def sweep(**options):
+    out = StringIO()
+    try:
+        call_command('check_query_budgets', page_size=100, samples=HOUSEHOLDS, stdout=out, **options)
+    except CommandError:
+        pytest.fail(out.getvalue())
+    return out.getvalue()
+
+
+def test_every_route_within_budget_and_flat_in_rows(book):
+    output = sweep()
+
+    assert 'FAIL' not in output and 'SKIP' not in output
+    # Parameterized collection actions were run, not answered with a 400
+    assert '200 GET /api/risk-snapshots/as_of/' in output
+    assert '200 GET /api/documents/by_household/' in output
+    assert 'GET /api/households/{id}/accounts/ queries=2-2 runs=40' in output
+
+
+def test_sweep_fails_error_responses(book, monkeypatch):
+    monkeypatch.setitem(check_query_budgets.ACTION_PARAMS, ('documents', 'by_household'), lambda: [{}])
+    out = StringIO()
+    with pytest.raises(CommandError):
+        call_command('check_query_budgets', route=['documents'], stdout=out)
+    assert 'FAIL GET /api/documents/by_household/: status 400' in out.getvalue()
+
+
+def test_middleware_counts_queries_and_stays_out_of_base_settings(settings):
+    assert settings.MIDDLEWARE[0] == 'bastion.core.middleware.QueryBudgetMiddleware'
+    api = APIClient()
+    api.force_authenticate(User.objects.create_superuser(email='admin@example.com', password='secret'))
+    response = api.get('/api/notifications/')
+    assert response.status_code == 200
+    assert int(response['X-Query-Count']) > 0
+
+    base = (Path(__file__).resolve().parents[2] / 'settings' / 'base.py').read_text()
+    assert 'QueryBudgetMiddleware' not in base
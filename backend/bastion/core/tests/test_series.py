@@ -0,0 +1,145 @@
+"""
+Packed snapshot series
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bastion.core.models import Client, RiskSnapshot, SnapshotSeries, User
+from bastion.core.series import SeriesData, lttb, merge, pack, read_series, sync_series, unpack
+
+pytestmark = pytest.mark.django_db
+
+START = date(2025, 1, 1)
+
+
+def series(days, cents, equity=6000):
+    dates = np.datetime64(START, 'D') + np.array(days, dtype='timedelta64[D]')
+    basis_points = np.tile(np.array([equity, 10000 - equity, 0, 0], dtype=np.int32), (len(days), 1))
+    return SeriesData(dates, np.array(cents, dtype=np.int64), basis_points)
+
+
+def assert_same(left, right):
+    assert np.array_equal(left.dates, right.dates)
+    assert np.array_equal(left.cents, right.cents)
+    assert np.array_equal(left.basis_points, right.basis_points)
+
+
+def test_pack_round_trip():
+    original = series([0, 1, 5, 400, 401], [10000000, 9999999, -5, 0, 2 ** 40])
+    original.basis_points[2] = [1234, 5678, 2000, 1088]
+
+    assert_same(unpack(pack(original), len(original)), original)
+    assert len(unpack(pack(SeriesData.empty()), 0)) == 0
+
+
+def test_merge_keeps_newer_point_on_the_same_date():
+    older = series([0, 2, 4], [100, 200, 400])
+    newer = series([1, 2, 5], [150, 250, 500], equity=7000)
+
+    merged = merge(older, newer)
+
+    assert (merged.dates - np.datetime64(START, 'D')).astype(int).tolist() == [0, 1, 2, 4, 5]
+    assert merged.cents.tolist() == [100, 150, 250, 400, 500]
+    assert merged.basis_points[2, 0] == 7000
+    assert_same(merge(older, SeriesData.empty()), older)
+    assert_same(merge(SeriesData.empty(), newer), newer)
+
+
+def test_lttb_keeps_ends_and_returns_threshold_increasing_points():
+    rng = np.random.default_rng(7)
+    x = np.arange(1000, dtype=float)
+    y = np.cumsum(rng.normal(size=1000))
+
+    picked = lttb(x, y, 50)
+
+    assert len(picked) == 50
+    assert picked[0] == 0 and picked[-1] == 999
+    assert np.all(np.diff(picked) > 0)
+
+
+def test_lttb_returns_everything_at_or_above_length():
+    x, y = np.arange(10, dtype=float), np.ones(10)
+    assert lttb(x, y, 10).tolist() == list(range(10))
+    assert lttb(x, y, 500).tolist() == list(range(10))
+
+
+def test_lttb_keeps_a_single_spike():
+    x = np.arange(2000, dtype=float)
+    y = np.zeros(2000)
+    y[1234] = 50.0
+    assert 1234 in lttb(x, y, 20)
+
+
+def _snapshots(client, days):
+    RiskSnapshot.objects.bulk_create([
+        RiskSnapshot(
+            client=client, as_of_date=START + timedelta(days=day), total_value=Decimal(1000 + day),
+            equity_exposure=60, fixed_income_exposure=40, cash_exposure=0,
+            data_source='Test', source_timestamp=timezone.now(),
+        )
+        for day in days
+    ])
+
+
+def test_sync_since_keeps_older_points_and_drops_deleted_ones():
+    client = Client.objects.create(first_name='Ada', last_name='Byron', email='ada@example.com')
+    _snapshots(client, range(10))
+    sync_series(client_ids=[client.pk])
+
+    snapshots = RiskSnapshot.objects.filter(client=client)
+    # Before `since`: not re-read, so the stored point stands
+    snapshots.filter(as_of_date=START + timedelta(days=2)).update(total_value=Decimal(1))
+    # From `since`: a correction, a delete and an append
+    snapshots.filter(as_of_date=START + timedelta(days=7)).update(total_value=Decimal('777.77'))
+    snapshots.filter(as_of_date=START + timedelta(days=8)).delete()
+    _snapshots(client, [12])
+
+    assert sync_series(client_ids=[client.pk], since=START + timedelta(days=5)) == 1
+
+    history = read_series('client', client.pk)
+    values = {(day.item() - START).days: cents for day, cents in zip(history.dates, history.cents)}
+    assert values == {
+        0: 100000, 1: 100100, 2: 100200, 3: 100300, 4: 100400,
+        5: 100500, 6: 100600, 7: 77777, 9: 100900, 12: 101200,
+    }
+    row = SnapshotSeries.objects.get(client=client)
+    assert (row.point_count, row.start_date, row.end_date) == (10, START, START + timedelta(days=12))
+
+    # Nothing left from `since` on a history starting there removes the series
+    snapshots.delete()
+    sync_series(client_ids=[client.pk], since=START)
+    assert not SnapshotSeries.objects.filter(client=client).exists()
+
+
+def test_risk_history_envelope():
+    api = APIClient()
+    api.force_authenticate(User.objects.create_superuser(email='admin@example.com', password='secret'))
+    client = Client.objects.create(first_name='Ada', last_name='Byron', email='ada@example.com')
+    _snapshots(client, range(100))
+    sync_series(client_ids=[client.pk])
+    url = f'/api/clients/{client.pk}/risk_history/'
+
+    response = api.get(url, {'start': '2025-01-11', 'end': '2025-03-11', 'max_points': 10})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {'start', 'end', 'max_points', 'point_count', 'downsampled', 'results'}
+    assert (data['start'], data['end'], data['max_points']) == ('2025-01-11', '2025-03-11', 10)
+    assert data['point_count'] == 60
+    assert data['downsampled'] is True
+    assert len(data['results']) == 10
+    assert data['results'][0] == {
+        'as_of_date': '2025-01-11', 'total_value': '1010.00', 'equity_exposure': '60.00',
+        'fixed_income_exposure': '40.00', 'cash_exposure': '0.00', 'alternative_exposure': '0.00',
+    }
+    assert data['results'][-1]['as_of_date'] == '2025-03-11'
+
+    data = api.get(url).json()
+    assert (data['start'], data['end'], data['max_points']) == (None, None, 500)
+    assert (data['point_count'], data['downsampled'], len(data['results'])) == (100, False, 100)
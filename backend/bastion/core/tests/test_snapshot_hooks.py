@@ -0,0 +1,70 @@
+"""
+Snapshot save and delete hooks
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bastion.core.household_rollup import ROLLUP_SOURCE, rollup_households
+from bastion.core.models import Client, Household, LatestRiskSnapshot, RiskSnapshot
+from bastion.core.snapshots import refresh_latest_snapshots
+
+pytestmark = pytest.mark.django_db
+
+START = date(2025, 1, 1)
+
+
+def _history(client, days, value=100000):
+    RiskSnapshot.objects.bulk_create([
+        RiskSnapshot(
+            client=client, as_of_date=START + timedelta(days=day), total_value=Decimal(value + day),
+            equity_exposure=60, fixed_income_exposure=30, cash_exposure=10,
+            data_source='Test', source_timestamp=timezone.now(),
+        )
+        for day in range(days)
+    ])
+
+
+def test_deleting_a_member_with_long_history_collapses_hooks(django_capture_on_commit_callbacks):
+    household = Household.objects.create(name='Byron')
+    staying = Client.objects.create(first_name='Ada', last_name='Byron', email='ada@example.com', household=household)
+    leaving = Client.objects.create(first_name='Anne', last_name='Byron', email='anne@example.com', household=household)
+    _history(staying, 30)
+    _history(leaving, 500, value=50000)
+    refresh_latest_snapshots(client_ids=[staying.pk, leaving.pk])
+    rollup_households([household.pk])
+
+    leaving_id = leaving.pk
+    with django_capture_on_commit_callbacks(execute=True):
+        with CaptureQueriesContext(connection) as queries:
+            leaving.delete()
+        during_delete = len(queries)
+
+    # No per-row work while cascading over 500 snapshots
+    assert during_delete < 40
+    assert not LatestRiskSnapshot.objects.filter(client_id=leaving_id).exists()
+    derived = RiskSnapshot.objects.filter(household=household, data_source=ROLLUP_SOURCE)
+    # Only the remaining member's 30 dates, valued from that member alone
+    assert derived.count() == 30
+    assert derived.get(as_of_date=START).total_value == Decimal('100000.00')
+
+
+def test_deleting_member_snapshots_rolls_household_up_from_earliest(django_capture_on_commit_callbacks):
+    household = Household.objects.create(name='Byron')
+    client = Client.objects.create(first_name='Ada', last_name='Byron', email='ada@example.com', household=household)
+    _history(client, 20)
+    refresh_latest_snapshots(client_ids=[client.pk])
+    rollup_households([household.pk])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with CaptureQueriesContext(connection) as queries:
+            RiskSnapshot.objects.filter(client=client, as_of_date__gte=START + timedelta(days=10)).delete()
+        assert len(queries) < 20
+
+    assert LatestRiskSnapshot.objects.get(client=client).as_of_date == START + timedelta(days=9)
+    assert RiskSnapshot.objects.filter(household=household, data_source=ROLLUP_SOURCE).count() == 10
@@ -90,6 +90,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'bastion.wsgi.application'
+ASGI_APPLICATION = 'bastion.asgi.application'
 
 # =============================================================================
 # DATABASE
@@ -289,3 +290,143 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+
+# =============================================================================
+# BRIEFINGS
+# =============================================================================
+# Bulk generation renders in a process pool when a batch is large enough.
+# Daemonic processes (Celery prefork children) cannot start one, so batches
+# go to their own queue, served by a non-forking worker:
+#   celery -A bastion worker -Q briefing-generation --pool=threads --concurrency=1
+BRIEFING_BATCH_CHUNK_SIZE = 500
+BRIEFING_GENERATION_QUEUE = os.environ.get('BRIEFING_GENERATION_QUEUE', 'briefing-generation')
+CELERY_TASK_ROUTES = {
+    'bastion.briefings.tasks.generate_briefing_batch': {'queue': BRIEFING_GENERATION_QUEUE},
+}
+BRIEFING_RENDER_PROCESSES = int(os.environ.get('BRIEFING_RENDER_PROCESSES', os.cpu_count() or 1))
+BRIEFING_RENDER_POOL_THRESHOLD = 200
+
+# Rendered briefing HTML, keyed by a hash of the Markdown source
+BRIEFING_MARKDOWN_CACHE_SIZE = 1024  # Per-process LRU entries
+BRIEFING_MARKDOWN_CACHE_TIMEOUT = 7 * 24 * 3600  # Shared cache, seconds
+
+# Scheduled templates - cron is evaluated in this timezone
+BRIEFING_SCHEDULE_TIMEZONE = os.environ.get('BRIEFING_SCHEDULE_TIMEZONE', 'America/New_York')
+BRIEFING_SCHEDULER_MAX_SLEEP = 60  # Seconds; bounds how long schedule edits take to apply
+
+# Dispatch of approved briefings once scheduled_for passes
+BRIEFING_DISPATCH_BATCH_SIZE = 100
+BRIEFING_DISPATCH_LEASE = 15 * 60  # Seconds before a stuck claim is retried
+BRIEFING_DISPATCH_MAX_SLEEP = 30
+
+# Email open tracking - pixel hits accumulate in the cache and are flushed
+# in batches. The pixel is only embedded when a public base URL is set.
+BRIEFING_TRACKING_BASE_URL = os.environ.get('BRIEFING_TRACKING_BASE_URL', '')
+BRIEFING_OPEN_FLUSH_INTERVAL = 60  # Seconds per accumulation bucket
+BRIEFING_OPEN_DEDUPE_WINDOW = 3600  # Repeat fetches by one client are ignored
+BRIEFING_OPEN_RETENTION = 24 * 3600  # Unflushed opens kept this long
+
+CELERY_BEAT_SCHEDULE = {
+    'flush-briefing-opens': {
+        'task': 'bastion.briefings.tasks.flush_briefing_opens',
+        'schedule': BRIEFING_OPEN_FLUSH_INTERVAL,
+    },
+}
+
+# =============================================================================
+# EMAIL DELIVERY
+# =============================================================================
+# Persistent SMTP connections per process (PooledSMTPEmailBackend)
+EMAIL_POOL_SIZE = 8
+# Concurrent senders and max messages queued in memory per send
+EMAIL_SEND_CONCURRENCY = 8
+EMAIL_QUEUE_SIZE = 1000
+# Transient (4xx / connection) failures retry with exponential backoff
+EMAIL_MAX_ATTEMPTS = 4
+EMAIL_RETRY_BACKOFF = 2.0  # seconds before the first retry
+
+# =============================================================================
+# DASHBOARD
+# =============================================================================
+# Firm-wide hub counters are cached; model signals invalidate them, the
+# timeout bounds staleness from bulk writes that bypass signals.
+DASHBOARD_STATS_TIMEOUT = 300
+
+# =============================================================================
+# HOUSEHOLD OVERVIEW
+# =============================================================================
+# The household page payload is cached per household and dropped on related
+# writes; kept short since bulk writes may bypass signals (seconds)
+HOUSEHOLD_OVERVIEW_TIMEOUT = 60
+# Recent documents, pending briefings and activity items shown
+HOUSEHOLD_OVERVIEW_ITEMS = 10
+
+# =============================================================================
+# QUERY BUDGETS
+# =============================================================================
+# Most queries an API action may run, unless its view declares one
+# (bastion.core.query_budget). 'warn' logs overruns, 'raise' fails the
+# request; check_query_budgets exercises every router route. The
+# middleware is sync-only, so only the development and test settings
+# install it.
+QUERY_BUDGET_MODE = 'off'
+QUERY_BUDGET_DEFAULT = 10
+
+# =============================================================================
+# TYPEAHEAD SEARCH
+# =============================================================================
+# PostgreSQL searches trigram indexes; elsewhere each process keeps a prefix
+# index, rebuilt on client/household signals and at least this often (seconds)
+TYPEAHEAD_INDEX_TIMEOUT = 300
+TYPEAHEAD_MAX_RESULTS = 10
+
+# =============================================================================
+# RISK SNAPSHOT INGESTION
+# =============================================================================
+# Rows validated, upserted and audited per transaction by ingest_risk_snapshots
+SNAPSHOT_INGEST_BATCH_SIZE = 5000
+SNAPSHOT_INGEST_MAX_REPORTED_ERRORS = 1000
+
+# =============================================================================
+# BOOK IMPORT
+# =============================================================================
+# Rows checked and inserted per transaction by the client import (API and
+# import_book command)
+BOOK_IMPORT_BATCH_SIZE = 2000
+BOOK_IMPORT_MAX_REPORTED_ERRORS = 1000
+
+# =============================================================================
+# RISK ANALYTICS
+# =============================================================================
+# Snapshots in the rolling volatility window, and back for exposure drift
+RISK_VOLATILITY_WINDOW = 20
+RISK_DRIFT_LOOKBACK = 20
+# Derive household snapshots from member client snapshots as they are written
+HOUSEHOLD_SNAPSHOT_ROLLUP = True
+
+# =============================================================================
+# LIVE EVENTS (server-sent events)
+# =============================================================================
+# Redis pub/sub fans events out across web processes; when unset an
+# in-process broker is used, which only reaches streams in the same process.
+EVENT_STREAM_REDIS_URL = os.environ.get('EVENT_STREAM_REDIS_URL', '')
+EVENT_STREAM_HEARTBEAT = 15  # Seconds between keep-alive comments
+EVENT_STREAM_RETRY = 5000  # Client reconnect delay, milliseconds
+EVENT_STREAM_ACTIVITY_BURST = 10  # Activity items published per bulk audit write
+
+# Per-user unread notification counters live in the cache and are rebuilt
+# from the database when missing; expiry bounds any drift.
+NOTIFICATION_UNREAD_COUNT_TIMEOUT = 3600
+NOTIFICATION_FANOUT_CHUNK_SIZE = 1000  # Rows per INSERT / commit in bulk fan-out
+
+# Email digests of unsent notifications, one per user per window
+NOTIFICATION_DIGEST_INTERVAL = 5 * 60  # Seconds between digest runs
+NOTIFICATION_DIGEST_WINDOW = 15 * 60  # Oldest unsent notification must be this old
+NOTIFICATION_DIGEST_BATCH_SIZE = 200  # Users per claim/UPDATE
+NOTIFICATION_DIGEST_MAX_ITEMS = 20  # Items listed per email
+NOTIFICATION_DIGEST_MAX_AGE = 7 * 24 * 3600  # Older unsent notifications are never emailed
+
+CELERY_BEAT_SCHEDULE['send-notification-digests'] = {
+    'task': 'bastion.briefings.tasks.send_notification_digests',
+    'schedule': NOTIFICATION_DIGEST_INTERVAL,
+}
@@ -2,6 +2,7 @@
 Development settings - NEVER use in production
 """
 
+import os
 from .base import *
 
 # =============================================================================
@@ -42,11 +43,22 @@ INSTALLED_APPS += ['debug_toolbar']
 MIDDLEWARE.insert(0, 'debug_toolbar.middleware.DebugToolbarMiddleware')
 INTERNAL_IPS = ['127.0.0.1']
 
+# =============================================================================
+# QUERY BUDGETS - Log actions that run more queries than declared
+# =============================================================================
+MIDDLEWARE.insert(1, 'bastion.core.middleware.QueryBudgetMiddleware')  # Inside the toolbar
+QUERY_BUDGET_MODE = 'warn'
+
 # =============================================================================
 # EMAIL - Console backend for development
 # =============================================================================
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# =============================================================================
+# CELERY - Run tasks inline unless a worker is explicitly configured
+# =============================================================================
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'true').lower() == 'true'
+
 # =============================================================================
 # LOGGING - More verbose in development
 # =============================================================================
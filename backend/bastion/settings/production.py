@@ -66,16 +66,21 @@ CACHES = {
     }
 }
 
+# Live event stream fan-out
+EVENT_STREAM_REDIS_URL = os.environ.get('EVENT_STREAM_REDIS_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/1'))
+
 # =============================================================================
 # EMAIL
 # =============================================================================
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = 'bastion.core.mail.PooledSMTPEmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST', '')
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
-EMAIL_USE_TLS = True
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'true').lower() == 'true'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@bastion.com')
+EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', 30))
+EMAIL_POOL_SIZE = int(os.environ.get('EMAIL_POOL_SIZE', 8))
 
 # =============================================================================
 # LOGGING - Production level
@@ -0,0 +1,41 @@
+"""
+Test settings - used by pytest (see backend/pytest.ini)
+"""
+
+from .base import *
+
+# =============================================================================
+# DATABASE - SQLite, created fresh per test run
+# =============================================================================
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test.sqlite3',
+    }
+}
+
+# =============================================================================
+# SPEED - Cheap password hashing
+# =============================================================================
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# =============================================================================
+# QUERY BUDGETS - A request over its budget fails the test
+# =============================================================================
+MIDDLEWARE.insert(0, 'bastion.core.middleware.QueryBudgetMiddleware')
+QUERY_BUDGET_MODE = 'raise'
+
+# =============================================================================
+# EMAIL - Captured in django.core.mail.outbox unless a test points elsewhere
+# =============================================================================
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# =============================================================================
+# CELERY - Tasks run inline
+# =============================================================================
+CELERY_TASK_ALWAYS_EAGER = True
+
+# =============================================================================
+# THROTTLING - Off, tests issue many requests
+# =============================================================================
+REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = []
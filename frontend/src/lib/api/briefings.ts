@@ -111,8 +111,13 @@ export const notificationsApi = {
     return api.get(`/notifications/${queryString}`)
   },
 
-  async getUnread(): Promise<{ count: number; notifications: Notification[] }> {
-    return api.get('/notifications/unread/')
+  async getUnread(params?: Record<string, string>): Promise<PaginatedResponse<Notification>> {
+    const queryString = params ? '?' + new URLSearchParams(params).toString() : ''
+    return api.get(`/notifications/unread/${queryString}`)
+  },
+
+  async getUnreadCount(): Promise<{ count: number }> {
+    return api.get('/notifications/unread_count/')
   },
 
   async markRead(notificationIds?: string[]): Promise<{ marked_read: number }> {